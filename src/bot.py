@@ -1,18 +1,28 @@
 import asyncio
 import os
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, types, Router, html
 from aiogram.client.default import DefaultBotProperties
 from aiogram.filters import CommandStart, Command
 
 from utils.logger import setup_logger, get_logger
-from utils.genius_api import get_genius_client
+from utils.genius_api import GeniusUnavailable, get_genius_client
+from utils.circuit_breaker import get_circuit_breaker
 from utils.config import setup_config, get_config
+from utils.http_client import start_http_clients, close_http_clients
 
 from handlers import upload, search
 
-from db import init_db, close_db
+from db import init_db, close_db, get_session
+from db.search_index import init_search_index
+from db.callback_store import get_callback_store
+from db.lookup_cache import get_lookup_cache
+from db.artist_cache import ArtistCard, ArtistCardCache, get_artist_card_cache
+from db.enrichment import cancel_enrich_all
+from db.enrichment_queue import stop_enrichment_queue
+from db.notify import notify_enabled, start_invalidation_listener, stop_invalidation_listener
 
 
 BASE_DIR = Path(__file__).parent
@@ -91,6 +101,107 @@ async def about_handler(message: types.Message):
     await message.answer(text)
 
 
+def render_artist_card(artist_data: dict) -> str:
+    text = f"🎤 <b>{html.quote(artist_data['name'])}</b>\n"
+
+    if config.get('genius.include_alternate_names', True) and artist_data.get('alternate_names'):
+        alt_names = ", ".join(artist_data['alternate_names'])
+        text += f"<i>Also known as: {html.quote(alt_names)}</i>\n"
+
+    text += "\n"
+
+    if artist_data.get('description'):
+        desc = artist_data['description'].strip()
+        max_length = config.genius_max_description_length
+
+        if len(desc) > max_length:
+            desc_short = desc[:max_length]
+            last_period = desc_short.rfind('.')
+            if last_period > 0:
+                desc = desc[:last_period + 1]
+            else:
+                desc = desc[:max_length - 3] + "..."
+
+        text += f"📖 <b>About:</b>\n{html.quote(desc)}\n\n"
+
+    if config.get('genius.include_stats', True):
+        stats_parts = []
+
+        if artist_data.get('followers_count'):
+            followers = artist_data['followers_count']
+            stats_parts.append(f"👥 {followers:,} followers")
+
+        if artist_data.get('iq'):
+            iq = artist_data['iq']
+            stats_parts.append(f"🧠 {iq:,} IQ")
+
+        if stats_parts:
+            text += " • ".join(stats_parts) + "\n\n"
+
+    if artist_data.get('songs'):
+        text += "🔥 <b>Popular songs:</b>\n"
+        for i, song in enumerate(artist_data['songs'], 1):
+            song_title = html.quote(song['title'])
+            song_url = song['url']
+
+            extra_info = ""
+            if song.get('release_date'):
+                extra_info = f" ({song['release_date']})"
+
+            text += f"{i}. <a href='{song_url}'>{song_title}</a>{extra_info}\n"
+        text += "\n"
+
+    if config.get('genius.include_social_links', True):
+        socials = []
+        if artist_data.get('instagram'):
+            socials.append(f"📸 <a href='https://instagram.com/{artist_data['instagram']}'>Instagram</a>")
+        if artist_data.get('twitter'):
+            socials.append(f"🐦 <a href='https://twitter.com/{artist_data['twitter']}'>Twitter</a>")
+        if artist_data.get('facebook'):
+            socials.append(f"👥 <a href='https://facebook.com/{artist_data['facebook']}'>Facebook</a>")
+
+        if socials:
+            text += " • ".join(socials) + "\n\n"
+
+    text += f"🔗 <a href='{artist_data['url']}'>View full profile on Genius</a>"
+    return text
+
+
+async def send_artist_card(message: types.Message, card: ArtistCard,
+                           status_msg: Optional[types.Message] = None) -> Optional[str]:
+    """Send ``card``, replacing ``status_msg``; returns the photo's Telegram file_id."""
+    photo = card.photo
+    file_id = None
+
+    if photo and len(card.text) > 1024:
+        sent = await message.answer_photo(photo=photo)
+        file_id = sent.photo[-1].file_id
+    elif photo:
+        try:
+            sent = await message.answer_photo(photo=photo, caption=card.text)
+            if status_msg is not None:
+                await status_msg.delete()
+            return sent.photo[-1].file_id
+        except Exception as e:
+            logger.warning(f"Failed to send photo: {e}")
+
+    if status_msg is not None:
+        await status_msg.edit_text(card.text, disable_web_page_preview=False)
+    else:
+        await message.answer(card.text, disable_web_page_preview=False)
+    return file_id
+
+
+async def send_and_remember_photo(message: types.Message, card: ArtistCard,
+                                  card_cache: Optional[ArtistCardCache],
+                                  status_msg: Optional[types.Message] = None) -> None:
+    file_id = await send_artist_card(message, card, status_msg)
+
+    if card_cache is not None and file_id and file_id != card.photo_file_id:
+        async for session in get_session():
+            await card_cache.set_photo(session, card, file_id)
+
+
 @router.message(Command("artist"))
 async def artist_handler(message: types.Message):
 
@@ -108,6 +219,20 @@ async def artist_handler(message: types.Message):
     artist_name = command_parts[1].strip()
     logger.info(f"User {message.from_user.id} requested artist info: {artist_name}")
 
+    card_cache = get_artist_card_cache()
+    card = None
+    if card_cache is not None:
+        async for session in get_session():
+            card = await card_cache.get(session, artist_name)
+
+    if card is not None:
+        logger.info(f"Artist card for '{artist_name}' served from cache")
+        if not card.found:
+            await message.answer(config.get_message('artist.not_found', artist=html.quote(artist_name)))
+            return
+        await send_and_remember_photo(message, card, card_cache)
+        return
+
     genius = get_genius_client()
 
     if not genius.is_available():
@@ -116,101 +241,50 @@ async def artist_handler(message: types.Message):
         logger.error("Genius API not available - check GENIUS_API_TOKEN")
         return
 
+    if not get_circuit_breaker('genius').allows_requests():
+        text = config.get_message('artist.api_down')
+        await message.answer(text)
+        logger.warning("Genius API is failing, circuit open")
+        return
+
     status_msg = await message.answer(
         config.get_message('artist.searching', artist=html.quote(artist_name))
     )
 
     try:
-        artist_data = genius.search_artist(artist_name)
+        primary_artist = await genius.find_artist(artist_name)
 
-        if not artist_data:
+        if not primary_artist:
+            if card_cache is not None:
+                async for session in get_session():
+                    await card_cache.put(session, artist_name, ArtistCard())
             text = config.get_message('artist.not_found', artist=html.quote(artist_name))
             await status_msg.edit_text(text)
             logger.warning(f"Artist not found: {artist_name}")
             return
 
-        text = f"🎤 <b>{html.quote(artist_data['name'])}</b>\n"
+        if card_cache is not None:
+            # Another spelling may already have fetched this artist
+            async for session in get_session():
+                card = await card_cache.get_by_id(session, primary_artist['id'])
+                if card is not None:
+                    await card_cache.put(session, artist_name, card)
 
-        if config.get('genius.include_alternate_names', True) and artist_data.get('alternate_names'):
-            alt_names = ", ".join(artist_data['alternate_names'])
-            text += f"<i>Also known as: {html.quote(alt_names)}</i>\n"
+        if card is None:
+            artist_data = await genius.fetch_artist(primary_artist)
+            card = ArtistCard(primary_artist['id'], artist_data, render_artist_card(artist_data))
 
-        text += "\n"
+            # A partial card (details or songs failed) is shown but not kept
+            if card_cache is not None and artist_data['complete']:
+                async for session in get_session():
+                    await card_cache.put(session, artist_name, card)
 
-        if artist_data.get('description'):
-            desc = artist_data['description'].strip()
-            max_length = config.genius_max_description_length
-
-            if len(desc) > max_length:
-                desc_short = desc[:max_length]
-                last_period = desc_short.rfind('.')
-                if last_period > 0:
-                    desc = desc[:last_period + 1]
-                else:
-                    desc = desc[:max_length - 3] + "..."
-
-            text += f"📖 <b>About:</b>\n{html.quote(desc)}\n\n"
-
-        if config.get('genius.include_stats', True):
-            stats_parts = []
-
-            if artist_data.get('followers_count'):
-                followers = artist_data['followers_count']
-                stats_parts.append(f"👥 {followers:,} followers")
-
-            if artist_data.get('iq'):
-                iq = artist_data['iq']
-                stats_parts.append(f"🧠 {iq:,} IQ")
-
-            if stats_parts:
-                text += " • ".join(stats_parts) + "\n\n"
-
-        if artist_data.get('songs'):
-            text += "🔥 <b>Popular songs:</b>\n"
-            for i, song in enumerate(artist_data['songs'], 1):
-                song_title = html.quote(song['title'])
-                song_url = song['url']
-
-                extra_info = ""
-                if song.get('release_date'):
-                    extra_info = f" ({song['release_date']})"
-
-                text += f"{i}. <a href='{song_url}'>{song_title}</a>{extra_info}\n"
-            text += "\n"
-
-        if config.get('genius.include_social_links', True):
-            socials = []
-            if artist_data.get('instagram'):
-                socials.append(f"📸 <a href='https://instagram.com/{artist_data['instagram']}'>Instagram</a>")
-            if artist_data.get('twitter'):
-                socials.append(f"🐦 <a href='https://twitter.com/{artist_data['twitter']}'>Twitter</a>")
-            if artist_data.get('facebook'):
-                socials.append(f"👥 <a href='https://facebook.com/{artist_data['facebook']}'>Facebook</a>")
-
-            if socials:
-                text += " • ".join(socials) + "\n\n"
-
-        text += f"🔗 <a href='{artist_data['url']}'>View full profile on Genius</a>"
-
-        if len(text) > 1024:
-            if artist_data.get('image_url'):
-                await message.answer_photo(photo=artist_data['image_url'])
-            await status_msg.edit_text(text, disable_web_page_preview=False)
-        else:
-            if artist_data.get('image_url'):
-                try:
-                    await message.answer_photo(
-                        photo=artist_data['image_url'],
-                        caption=text
-                    )
-                    await status_msg.delete()
-                except Exception as e:
-                    logger.warning(f"Failed to send photo: {e}")
-                    await status_msg.edit_text(text)
-            else:
-                await status_msg.edit_text(text)
+        await send_and_remember_photo(message, card, card_cache, status_msg)
+        logger.info(f"Artist info sent successfully: {card.data['name']}")
 
-        logger.info(f"Artist info sent successfully: {artist_data['name']}")
+    except GeniusUnavailable as e:
+        logger.warning(f"Genius lookup for '{artist_name}' failed: {e}")
+        await status_msg.edit_text(config.get_message('artist.error'))
 
     except Exception as e:
         logger.error(f"Error in artist_handler: {e}", exc_info=True)
@@ -234,8 +308,43 @@ async def on_startup():
         logger.error(f"❌ Database initialization failed: {e}", exc_info=True)
         raise
 
+    async for session in get_session():
+        purged = await get_callback_store().purge_expired(session)
+        if purged:
+            logger.info(f"Purged {purged} expired callback tokens")
+
+        lookup_cache = get_lookup_cache()
+        if lookup_cache is not None:
+            purged = await lookup_cache.purge_expired(session)
+            if purged:
+                logger.info(f"Purged {purged} expired metadata lookups")
+
+        card_cache = get_artist_card_cache()
+        if card_cache is not None:
+            purged = await card_cache.purge_expired(session)
+            if purged:
+                logger.info(f"Purged {purged} expired artist cards")
+
+    # Listen before loading the index: changes other processes commit
+    # during the load reach it through the listener instead of being lost
+    if notify_enabled():
+        logger.info("🔧 Subscribing to catalog change notifications...")
+        await start_invalidation_listener()
+
+    if config.get('search.backend', 'like') == 'memory':
+        logger.info("🔧 Loading in-memory search index...")
+        await init_search_index()
+
+    await start_http_clients()
+
 
 async def on_shutdown():
+    await stop_invalidation_listener()
+    if await cancel_enrich_all():
+        logger.info("⏹ Enrichment stopped; /enrich_all resumes it")
+    await stop_enrichment_queue()
+    await close_http_clients()
+
     logger.info("🔧 Closing database connection...")
     try:
         await close_db()
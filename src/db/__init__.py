@@ -1,29 +1,50 @@
-from .models import Track, Base
+from .models import Track, Artist, Album, CatalogStats, Base
 from .session import get_session, init_db, close_db, engine
 from .crud import (
     add_track,
+    ingest_track,
+    ingest_tracks,
     search_tracks,
     get_track_by_id,
     get_track_by_file_id,
     get_albums_by_artist,
     get_tracks_by_album,
     get_all_artists,
-    get_stats
+    get_artists_page,
+    get_artist_by_id,
+    get_album_by_id,
+    get_albums_by_artist_id,
+    get_tracks_by_album_id,
+    get_tracks_by_artist_id,
+    get_stats,
+    rebuild_catalog_stats
 )
 
 __all__ = [
     'Track',
+    'Artist',
+    'Album',
+    'CatalogStats',
     'Base',
     'get_session',
     'init_db',
     'close_db',
     'engine',
     'add_track',
+    'ingest_track',
+    'ingest_tracks',
     'search_tracks',
     'get_track_by_id',
     'get_track_by_file_id',
     'get_albums_by_artist',
     'get_tracks_by_album',
     'get_all_artists',
-    'get_stats'
+    'get_artists_page',
+    'get_artist_by_id',
+    'get_album_by_id',
+    'get_albums_by_artist_id',
+    'get_tracks_by_album_id',
+    'get_tracks_by_artist_id',
+    'get_stats',
+    'rebuild_catalog_stats'
 ]
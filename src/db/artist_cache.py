@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import delete, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import ArtistCard as ArtistCardRow, ArtistQuery
+from utils.config import get_config
+from utils.lru import LRUCache
+from utils.logger import get_logger
+from utils.normalize import normalize_key
+
+logger = get_logger(__name__)
+
+
+class ArtistCard:
+    """A /artist reply: the Genius data, its rendered text and photo.
+
+    A card without ``genius_id`` is a remembered miss.
+    """
+
+    __slots__ = ('genius_id', 'data', 'text', 'photo_file_id', 'fetched_at')
+
+    def __init__(self, genius_id: Optional[int] = None, data: Optional[Dict[str, Any]] = None,
+                 text: Optional[str] = None, photo_file_id: Optional[str] = None,
+                 fetched_at: Optional[datetime] = None):
+        self.genius_id = genius_id
+        self.data = data
+        self.text = text
+        self.photo_file_id = photo_file_id
+        self.fetched_at = fetched_at or datetime.utcnow()
+
+    @property
+    def found(self) -> bool:
+        return self.genius_id is not None
+
+    @property
+    def photo(self) -> Optional[str]:
+        """What to send as the photo: the Telegram file_id once known, else the image URL."""
+        return self.photo_file_id or (self.data or {}).get('image_url')
+
+
+class ArtistCardCache:
+    """/artist replies kept in memory and in the artist_queries/artist_cards tables.
+
+    A query (normalized) maps to a Genius artist id, and the id to its
+    card, so different spellings that resolve to the same artist share
+    one card. Misses are remembered with their own (shorter) TTL. Both
+    tiers answer without calling Genius; the tables survive a restart.
+    """
+
+    def __init__(self, max_size: int = 500, found_ttl: float = 30 * 86400,
+                 not_found_ttl: float = 86400):
+        self._queries = LRUCache(max_size)
+        self._cards = LRUCache(max_size)
+        self.found_ttl = found_ttl
+        self.not_found_ttl = not_found_ttl
+
+    def _fresh(self, found: bool, at: datetime) -> bool:
+        ttl = self.found_ttl if found else self.not_found_ttl
+        return at >= datetime.utcnow() - timedelta(seconds=ttl)
+
+    async def get(self, session: AsyncSession, query: str) -> Optional[ArtistCard]:
+        """Cached reply for ``query``: a card, a miss (card.found is False) or None."""
+        key = normalize_key(query)
+
+        entry = self._queries.get(key)
+        if entry is None or not self._fresh(entry[0] is not None, entry[1]):
+            row = await session.get(ArtistQuery, key)
+            if row is None or not self._fresh(row.genius_id is not None, row.looked_up_at):
+                return None
+            entry = (row.genius_id, row.looked_up_at)
+            self._queries.set(key, entry)
+
+        genius_id, looked_up_at = entry
+        if genius_id is None:
+            return ArtistCard(fetched_at=looked_up_at)
+
+        return await self.get_by_id(session, genius_id)
+
+    async def get_by_id(self, session: AsyncSession, genius_id: int) -> Optional[ArtistCard]:
+        card = self._cards.get(genius_id)
+        if card is not None and self._fresh(True, card.fetched_at):
+            return card
+
+        row = await session.get(ArtistCardRow, genius_id)
+        if row is None or not self._fresh(True, row.fetched_at):
+            return None
+
+        card = ArtistCard(row.genius_id, row.data, row.text, row.photo_file_id, row.fetched_at)
+        self._cards.set(genius_id, card)
+        return card
+
+    async def put(self, session: AsyncSession, query: str, card: ArtistCard) -> None:
+        """Remember ``card`` (or a miss) as the reply to ``query``."""
+        key = normalize_key(query)
+        now = datetime.utcnow()
+
+        if card.found:
+            stmt = pg_insert(ArtistCardRow).values(
+                genius_id=card.genius_id,
+                data=card.data,
+                text=card.text,
+                photo_file_id=card.photo_file_id,
+                fetched_at=card.fetched_at
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ArtistCardRow.genius_id],
+                set_={
+                    'data': stmt.excluded.data,
+                    'text': stmt.excluded.text,
+                    'photo_file_id': stmt.excluded.photo_file_id,
+                    'fetched_at': stmt.excluded.fetched_at
+                }
+            )
+            await session.execute(stmt)
+            self._cards.set(card.genius_id, card)
+
+        stmt = pg_insert(ArtistQuery).values(query_key=key, genius_id=card.genius_id, looked_up_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ArtistQuery.query_key],
+            set_={'genius_id': stmt.excluded.genius_id, 'looked_up_at': stmt.excluded.looked_up_at}
+        )
+        await session.execute(stmt)
+        self._queries.set(key, (card.genius_id, now))
+
+    async def set_photo(self, session: AsyncSession, card: ArtistCard, file_id: str) -> None:
+        """Keep the Telegram file_id of a sent photo so it is not downloaded again."""
+        card.photo_file_id = file_id
+        await session.execute(
+            update(ArtistCardRow)
+            .where(ArtistCardRow.genius_id == card.genius_id)
+            .values(photo_file_id=file_id)
+        )
+
+    async def purge_expired(self, session: AsyncSession) -> int:
+        now = datetime.utcnow()
+        result = await session.execute(
+            delete(ArtistQuery).where(or_(
+                ArtistQuery.genius_id.isnot(None) & (ArtistQuery.looked_up_at < now - timedelta(seconds=self.found_ttl)),
+                ArtistQuery.genius_id.is_(None) & (ArtistQuery.looked_up_at < now - timedelta(seconds=self.not_found_ttl))
+            ))
+        )
+        purged = result.rowcount or 0
+
+        result = await session.execute(
+            delete(ArtistCardRow).where(ArtistCardRow.fetched_at < now - timedelta(seconds=self.found_ttl))
+        )
+        return purged + (result.rowcount or 0)
+
+    def stats(self) -> dict:
+        return self._cards.stats()
+
+
+_artist_card_cache: Optional[ArtistCardCache] = None
+
+
+def get_artist_card_cache() -> Optional[ArtistCardCache]:
+    global _artist_card_cache
+
+    config = get_config()
+    if not config.get('genius.card_cache', True):
+        return None
+
+    if _artist_card_cache is None:
+        _artist_card_cache = ArtistCardCache(
+            max_size=config.get('genius.card_cache_size', 500),
+            found_ttl=config.get('genius.found_ttl_days', 30) * 86400,
+            not_found_ttl=config.get('genius.not_found_ttl_days', 1) * 86400
+        )
+
+    return _artist_card_cache
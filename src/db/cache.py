@@ -0,0 +1,93 @@
+import functools
+from typing import Callable, Dict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils.config import get_config
+from utils.lru import LRUCache
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DIRTY_KEY = 'catalog_dirty'
+
+_MISSING = object()
+
+_catalog_version = 0
+_caches: Dict[str, LRUCache] = {}
+
+
+def catalog_version() -> int:
+    return _catalog_version
+
+
+def bump_catalog_version() -> int:
+    global _catalog_version
+    _catalog_version += 1
+    return _catalog_version
+
+
+def mark_catalog_changed(session) -> None:
+    """Bump the catalog version once the session's transaction commits."""
+    session.info[DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session: Session) -> None:
+    if session.info.pop(DIRTY_KEY, False):
+        bump_catalog_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(DIRTY_KEY, None)
+
+
+def cache_enabled() -> bool:
+    return bool(get_config().get('cache.enabled', False))
+
+
+def _get_cache(name: str) -> LRUCache:
+    cache = _caches.get(name)
+    if cache is None:
+        config = get_config()
+        size = config.get(f'cache.sizes.{name}', config.get('cache.max_entries', 512))
+        cache = _caches[name] = LRUCache(size)
+    return cache
+
+
+def cached_query(func: Callable) -> Callable:
+    """Cache an ``async def f(session, ...)`` read for the current catalog version.
+
+    Arguments after the session must be hashable. A result computed while
+    the version moved (a write committed mid-query) is not stored.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(session, *args, **kwargs):
+        if not cache_enabled():
+            return await func(session, *args, **kwargs)
+
+        cache = _get_cache(name)
+        version = _catalog_version
+        key = (version, args, tuple(sorted(kwargs.items())))
+
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = await func(session, *args, **kwargs)
+            if version == _catalog_version:
+                cache.set(key, result)
+
+        # Callers get their own list so they can't mutate the cached one
+        return list(result) if isinstance(result, list) else result
+
+    return wrapper
+
+
+def get_cache_stats() -> Dict[str, dict]:
+    return {name: cache.stats() for name, cache in sorted(_caches.items())}
+
+
+def clear_caches() -> None:
+    for cache in _caches.values():
+        cache.clear()
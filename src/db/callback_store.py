@@ -0,0 +1,109 @@
+import base64
+import hashlib
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import CallbackToken
+from utils.config import get_config
+from utils.lru import LRUCache
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def make_token(payload: str) -> str:
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+class CallbackStore:
+    """State for callback buttons that does not fit in 64 bytes of callback_data.
+
+    A payload is stored under a short token derived from its hash, so the
+    same payload always gets the same token and distinct payloads never
+    overwrite each other. Lookups hit a bounded LRU+TTL tier first and,
+    when ``persistent`` is set, fall back to the callback_tokens table so
+    buttons in old messages keep working after a restart.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = 86400,
+                 persistent: bool = True, persistent_ttl: float = 90 * 86400):
+        self._cache = LRUCache(max_size, ttl)
+        self.persistent = persistent
+        self.persistent_ttl = persistent_ttl
+
+    async def put(self, session: AsyncSession, payload: str) -> str:
+        token = make_token(payload)
+        self._cache.set(token, payload)
+
+        if self.persistent:
+            stmt = pg_insert(CallbackToken).values(
+                token=token,
+                payload=payload,
+                last_used_at=datetime.utcnow()
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[CallbackToken.token],
+                set_={'last_used_at': stmt.excluded.last_used_at}
+            )
+            await session.execute(stmt)
+
+        return token
+
+    async def get(self, session: AsyncSession, token: str) -> Optional[str]:
+        payload = self._cache.get(token)
+
+        if payload is None and self.persistent:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.persistent_ttl)
+            payload = await session.scalar(
+                select(CallbackToken.payload).where(
+                    CallbackToken.token == token,
+                    CallbackToken.last_used_at >= cutoff
+                )
+            )
+            if payload is not None:
+                self._cache.set(token, payload)
+
+        return payload
+
+    async def put_ids(self, session: AsyncSession, ids: List[int]) -> str:
+        return await self.put(session, ','.join(str(i) for i in ids))
+
+    async def get_ids(self, session: AsyncSession, token: str) -> Optional[List[int]]:
+        payload = await self.get(session, token)
+        if payload is None:
+            return None
+        return [int(i) for i in payload.split(',') if i]
+
+    async def purge_expired(self, session: AsyncSession) -> int:
+        if not self.persistent:
+            return 0
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.persistent_ttl)
+        result = await session.execute(
+            delete(CallbackToken).where(CallbackToken.last_used_at < cutoff)
+        )
+        return result.rowcount or 0
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+_callback_store: Optional[CallbackStore] = None
+
+
+def get_callback_store() -> CallbackStore:
+    global _callback_store
+
+    if _callback_store is None:
+        config = get_config()
+        _callback_store = CallbackStore(
+            max_size=config.get('callbacks.cache_size', 10000),
+            ttl=config.get('callbacks.ttl_hours', 24) * 3600,
+            persistent=config.get('callbacks.persistent', True),
+            persistent_ttl=config.get('callbacks.persistent_ttl_days', 90) * 86400
+        )
+
+    return _callback_store
@@ -1,11 +1,74 @@
-from typing import List, Optional
-from sqlalchemy import select, func, distinct
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Boolean, Integer, Text, cast, column, func, select, update, exists, literal_column, text, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
-from db.models import Track
+from db.models import Track, Artist, Album, CatalogStats
+from db.events import record_track_change
+from db.cache import cached_query, mark_catalog_changed
+from db.notify import publish_track_change, publish_track_changes
+from db.search_index import get_search_index
+from db.ranking import escape_like, like_patterns, popularity_weight, ranking_enabled
+from db import statements
+from utils.config import get_config
 from utils.logger import get_logger
+from utils.normalize import normalize_key
 
 logger = get_logger(__name__)
 
+
+def _artist_has_tracks():
+    return exists().where(Track.artist_id == Artist.artist_id)
+
+
+async def get_or_create_artist_id(session: AsyncSession, name: str) -> int:
+    name_key = normalize_key(name)
+
+    stmt = (
+        pg_insert(Artist)
+        .values(name=name, name_key=name_key)
+        .on_conflict_do_nothing(index_elements=[Artist.name_key])
+        .returning(Artist.artist_id)
+    )
+    artist_id = await session.scalar(stmt)
+
+    if artist_id is None:
+        artist_id = await session.scalar(
+            select(Artist.artist_id).where(Artist.name_key == name_key)
+        )
+
+    return artist_id
+
+
+async def get_or_create_album_id(session: AsyncSession, artist_id: int, title: str) -> int:
+    title_key = normalize_key(title)
+
+    stmt = (
+        pg_insert(Album)
+        .values(artist_id=artist_id, title=title, title_key=title_key)
+        .on_conflict_do_nothing(index_elements=[Album.artist_id, Album.title_key])
+        .returning(Album.album_id)
+    )
+    album_id = await session.scalar(stmt)
+
+    if album_id is None:
+        album_id = await session.scalar(
+            select(Album.album_id).where(Album.artist_id == artist_id, Album.title_key == title_key)
+        )
+
+    return album_id
+
+
+async def _sync_catalog_refs(session: AsyncSession, track: Track) -> None:
+    track.artist_id = await get_or_create_artist_id(session, track.artist)
+
+    if track.album:
+        track.album_id = await get_or_create_album_id(session, track.artist_id, track.album)
+    else:
+        track.album_id = None
+
+
 async def add_track(
     session: AsyncSession,
     title: str,
@@ -26,27 +89,197 @@ async def add_track(
         tags=tags
     )
 
+    await _sync_catalog_refs(session, track)
+
     session.add(track)
     await session.flush()
+    record_track_change(session, track)
+    mark_catalog_changed(session)
+    await publish_track_change(session, track)
 
     logger.info(f"Track added: {track.track_id} - {title} by {artist}")
     return track
 
 
+async def ingest_track(
+    session: AsyncSession,
+    title: str,
+    artist: str,
+    file_id: str,
+    album: Optional[str] = None,
+    genre: Optional[str] = None,
+    duration: Optional[int] = None,
+    tags: Optional[str] = None
+) -> Tuple[Track, bool]:
+    """Insert a track unless its file_id exists, in one round trip.
+
+    Returns ``(track, created)``; for a duplicate upload ``track`` is the
+    row already stored and nothing is changed.
+    """
+    params = {
+        'title': title,
+        'artist': artist,
+        'artist_key': normalize_key(artist),
+        'file_id': file_id,
+        'genre': genre,
+        'duration': duration,
+        'tags': tags,
+        'now': datetime.utcnow()
+    }
+    if album:
+        params.update(album=album, album_key=normalize_key(album))
+
+    result = await session.execute(statements.ingest_track(bool(album)), params)
+    track, created = result.one()
+
+    if created:
+        record_track_change(session, track)
+        mark_catalog_changed(session)
+        await publish_track_change(session, track)
+        logger.info(f"Track added: {track.track_id} - {title} by {artist}")
+    else:
+        logger.info(f"Duplicate upload of file {file_id}: track {track.track_id}")
+
+    return track, created
+
+
+async def _upsert_albums(
+    session: AsyncSession,
+    album_titles: Dict[Tuple[int, str], str],
+    now: datetime
+) -> Dict[Tuple[int, str], int]:
+    """Album ids keyed by ``(artist_id, title_key)``, creating missing albums in one statement."""
+    if not album_titles:
+        return {}
+
+    # Sorted so concurrent batches take row locks in the same order
+    album_rows = [
+        {'artist_id': artist_id, 'title': title, 'title_key': title_key, 'track_count': 0, 'created_at': now}
+        for (artist_id, title_key), title in sorted(album_titles.items())
+    ]
+    stmt = pg_insert(Album).values(album_rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Album.artist_id, Album.title_key],
+        set_={'title_key': stmt.excluded.title_key}
+    ).returning(Album.artist_id, Album.title_key, Album.album_id)
+    return {(artist_id, key): album_id for artist_id, key, album_id in (await session.execute(stmt)).all()}
+
+
+async def ingest_tracks(
+    session: AsyncSession,
+    items: List[dict]
+) -> List[Tuple[Track, bool]]:
+    """Batch version of ingest_track: one statement each for artists, albums and tracks.
+
+    ``items`` are dicts of ingest_track's keyword arguments. Returns
+    ``(track, created)`` in the order of ``items``.
+    """
+    if not items:
+        return []
+
+    now = datetime.utcnow()
+    existing = await get_tracks_by_file_ids(session, [item['file_id'] for item in items])
+
+    new_items = {}
+    for item in items:
+        if item['file_id'] not in existing:
+            new_items.setdefault(item['file_id'], item)
+
+    created = {}
+    if new_items:
+        # Sorted so concurrent batches take row locks in the same order
+        artist_names = {}
+        for item in new_items.values():
+            artist_names.setdefault(normalize_key(item['artist']), item['artist'])
+
+        artist_rows = [
+            {'name': name, 'name_key': key, 'track_count': 0, 'album_count': 0, 'created_at': now}
+            for key, name in sorted(artist_names.items())
+        ]
+        stmt = pg_insert(Artist).values(artist_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Artist.name_key],
+            set_={'name_key': stmt.excluded.name_key}
+        ).returning(Artist.name_key, Artist.artist_id)
+        artist_ids = dict((await session.execute(stmt)).all())
+
+        album_titles = {}
+        for item in new_items.values():
+            if item.get('album'):
+                key = (artist_ids[normalize_key(item['artist'])], normalize_key(item['album']))
+                album_titles.setdefault(key, item['album'])
+
+        album_ids = await _upsert_albums(session, album_titles, now)
+
+        track_rows = []
+        for file_id, item in new_items.items():
+            artist_id = artist_ids[normalize_key(item['artist'])]
+            album = item.get('album') or None
+            track_rows.append({
+                'title': item['title'],
+                'artist': item['artist'],
+                'album': album,
+                'telegram_file_id': file_id,
+                'artist_id': artist_id,
+                'album_id': album_ids[(artist_id, normalize_key(album))] if album else None,
+                'genre': item.get('genre'),
+                'duration': item.get('duration'),
+                'tags': item.get('tags'),
+                'play_count': 0,
+                'uploaded_at': now
+            })
+
+        inserted = literal_column('(tracks.xmax = 0)', Boolean).label('inserted')
+        stmt = pg_insert(Track).values(track_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Track.telegram_file_id],
+            set_={'file_id': stmt.excluded.file_id}
+        ).returning(*Track.__table__.columns, inserted)
+
+        result = await session.execute(select(Track, inserted).from_statement(stmt))
+        for track, was_inserted in result.all():
+            if was_inserted:
+                created[track.telegram_file_id] = track
+                record_track_change(session, track)
+            else:
+                # Uploaded by someone else since the duplicate check above
+                existing[track.telegram_file_id] = track
+
+        if created:
+            mark_catalog_changed(session)
+            await publish_track_changes(session, list(created.values()))
+
+    logger.info(f"Batch ingest: {len(created)} added, {len(items) - len(created)} duplicates")
+
+    # A file repeated within the batch counts as created only once
+    tracks = {**existing, **created}
+    results = []
+    for item in items:
+        is_new = created.pop(item['file_id'], None) is not None
+        results.append((tracks[item['file_id']], is_new))
+    return results
+
+
 async def search_tracks(
     session: AsyncSession,
     query: str,
-    limit: int = 5
+    limit: int = 5,
+    ranked: Optional[bool] = None
 ) -> List[Track]:
-    search_pattern = f"%{query.lower()}%"
+    if ranked is None:
+        ranked = ranking_enabled()
 
-    stmt = select(Track).where(
-        (func.lower(Track.title).like(search_pattern)) |
-        (func.lower(Track.artist).like(search_pattern)) |
-        (func.lower(Track.album).like(search_pattern))
-    ).limit(limit)
+    index = get_search_index()
+    if index is not None:
+        tracks = index.search(query, limit, ranked=ranked)
+        logger.info(f"Search '{query}' found {len(tracks)} tracks (in-memory index)")
+        return tracks
 
-    result = await session.execute(stmt)
+    weight = popularity_weight() if ranked else 0
+    params = like_patterns(query.lower())
+    params.update(limit=limit, weight=weight)
+
+    result = await session.execute(statements.search(bool(ranked), bool(weight)), params)
     tracks = result.scalars().all()
 
     logger.info(f"Search '{query}' found {len(tracks)} tracks")
@@ -57,8 +290,7 @@ async def get_track_by_id(
     session: AsyncSession,
     track_id: int
 ) -> Optional[Track]:
-    stmt = select(Track).where(Track.track_id == track_id)
-    result = await session.execute(stmt)
+    result = await session.execute(statements.track_by_id(), {'track_id': track_id})
     track = result.scalar_one_or_none()
 
     if track:
@@ -73,46 +305,45 @@ async def get_track_by_file_id(
     session: AsyncSession,
     file_id: str
 ) -> Optional[Track]:
-    stmt = select(Track).where(Track.telegram_file_id == file_id)
-    result = await session.execute(stmt)
+    result = await session.execute(statements.track_by_file_id(), {'file_id': file_id})
     return result.scalar_one_or_none()
 
 
+@cached_query
 async def get_albums_by_artist(
     session: AsyncSession,
     artist: str
-) -> List[str]:
-    stmt = select(distinct(Track.album)).where(
-        func.lower(Track.artist).like(f"%{artist.lower()}%"),
-        Track.album.isnot(None)
-    ).order_by(Track.album)
+) -> List[Album]:
+    index = get_search_index()
+    if index is not None:
+        albums = index.albums_by_artist(artist)
+        logger.info(f"Found {len(albums)} albums for artist: {artist} (in-memory index)")
+        return albums
 
-    result = await session.execute(stmt)
-    albums = [album for album in result.scalars().all() if album]
+    result = await session.execute(statements.albums_by_artist(), like_patterns(artist.lower()))
+    albums = list(result.scalars().all())
 
     logger.info(f"Found {len(albums)} albums for artist: {artist}")
     return albums
 
 
+@cached_query
 async def get_tracks_by_album(
     session: AsyncSession,
     artist: str,
     album: str
 ) -> List[Track]:
-    stmt = select(Track).where(
-        func.lower(Track.artist).like(f"%{artist.lower()}%"),
-        Track.album == album
-    ).order_by(Track.title)
-
-    result = await session.execute(stmt)
+    params = {'artist_key': normalize_key(artist), 'album_key': normalize_key(album)}
+    result = await session.execute(statements.tracks_by_album(), params)
     tracks = result.scalars().all()
 
     logger.info(f"Found {len(tracks)} tracks in album '{album}' by {artist}")
     return list(tracks)
 
 
-async def get_all_artists(session: AsyncSession) -> List[str]:
-    stmt = select(distinct(Track.artist)).order_by(Track.artist)
+@cached_query
+async def get_all_artists(session: AsyncSession) -> List[Artist]:
+    stmt = select(Artist).where(_artist_has_tracks()).order_by(Artist.name)
     result = await session.execute(stmt)
     artists = result.scalars().all()
 
@@ -120,6 +351,236 @@ async def get_all_artists(session: AsyncSession) -> List[str]:
     return list(artists)
 
 
+def _has_browsable_artist(name_key: str, before: bool):
+    bound = Artist.name_key < name_key if before else Artist.name_key > name_key
+    return select(exists().where(Artist.track_count > 0, bound))
+
+
+@cached_query
+async def get_artists_page(
+    session: AsyncSession,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    start: Optional[str] = None,
+    limit: int = 10
+) -> dict:
+    """One page of artists with tracks, ordered by name_key.
+
+    Keyset pagination: the page starts after ``after_id``, ends before
+    ``before_id`` or starts at the first key >= ``start``. The cursor's
+    key is looked up by primary key inside the same statement, so a page
+    costs an index range scan regardless of its position in the library.
+    """
+    stmt = select(Artist).where(Artist.track_count > 0)
+    cursor_id = before_id if before_id is not None else after_id
+
+    if cursor_id is not None:
+        cursor_key = select(Artist.name_key).where(Artist.artist_id == cursor_id).scalar_subquery()
+
+    if before_id is not None:
+        stmt = stmt.where(Artist.name_key < cursor_key).order_by(Artist.name_key.desc())
+    else:
+        if after_id is not None:
+            stmt = stmt.where(Artist.name_key > cursor_key)
+        elif start:
+            stmt = stmt.where(Artist.name_key >= start)
+        stmt = stmt.order_by(Artist.name_key)
+
+    result = await session.execute(stmt.limit(limit + 1))
+    artists = list(result.scalars().all())
+    has_more = len(artists) > limit
+    artists = artists[:limit]
+
+    if before_id is not None:
+        if not artists:
+            return await get_artists_page(session, limit=limit)
+        artists.reverse()
+
+    has_prev = has_next = False
+    if artists:
+        if before_id is not None:
+            has_prev = has_more
+            has_next = await session.scalar(_has_browsable_artist(artists[-1].name_key, before=False))
+        else:
+            has_next = has_more
+            has_prev = await session.scalar(_has_browsable_artist(artists[0].name_key, before=True))
+
+    total = await session.scalar(select(CatalogStats.unique_artists).where(CatalogStats.id == 1))
+
+    return {
+        'artists': artists,
+        'has_prev': bool(has_prev),
+        'has_next': bool(has_next),
+        'total': total or 0
+    }
+
+
+async def get_artist_by_id(
+    session: AsyncSession,
+    artist_id: int
+) -> Optional[Artist]:
+    return await session.get(Artist, artist_id)
+
+
+async def get_artist_by_name(
+    session: AsyncSession,
+    name: str
+) -> Optional[Artist]:
+    stmt = select(Artist).where(Artist.name_key == normalize_key(name))
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def get_artist_by_name_prefix(
+    session: AsyncSession,
+    prefix: str
+) -> Optional[Artist]:
+    """Artist whose name starts with ``prefix``, if exactly one does.
+
+    Resolves buttons from before artists had ids, which carry a truncated
+    name. An exact key match wins over prefix matches.
+    """
+    key = normalize_key(prefix)
+    if not key:
+        return None
+
+    stmt = (
+        select(Artist)
+        .where(Artist.name_key.like(f"{escape_like(key)}%", escape='\\'))
+        .order_by(Artist.name_key != key, Artist.name_key)
+        .limit(2)
+    )
+    result = await session.execute(stmt)
+    artists = list(result.scalars().all())
+
+    if artists and (len(artists) == 1 or artists[0].name_key == key):
+        return artists[0]
+    return None
+
+
+async def get_artists_by_ids(
+    session: AsyncSession,
+    artist_ids: List[int]
+) -> List[Artist]:
+    stmt = select(Artist).where(Artist.artist_id.in_(artist_ids)).order_by(Artist.name)
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def get_album_by_id(
+    session: AsyncSession,
+    album_id: int
+) -> Optional[Album]:
+    return await session.get(Album, album_id)
+
+
+async def get_album_by_title(
+    session: AsyncSession,
+    artist_id: int,
+    title: str
+) -> Optional[Album]:
+    stmt = select(Album).where(
+        Album.artist_id == artist_id,
+        Album.title_key == normalize_key(title)
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def get_album_by_title_prefix(
+    session: AsyncSession,
+    artist_id: int,
+    prefix: str
+) -> Optional[Album]:
+    key = normalize_key(prefix)
+    if not key:
+        return None
+
+    stmt = (
+        select(Album)
+        .where(
+            Album.artist_id == artist_id,
+            Album.title_key.like(f"{escape_like(key)}%", escape='\\')
+        )
+        .order_by(Album.title_key != key, Album.title_key)
+        .limit(2)
+    )
+    result = await session.execute(stmt)
+    albums = list(result.scalars().all())
+
+    if albums and (len(albums) == 1 or albums[0].title_key == key):
+        return albums[0]
+    return None
+
+
+@cached_query
+async def get_albums_by_artist_id(
+    session: AsyncSession,
+    artist_id: int
+) -> List[Album]:
+    result = await session.execute(statements.albums_by_artist_id(), {'artist_id': artist_id})
+    albums = result.scalars().all()
+
+    logger.info(f"Found {len(albums)} albums for artist {artist_id}")
+    return list(albums)
+
+
+@cached_query
+async def get_tracks_by_album_id(
+    session: AsyncSession,
+    album_id: int
+) -> List[Track]:
+    result = await session.execute(statements.tracks_by_album_id(), {'album_id': album_id})
+    tracks = result.scalars().all()
+
+    logger.info(f"Found {len(tracks)} tracks in album {album_id}")
+    return list(tracks)
+
+
+@cached_query
+async def get_tracks_by_artist_id(
+    session: AsyncSession,
+    artist_id: int,
+    limit: int = 100
+) -> List[Track]:
+    stmt = (
+        select(Track)
+        .where(Track.artist_id == artist_id)
+        .order_by(Track.album, Track.title)
+        .limit(limit)
+    )
+
+    result = await session.execute(stmt)
+    tracks = result.scalars().all()
+
+    logger.info(f"Found {len(tracks)} tracks for artist {artist_id}")
+    return list(tracks)
+
+
+async def get_tracks_by_ids(
+    session: AsyncSession,
+    track_ids: List[int]
+) -> List[Track]:
+    if not track_ids:
+        return []
+
+    result = await session.execute(select(Track).where(Track.track_id.in_(track_ids)))
+    by_id = {track.track_id: track for track in result.scalars().all()}
+
+    return [by_id[track_id] for track_id in track_ids if track_id in by_id]
+
+
+async def get_tracks_by_file_ids(
+    session: AsyncSession,
+    file_ids: List[str]
+) -> Dict[str, Track]:
+    if not file_ids:
+        return {}
+
+    result = await session.execute(select(Track).where(Track.telegram_file_id.in_(set(file_ids))))
+    return {track.telegram_file_id: track for track in result.scalars().all()}
+
+
 async def get_tracks_without_album(
     session: AsyncSession,
     limit: int = 100
@@ -138,6 +599,23 @@ async def get_tracks_without_album(
     return list(tracks)
 
 
+async def get_tracks_without_album_after(
+    session: AsyncSession,
+    after_track_id: int = 0,
+    limit: int = 200
+) -> List[Track]:
+    """Next page of tracks without an album, in track_id order (keyset pagination)."""
+    stmt = (
+        select(Track)
+        .where(Track.album.is_(None), Track.track_id > after_track_id)
+        .order_by(Track.track_id)
+        .limit(limit)
+    )
+
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
 async def get_tracks_by_artist_without_album(
     session: AsyncSession,
     artist: str,
@@ -145,8 +623,9 @@ async def get_tracks_by_artist_without_album(
 ) -> List[Track]:
     stmt = (
         select(Track)
+        .join(Artist, Artist.artist_id == Track.artist_id)
         .where(
-            func.lower(Track.artist).like(f"%{artist.lower()}%"),
+            Artist.name_key == normalize_key(artist),
             Track.album.is_(None)
         )
         .order_by(Track.uploaded_at.desc())
@@ -169,7 +648,11 @@ async def update_track_album(
 
     if track:
         track.album = album
+        await _sync_catalog_refs(session, track)
         await session.flush()
+        record_track_change(session, track)
+        mark_catalog_changed(session)
+        await publish_track_change(session, track)
         logger.info(f"Updated album for track {track_id}: {album}")
         return track
 
@@ -177,6 +660,91 @@ async def update_track_album(
     return None
 
 
+async def set_tracks_metadata(
+    session: AsyncSession,
+    metadata: Dict[int, dict]
+) -> List[Track]:
+    """Store lookup results (see fetch_metadata()) for many tracks at once.
+
+    ``metadata`` maps track ids to their lookup result. Only tracks still
+    without an album are updated, and only their empty fields are filled,
+    so a genre or duration already on a track is kept. Albums are created
+    in one statement and the tracks are updated with a single
+    ``UPDATE ... FROM (VALUES ...)``. Returns the updated tracks.
+    """
+    metadata = {track_id: fields for track_id, fields in metadata.items() if fields and fields.get('album')}
+    if not metadata:
+        return []
+
+    result = await session.execute(
+        select(Track.track_id, Track.artist_id).where(Track.track_id.in_(metadata), Track.artist_id.isnot(None))
+    )
+    artist_ids = dict(result.all())
+
+    album_titles = {}
+    for track_id, artist_id in artist_ids.items():
+        album = metadata[track_id]['album']
+        album_titles.setdefault((artist_id, normalize_key(album)), album)
+    album_ids = await _upsert_albums(session, album_titles, datetime.utcnow())
+    store_genre = get_config().get('metadata.auto_fetch_genre', True)
+
+    rows = values(
+        column('track_id', Integer),
+        column('album', Text),
+        column('album_id', Integer),
+        column('year', Integer),
+        column('genre', Text),
+        column('duration', Integer),
+        column('mb_recording_id', Text),
+        column('mb_release_id', Text),
+        name='v'
+    ).data([
+        (
+            track_id,
+            metadata[track_id]['album'],
+            album_ids[(artist_id, normalize_key(metadata[track_id]['album']))],
+            metadata[track_id].get('year'),
+            metadata[track_id].get('genre') if store_genre else None,
+            metadata[track_id].get('duration'),
+            metadata[track_id].get('mb_recording_id'),
+            metadata[track_id].get('mb_release_id')
+        )
+        for track_id, artist_id in artist_ids.items()
+    ])
+
+    tracks = Track.__table__.c
+
+    def fill(name: str, type_):
+        return func.coalesce(tracks[name], cast(rows.c[name], type_))
+
+    stmt = (
+        update(Track.__table__)
+        .where(tracks.track_id == rows.c.track_id, tracks.album.is_(None))
+        .values(
+            album=cast(rows.c.album, Text),
+            album_id=cast(rows.c.album_id, Integer),
+            year=fill('year', Integer),
+            genre=fill('genre', Text),
+            duration=fill('duration', Integer),
+            mb_recording_id=fill('mb_recording_id', Text),
+            mb_release_id=fill('mb_release_id', Text)
+        )
+        .returning(*Track.__table__.columns)
+    )
+
+    result = await session.execute(select(Track).from_statement(stmt).execution_options(populate_existing=True))
+    updated = list(result.scalars().all())
+
+    for track in updated:
+        record_track_change(session, track)
+    if updated:
+        mark_catalog_changed(session)
+        await publish_track_changes(session, updated)
+
+    logger.info(f"Batch metadata update: {len(updated)}/{len(metadata)} tracks updated")
+    return updated
+
+
 async def update_track_metadata(
     session: AsyncSession,
     track_id: int,
@@ -193,7 +761,13 @@ async def update_track_metadata(
                 setattr(track, key, value)
                 updated_fields.append(key)
 
+        if 'artist' in updated_fields or 'album' in updated_fields:
+            await _sync_catalog_refs(session, track)
+
         await session.flush()
+        record_track_change(session, track)
+        mark_catalog_changed(session)
+        await publish_track_change(session, track)
         logger.info(f"Updated track {track_id}: {', '.join(updated_fields)}")
         return track
 
@@ -202,44 +776,56 @@ async def update_track_metadata(
 
 
 async def get_stats(session: AsyncSession) -> dict:
-    total_tracks_stmt = select(func.count(Track.track_id))
-    total_tracks = await session.scalar(total_tracks_stmt)
+    stats = await session.get(CatalogStats, 1)
 
-    unique_artists_stmt = select(func.count(distinct(Track.artist)))
-    unique_artists = await session.scalar(unique_artists_stmt)
+    if stats is None:
+        logger.warning("catalog_stats row is missing, rebuilding")
+        stats = await rebuild_catalog_stats(session)
 
-    unique_albums_stmt = select(func.count(distinct(Track.album))).where(
-        Track.album.isnot(None)
-    )
-    unique_albums = await session.scalar(unique_albums_stmt)
+    last_upload = stats.last_upload
 
-    genres_stmt = select(func.count(distinct(Track.genre))).where(
-        Track.genre.isnot(None)
-    )
-    genres_count = await session.scalar(genres_stmt)
+    return {
+        'total_tracks': stats.total_tracks,
+        'unique_artists': stats.unique_artists,
+        'unique_albums': stats.unique_albums,
+        'genres_count': stats.genres_count,
+        'tracks_without_album': stats.tracks_without_album,
+        'last_upload': last_upload.strftime('%Y-%m-%d %H:%M') if last_upload else 'Never'
+    }
+
+
+async def rebuild_catalog_stats(session: AsyncSession) -> CatalogStats:
+    """Recompute catalog_stats, genre_counts and the per-artist/album counters."""
+    await session.execute(text("SELECT rebuild_catalog_stats()"))
+    mark_catalog_changed(session)
+    stats = await session.get(CatalogStats, 1, populate_existing=True)
 
-    last_upload_stmt = select(func.max(Track.uploaded_at))
-    last_upload = await session.scalar(last_upload_stmt)
+    logger.info(f"Catalog stats rebuilt: {stats.total_tracks} tracks, {stats.unique_artists} artists")
+    return stats
 
-    tracks_without_album_stmt = select(func.count(Track.track_id)).where(
-        Track.album.is_(None)
+
+async def increment_play_count(
+    session: AsyncSession,
+    track: Track
+) -> int:
+    stmt = (
+        update(Track)
+        .where(Track.track_id == track.track_id)
+        .values(play_count=Track.play_count + 1)
+        .returning(Track.play_count)
     )
-    tracks_without_album = await session.scalar(tracks_without_album_stmt)
+    play_count = await session.scalar(stmt)
 
-    return {
-        'total_tracks': total_tracks or 0,
-        'unique_artists': unique_artists or 0,
-        'unique_albums': unique_albums or 0,
-        'genres_count': genres_count or 0,
-        'tracks_without_album': tracks_without_album or 0,
-        'last_upload': last_upload.strftime('%Y-%m-%d %H:%M') if last_upload else 'Never'
-    }
+    if play_count is not None:
+        set_committed_value(track, 'play_count', play_count)
+        record_track_change(session, track)
+
+    return play_count or 0
 
 
 async def count_tracks_without_album(session: AsyncSession) -> int:
-    stmt = select(func.count(Track.track_id)).where(Track.album.is_(None))
-    result = await session.execute(stmt)
-    count = result.scalar() or 0
+    stmt = select(CatalogStats.tracks_without_album).where(CatalogStats.id == 1)
+    count = await session.scalar(stmt) or 0
 
     logger.info(f"Tracks without album: {count}")
     return count
@@ -0,0 +1,228 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.crud import get_tracks_without_album_after, set_tracks_metadata
+from db.lookup_cache import lookup_key, lookup_metadata_with_failures
+from db.models import EnrichmentCheckpoint, Track
+from db.session import get_session
+from utils.circuit_breaker import get_circuit_breaker
+from utils.config import get_config
+from utils.logger import get_logger
+from utils.musicbrainz_offline import offline_only
+
+logger = get_logger(__name__)
+
+ENRICH_ALL = 'enrich_all'
+
+RUNNING = 'running'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+DONE = 'done'
+
+UNKNOWN_ARTISTS = {'unknown artist', 'unknown'}
+
+COUNTERS = ('processed', 'updated', 'not_found', 'failed', 'skipped')
+
+ProgressCallback = Callable[[dict], Awaitable[None]]
+
+_task: Optional[asyncio.Task] = None
+
+
+async def get_checkpoint(session: AsyncSession, name: str = ENRICH_ALL) -> Optional[EnrichmentCheckpoint]:
+    return await session.get(EnrichmentCheckpoint, name)
+
+
+async def _save_checkpoint(session: AsyncSession, progress: dict) -> None:
+    row = {
+        'name': ENRICH_ALL,
+        'status': progress['status'],
+        'last_track_id': progress['last_track_id'],
+        'started_at': progress['started_at'],
+        'updated_at': datetime.utcnow(),
+        **{counter: progress[counter] for counter in COUNTERS}
+    }
+    stmt = pg_insert(EnrichmentCheckpoint).values(row)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EnrichmentCheckpoint.name],
+        set_={key: value for key, value in row.items() if key != 'name'}
+    )
+    await session.execute(stmt)
+
+
+async def _wait_for_provider() -> None:
+    """Sleep while no online provider would take a lookup."""
+    if offline_only():
+        return
+
+    breakers = [get_circuit_breaker('musicbrainz')]
+    if get_config().get('metadata.fallback_to_itunes', True):
+        breakers.append(get_circuit_breaker('itunes'))
+
+    while not any(breaker.allows_requests() for breaker in breakers):
+        await asyncio.sleep(max(1.0, min(breaker.stats()['retry_in'] for breaker in breakers)))
+
+
+async def _count_remaining(session: AsyncSession, after_track_id: int) -> int:
+    return await session.scalar(
+        select(func.count()).select_from(Track).where(Track.album.is_(None), Track.track_id > after_track_id)
+    ) or 0
+
+
+async def enrich_all(on_progress: Optional[ProgressCallback] = None, restart: bool = False) -> dict:
+    """Look up albums for every track without one, resuming from the last checkpoint.
+
+    Tracks are streamed in track_id order, ``metadata.enrich_chunk_size``
+    at a time. Each chunk's lookups run concurrently (the providers' rate
+    limiters and circuit breakers still apply) and its results are written
+    in one transaction together with the checkpoint, so a crash or
+    cancellation loses at most the chunk in flight - and its lookups are
+    already in the lookup cache. Lookups that fail (a provider error, not
+    a miss) are retried up to ``metadata.enrich_retries`` times once a
+    provider accepts requests again; the rest are counted as failed and
+    left without an album for a later /enrich_all restart.
+    ``restart`` ignores an unfinished run.
+    ``on_progress`` is called after every chunk and once more with the
+    final status.
+    """
+    config = get_config()
+    chunk_size = config.get('metadata.enrich_chunk_size', 200)
+    concurrency = config.get('metadata.enrich_concurrency', 4)
+    retries = config.get('metadata.enrich_retries', 3)
+
+    async for session in get_session():
+        checkpoint = await get_checkpoint(session)
+        resumed = checkpoint is not None and checkpoint.status != DONE and not restart
+
+        progress = {
+            'status': RUNNING,
+            'resumed': resumed,
+            'last_track_id': checkpoint.last_track_id if resumed else 0,
+            'started_at': checkpoint.started_at if resumed else datetime.utcnow(),
+            **{counter: getattr(checkpoint, counter) if resumed else 0 for counter in COUNTERS}
+        }
+        progress['remaining'] = await _count_remaining(session, progress['last_track_id'])
+        await _save_checkpoint(session, progress)
+
+    if resumed:
+        logger.info(f"Resuming enrichment after track {progress['last_track_id']}: {progress['remaining']} tracks left")
+    else:
+        logger.info(f"Starting enrichment: {progress['remaining']} tracks without album")
+
+    started = time.monotonic()
+    progress['run_processed'] = 0
+
+    try:
+        while True:
+            async for session in get_session():
+                tracks = await get_tracks_without_album_after(session, progress['last_track_id'], chunk_size)
+
+            if not tracks:
+                break
+
+            candidates = [track for track in tracks if track.artist.lower() not in UNKNOWN_ARTISTS]
+            pairs = {lookup_key(track.artist, track.title): (track.artist, track.title) for track in candidates}
+
+            # Waiting out an outage beats marking tracks as not found:
+            # lookups that failed are asked again once a provider recovers
+            await _wait_for_provider()
+            results, failed = await lookup_metadata_with_failures(pairs, concurrency=concurrency)
+            for attempt in range(retries):
+                if not failed:
+                    break
+                logger.info(f"Retrying {len(failed)} failed lookups (attempt {attempt + 1}/{retries})")
+                await _wait_for_provider()
+                retried, failed = await lookup_metadata_with_failures(
+                    {key: pairs[key] for key in failed}, concurrency=concurrency
+                )
+                results.update(retried)
+
+            found = {}
+            for track in candidates:
+                metadata = results[lookup_key(track.artist, track.title)]
+                if metadata:
+                    found[track.track_id] = metadata
+
+            skipped = len(tracks) - len(candidates)
+            failed_tracks = sum(1 for track in candidates if lookup_key(track.artist, track.title) in failed)
+
+            async for session in get_session():
+                updated = await set_tracks_metadata(session, found)
+                chunk = {
+                    'last_track_id': tracks[-1].track_id,
+                    'processed': progress['processed'] + len(tracks),
+                    'updated': progress['updated'] + len(updated),
+                    'not_found': progress['not_found'] + len(candidates) - len(found) - failed_tracks,
+                    'failed': progress['failed'] + failed_tracks,
+                    'skipped': progress['skipped'] + skipped
+                }
+                await _save_checkpoint(session, {**progress, **chunk})
+
+            progress.update(chunk)
+            progress['run_processed'] += len(tracks)
+            progress['remaining'] = max(0, progress['remaining'] - len(tracks))
+            progress['elapsed'] = time.monotonic() - started
+
+            if on_progress is not None:
+                await on_progress(progress)
+
+        progress['status'] = DONE
+    except asyncio.CancelledError:
+        progress['status'] = CANCELLED
+        raise
+    except Exception as e:
+        progress['status'] = FAILED
+        progress['error'] = str(e)
+        raise
+    finally:
+        progress['elapsed'] = time.monotonic() - started
+        try:
+            async for session in get_session():
+                await _save_checkpoint(session, progress)
+        except Exception as e:
+            logger.error(f"Could not save enrichment checkpoint: {e}")
+
+        logger.info(
+            f"Enrichment {progress['status']} after track {progress['last_track_id']}: "
+            f"{progress['updated']} updated, {progress['not_found']} not found, "
+            f"{progress['failed']} failed, {progress['skipped']} skipped"
+        )
+
+        if on_progress is not None:
+            try:
+                await on_progress(progress)
+            except Exception as e:
+                logger.error(f"Enrichment progress callback failed: {e}")
+
+    return progress
+
+
+def enrich_all_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def start_enrich_all(on_progress: Optional[ProgressCallback] = None, restart: bool = False) -> asyncio.Task:
+    """Run enrich_all() in the background; only one run at a time."""
+    global _task
+
+    if enrich_all_running():
+        raise RuntimeError("Enrichment is already running")
+
+    _task = asyncio.create_task(enrich_all(on_progress, restart=restart))
+    return _task
+
+
+async def cancel_enrich_all() -> bool:
+    """Stop the background run after checkpointing; False if none was running."""
+    if not enrich_all_running():
+        return False
+
+    _task.cancel()
+    try:
+        await _task
+    except (asyncio.CancelledError, Exception):
+        pass
+    return True
@@ -0,0 +1,168 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from db.crud import set_tracks_metadata
+from db.lookup_cache import LookupKey, lookup_key, lookup_metadata_with_failures
+from db.models import Track
+from db.session import get_session
+from utils.config import get_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+NOT_FOUND = 'not_found'
+FAILED = 'failed'
+
+# Called with the updated track and None, or with None and why there is
+# no album: NOT_FOUND, or FAILED when the lookup or the write failed
+EnrichmentCallback = Callable[[Optional[Track], Optional[str]], Awaitable[None]]
+
+
+class EnrichmentQueue:
+    """Background album lookups for freshly saved tracks.
+
+    Lookups are singleflight: a track whose artist and title are already
+    queued or being looked up joins that lookup instead of adding another.
+    When a lookup finishes, every waiting track gets its result (album,
+    year, genre, ...) in one update and its callback is called - also
+    when the lookup or the update failed. Lookups
+    still queued at shutdown are dropped; the tracks stay without an
+    album for /enrich_all to pick up.
+    """
+
+    def __init__(self, workers: int = 4, hedged: bool = True, deadline: Optional[float] = None):
+        self.workers = workers
+        self.hedged = hedged
+        self.deadline = deadline
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._waiters: Dict[LookupKey, List[Tuple[int, Optional[EnrichmentCallback]]]] = {}
+        self._names: Dict[LookupKey, Tuple[str, str]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.joined = 0
+        self.found = 0
+        self.not_found = 0
+        self.failed = 0
+
+    def submit(self, track_id: int, artist: str, title: str,
+               on_done: Optional[EnrichmentCallback] = None) -> None:
+        self._start()
+        self.submitted += 1
+
+        key = lookup_key(artist, title)
+        waiters = self._waiters.get(key)
+        if waiters is not None:
+            waiters.append((track_id, on_done))
+            self.joined += 1
+            return
+
+        self._waiters[key] = [(track_id, on_done)]
+        self._names[key] = (artist, title)
+        self._queue.put_nowait(key)
+
+    def _start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._queue.get()
+            try:
+                await self._process(key)
+            except Exception as e:
+                logger.error(f"Error enriching {key}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, key: LookupKey) -> None:
+        artist, title = self._names[key]
+        try:
+            results, failed = await lookup_metadata_with_failures(
+                {key: (artist, title)}, hedged=self.hedged, deadline=self.deadline
+            )
+        except Exception as e:
+            logger.error(f"Album lookup for {artist} - {title} failed: {e}", exc_info=True)
+            results, failed = {}, {key}
+        finally:
+            # Tracks submitted while the lookup ran are answered by it too
+            waiters = self._waiters.pop(key)
+            del self._names[key]
+
+        metadata = results.get(key)
+        tracks = {}
+        status = None
+
+        if key in failed:
+            status = FAILED
+        elif not metadata:
+            status = NOT_FOUND
+            logger.info(f"No album found for {artist} - {title}")
+        else:
+            try:
+                # The bulk fill-only write runs the same change hooks as
+                # update_track_metadata (search index, cache version, NOTIFY)
+                async for session in get_session():
+                    updated = await set_tracks_metadata(session, {track_id: metadata for track_id, _ in waiters})
+                tracks = {track.track_id: track for track in updated}
+            except Exception as e:
+                logger.error(f"Could not store metadata for {artist} - {title}: {e}", exc_info=True)
+                status = FAILED
+
+        if status == FAILED:
+            self.failed += len(waiters)
+        elif status == NOT_FOUND:
+            self.not_found += len(waiters)
+        else:
+            self.found += len(waiters)
+
+        for track_id, on_done in waiters:
+            if on_done is None:
+                continue
+            track = tracks.get(track_id)
+            try:
+                # A track given an album meanwhile (e.g. by hand) is left as it is
+                await on_done(track, None if track is not None else status or NOT_FOUND)
+            except Exception as e:
+                logger.warning(f"Enrichment callback for track {track_id} failed: {e}")
+
+    async def join(self) -> None:
+        """Wait until every submitted lookup has finished."""
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            'queued': self._queue.qsize(),
+            'in_flight': len(self._waiters) - self._queue.qsize(),
+            'submitted': self.submitted,
+            'joined': self.joined,
+            'found': self.found,
+            'not_found': self.not_found,
+            'failed': self.failed
+        }
+
+
+_enrichment_queue: Optional[EnrichmentQueue] = None
+
+
+def get_enrichment_queue() -> EnrichmentQueue:
+    global _enrichment_queue
+
+    if _enrichment_queue is None:
+        config = get_config()
+        _enrichment_queue = EnrichmentQueue(
+            workers=config.get('upload.enrich_workers', 4),
+            hedged=config.get('metadata.lookup_mode', 'hedged') == 'hedged',
+            deadline=config.get('metadata.lookup_deadline', 8)
+        )
+
+    return _enrichment_queue
+
+
+async def stop_enrichment_queue() -> None:
+    if _enrichment_queue is not None:
+        await _enrichment_queue.stop()
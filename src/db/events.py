@@ -0,0 +1,56 @@
+from typing import Callable, List
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHANGES_KEY = 'catalog_changes'
+
+_listeners: List[Callable[[list], None]] = []
+
+
+def add_change_listener(listener: Callable[[list], None]) -> None:
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_change_listener(listener: Callable[[list], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def record_track_change(session, track) -> None:
+    """Queue a written track for the change listeners.
+
+    Listeners only see the track once the surrounding transaction commits;
+    a rollback discards the queued changes.
+    """
+    session.info.setdefault(CHANGES_KEY, []).append(track)
+
+
+def dispatch_changes(tracks: list) -> None:
+    """Hand committed tracks to the listeners; also used for remote changes."""
+    for listener in list(_listeners):
+        try:
+            listener(tracks)
+        except Exception as e:
+            logger.error(f"Catalog change listener {listener.__name__} failed: {e}", exc_info=True)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session: Session) -> None:
+    changes = session.info.pop(CHANGES_KEY, None)
+    if not changes:
+        return
+
+    latest = {}
+    for track in changes:
+        latest[track.track_id] = track
+
+    dispatch_changes(list(latest.values()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(CHANGES_KEY, None)
@@ -0,0 +1,183 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import delete, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import MetadataLookup
+from utils.config import get_config
+from utils.logger import get_logger
+from utils.musicbrainz_api import METADATA_FIELDS, LookupFailed, fetch_metadata
+from utils.normalize import normalize_key
+
+logger = get_logger(__name__)
+
+LookupKey = Tuple[str, str]
+
+
+def lookup_key(artist: str, title: str) -> LookupKey:
+    return normalize_key(artist), normalize_key(title)
+
+
+class MetadataLookupCache:
+    """Lookup results (see fetch_metadata()) kept in the metadata_lookups table.
+
+    Misses are stored too, with their own (shorter) TTL, so tracks that
+    no provider knows are not asked about again on every /enrich_all.
+    Lookups that failed with a provider error are not stored.
+    """
+
+    def __init__(self, found_ttl: float = 90 * 86400, not_found_ttl: float = 7 * 86400):
+        self.found_ttl = found_ttl
+        self.not_found_ttl = not_found_ttl
+
+    async def get_many(self, session: AsyncSession, keys) -> Dict[LookupKey, Optional[Dict]]:
+        """Fresh entries for ``keys``; a key mapped to None is a cached miss."""
+        keys = list(set(keys))
+        if not keys:
+            return {}
+
+        now = datetime.utcnow()
+        result = await session.execute(
+            select(MetadataLookup).where(
+                tuple_(MetadataLookup.artist_key, MetadataLookup.title_key).in_(keys)
+            )
+        )
+
+        cached = {}
+        for entry in result.scalars().all():
+            ttl = self.found_ttl if entry.found else self.not_found_ttl
+            if entry.looked_up_at >= now - timedelta(seconds=ttl):
+                cached[(entry.artist_key, entry.title_key)] = (
+                    {field: getattr(entry, field) for field in METADATA_FIELDS} if entry.found else None
+                )
+        return cached
+
+    async def put_many(self, session: AsyncSession, results: Dict[LookupKey, Optional[Dict]]) -> None:
+        if not results:
+            return
+
+        now = datetime.utcnow()
+        stmt = pg_insert(MetadataLookup).values([
+            {
+                'artist_key': artist_key,
+                'title_key': title_key,
+                **{field: (metadata or {}).get(field) for field in METADATA_FIELDS},
+                'found': metadata is not None,
+                'looked_up_at': now
+            }
+            for (artist_key, title_key), metadata in sorted(results.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MetadataLookup.artist_key, MetadataLookup.title_key],
+            set_={
+                **{field: stmt.excluded[field] for field in METADATA_FIELDS},
+                'found': stmt.excluded.found,
+                'looked_up_at': stmt.excluded.looked_up_at
+            }
+        )
+        await session.execute(stmt)
+
+    async def forget(self, session: AsyncSession, artist: Optional[str] = None,
+                     misses_only: bool = False) -> int:
+        """Drop entries so they are looked up again; all of them unless narrowed."""
+        stmt = delete(MetadataLookup)
+        if artist is not None:
+            stmt = stmt.where(MetadataLookup.artist_key == normalize_key(artist))
+        if misses_only:
+            stmt = stmt.where(MetadataLookup.found.is_(False))
+
+        result = await session.execute(stmt)
+        return result.rowcount or 0
+
+    async def purge_expired(self, session: AsyncSession) -> int:
+        now = datetime.utcnow()
+        result = await session.execute(
+            delete(MetadataLookup).where(or_(
+                MetadataLookup.found.is_(True) & (MetadataLookup.looked_up_at < now - timedelta(seconds=self.found_ttl)),
+                MetadataLookup.found.is_(False) & (MetadataLookup.looked_up_at < now - timedelta(seconds=self.not_found_ttl))
+            ))
+        )
+        return result.rowcount or 0
+
+
+_lookup_cache: Optional[MetadataLookupCache] = None
+
+
+def get_lookup_cache() -> Optional[MetadataLookupCache]:
+    global _lookup_cache
+
+    config = get_config()
+    if not config.get('metadata.lookup_cache', True):
+        return None
+
+    if _lookup_cache is None:
+        _lookup_cache = MetadataLookupCache(
+            found_ttl=config.get('metadata.found_ttl_days', 90) * 86400,
+            not_found_ttl=config.get('metadata.not_found_ttl_days', 7) * 86400
+        )
+
+    return _lookup_cache
+
+
+async def lookup_metadata_with_failures(
+    pairs: Dict[LookupKey, Tuple[str, str]], concurrency: int = 4,
+    refresh: bool = False, hedged: bool = False, deadline: Optional[float] = None
+) -> Tuple[Dict[LookupKey, Optional[Dict]], Set[LookupKey]]:
+    """Metadata for each ``(artist, title)`` pair, from the lookup cache or the providers.
+
+    ``pairs`` maps lookup_key() to the artist and title to ask about.
+    Only cache misses go to the network, ``concurrency`` at a time;
+    ``refresh`` skips the cache read; ``hedged`` and ``deadline`` are
+    passed to fetch_metadata().
+    Returns the results, where pairs without an album map to None, and
+    the keys whose lookup failed (also None in the results) - those
+    are worth asking again once the providers recover.
+    """
+    from db.session import get_session
+
+    cache = get_lookup_cache()
+    results = {}
+
+    if cache is not None and not refresh:
+        async for session in get_session():
+            results = await cache.get_many(session, pairs)
+
+    missing = [key for key in pairs if key not in results]
+    if results:
+        logger.info(f"Metadata lookups: {len(results)} cached, {len(missing)} to fetch")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    fetched = {}
+    failed = set()
+
+    async def lookup(key: LookupKey) -> None:
+        artist, title = pairs[key]
+        async with semaphore:
+            try:
+                fetched[key] = await fetch_metadata(artist, title, hedged=hedged, deadline=deadline)
+            except LookupFailed as e:
+                failed.add(key)
+                logger.warning(f"Album lookup failed for {artist} - {title}: {e}")
+            except Exception as e:
+                failed.add(key)
+                logger.error(f"Error fetching metadata for {artist} - {title}: {e}", exc_info=True)
+
+    await asyncio.gather(*(lookup(key) for key in missing))
+
+    if cache is not None and fetched:
+        async for session in get_session():
+            await cache.put_many(session, fetched)
+
+    results.update(fetched)
+    return {key: results.get(key) for key in pairs}, failed
+
+
+async def lookup_metadata(pairs: Dict[LookupKey, Tuple[str, str]], concurrency: int = 4,
+                          refresh: bool = False, hedged: bool = False,
+                          deadline: Optional[float] = None) -> Dict[LookupKey, Optional[Dict]]:
+    """lookup_metadata_with_failures() where a failed lookup is just None."""
+    results, _ = await lookup_metadata_with_failures(
+        pairs, concurrency=concurrency, refresh=refresh, hedged=hedged, deadline=deadline
+    )
+    return results
@@ -0,0 +1,482 @@
+from typing import Callable, List, Union, Awaitable
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from utils.logger import get_logger
+from utils.normalize import normalize_key
+
+logger = get_logger(__name__)
+
+Step = Union[str, Callable[[AsyncConnection], Awaitable[None]]]
+
+
+class Migration:
+    """A numbered schema change applied once by apply_migrations.
+
+    Steps are SQL strings or async callables taking the connection. Every
+    migration runs on every deployment: the schema never depends on
+    config, only on the code version.
+    """
+
+    def __init__(self, version: int, name: str, steps: List[Step]):
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+
+async def _merge_normalized_duplicates(conn: AsyncConnection) -> None:
+    # Keys are computed in Python (normalize_key has no SQL equivalent) and
+    # shipped as arrays; rows sharing a key are merged into the lowest id
+    rows = (await conn.execute(text("SELECT artist_id, name FROM artists"))).all()
+    await conn.execute(
+        text(
+            "UPDATE artists a SET name_key = k.name_key "
+            "FROM unnest(CAST(:ids AS integer[]), CAST(:keys AS text[])) AS k (artist_id, name_key) "
+            "WHERE a.artist_id = k.artist_id"
+        ),
+        {'ids': [row[0] for row in rows], 'keys': [normalize_key(row[1]) for row in rows]}
+    )
+
+    artist_dups = (
+        "(SELECT artist_id, min(artist_id) OVER (PARTITION BY name_key) AS keep FROM artists) m"
+    )
+    await conn.execute(text(
+        f"UPDATE tracks t SET artist_id = m.keep FROM {artist_dups} "
+        "WHERE t.artist_id = m.artist_id AND m.artist_id <> m.keep"
+    ))
+    await conn.execute(text(
+        f"UPDATE albums al SET artist_id = m.keep FROM {artist_dups} "
+        "WHERE al.artist_id = m.artist_id AND m.artist_id <> m.keep"
+    ))
+    await conn.execute(text(
+        f"DELETE FROM artists a USING {artist_dups} "
+        "WHERE a.artist_id = m.artist_id AND m.artist_id <> m.keep"
+    ))
+
+    rows = (await conn.execute(text("SELECT album_id, title FROM albums"))).all()
+    await conn.execute(
+        text(
+            "UPDATE albums al SET title_key = k.title_key "
+            "FROM unnest(CAST(:ids AS integer[]), CAST(:keys AS text[])) AS k (album_id, title_key) "
+            "WHERE al.album_id = k.album_id"
+        ),
+        {'ids': [row[0] for row in rows], 'keys': [normalize_key(row[1]) for row in rows]}
+    )
+
+    album_dups = (
+        "(SELECT album_id, min(album_id) OVER (PARTITION BY artist_id, title_key) AS keep FROM albums) m"
+    )
+    await conn.execute(text(
+        f"UPDATE tracks t SET album_id = m.keep FROM {album_dups} "
+        "WHERE t.album_id = m.album_id AND m.album_id <> m.keep"
+    ))
+    await conn.execute(text(
+        f"DELETE FROM albums al USING {album_dups} "
+        "WHERE al.album_id = m.album_id AND m.album_id <> m.keep"
+    ))
+
+
+async def _backfill_catalog_refs(conn: AsyncConnection) -> None:
+    unlinked = await conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM tracks WHERE artist_id IS NULL "
+        "OR (album_id IS NULL AND album <> ''))"
+    ))
+    if not unlinked:
+        return
+
+    # Linking every track would run the catalog_stats trigger once per row;
+    # the rollup is recounted once at the end instead
+    await conn.execute(text("ALTER TABLE tracks DISABLE TRIGGER tracks_catalog_stats"))
+
+    artists = (await conn.execute(text(
+        "SELECT DISTINCT artist FROM tracks WHERE artist_id IS NULL"
+    ))).scalars().all()
+
+    # The earliest spelling of each key names the artist, as on upload
+    await conn.execute(
+        text(
+            "INSERT INTO artists (name, name_key, created_at) "
+            "SELECT DISTINCT ON (k.name_key) k.name, k.name_key, t.first_upload "
+            "FROM unnest(CAST(:names AS text[]), CAST(:keys AS text[])) AS k (name, name_key) "
+            "JOIN (SELECT artist, min(uploaded_at) AS first_upload FROM tracks "
+            "WHERE artist_id IS NULL GROUP BY artist) t ON t.artist = k.name "
+            "ORDER BY k.name_key, t.first_upload "
+            "ON CONFLICT (name_key) DO NOTHING"
+        ),
+        {'names': artists, 'keys': [normalize_key(name) for name in artists]}
+    )
+    await conn.execute(
+        text(
+            "UPDATE tracks t SET artist_id = a.artist_id "
+            "FROM unnest(CAST(:names AS text[]), CAST(:keys AS text[])) AS k (name, name_key) "
+            "JOIN artists a ON a.name_key = k.name_key "
+            "WHERE t.artist = k.name AND t.artist_id IS NULL"
+        ),
+        {'names': artists, 'keys': [normalize_key(name) for name in artists]}
+    )
+
+    albums = (await conn.execute(text(
+        "SELECT DISTINCT artist_id, album FROM tracks "
+        "WHERE album_id IS NULL AND artist_id IS NOT NULL AND album <> ''"
+    ))).all()
+    if albums:
+        params = {
+            'artist_ids': [row[0] for row in albums],
+            'titles': [row[1] for row in albums],
+            'keys': [normalize_key(row[1]) for row in albums]
+        }
+        keyed = (
+            "unnest(CAST(:artist_ids AS integer[]), CAST(:titles AS text[]), CAST(:keys AS text[])) "
+            "AS k (artist_id, title, title_key)"
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO albums (artist_id, title, title_key, created_at) "
+                "SELECT DISTINCT ON (k.artist_id, k.title_key) k.artist_id, k.title, k.title_key, t.first_upload "
+                f"FROM {keyed} "
+                "JOIN (SELECT artist_id, album, min(uploaded_at) AS first_upload FROM tracks "
+                "WHERE album_id IS NULL GROUP BY artist_id, album) t "
+                "ON t.artist_id = k.artist_id AND t.album = k.title "
+                "ORDER BY k.artist_id, k.title_key, t.first_upload "
+                "ON CONFLICT (artist_id, title_key) DO NOTHING"
+            ),
+            params
+        )
+        await conn.execute(
+            text(
+                "UPDATE tracks t SET album_id = al.album_id "
+                f"FROM {keyed} "
+                "JOIN albums al ON al.artist_id = k.artist_id AND al.title_key = k.title_key "
+                "WHERE t.artist_id = k.artist_id AND t.album = k.title AND t.album_id IS NULL"
+            ),
+            params
+        )
+
+    await conn.execute(text("ALTER TABLE tracks ENABLE TRIGGER tracks_catalog_stats"))
+    await conn.execute(text("SELECT rebuild_catalog_stats()"))
+
+
+# Applies one track row to the rollups with delta +1 (row added) or -1
+# (row removed). An artist, album or genre counts towards the distinct
+# totals while its track_count is above zero.
+CATALOG_STATS_ADJUST = """
+CREATE OR REPLACE FUNCTION catalog_stats_adjust(
+    p_artist_id INTEGER, p_album_id INTEGER, p_genre TEXT, p_no_album BOOLEAN, p_delta INTEGER
+) RETURNS void AS $$
+DECLARE
+    artists_delta INTEGER := 0;
+    albums_delta INTEGER := 0;
+    genres_delta INTEGER := 0;
+    remaining INTEGER;
+    owner_id INTEGER;
+BEGIN
+    IF p_artist_id IS NOT NULL THEN
+        UPDATE artists SET track_count = track_count + p_delta
+        WHERE artist_id = p_artist_id
+        RETURNING track_count INTO remaining;
+
+        IF (p_delta > 0 AND remaining = 1) OR (p_delta < 0 AND remaining = 0) THEN
+            artists_delta := p_delta;
+        END IF;
+    END IF;
+
+    IF p_album_id IS NOT NULL THEN
+        UPDATE albums SET track_count = track_count + p_delta
+        WHERE album_id = p_album_id
+        RETURNING track_count, artist_id INTO remaining, owner_id;
+
+        IF (p_delta > 0 AND remaining = 1) OR (p_delta < 0 AND remaining = 0) THEN
+            albums_delta := p_delta;
+            UPDATE artists SET album_count = album_count + p_delta WHERE artist_id = owner_id;
+        END IF;
+    END IF;
+
+    IF p_genre IS NOT NULL THEN
+        INSERT INTO genre_counts (genre, track_count) VALUES (p_genre, p_delta)
+        ON CONFLICT (genre) DO UPDATE SET track_count = genre_counts.track_count + EXCLUDED.track_count
+        RETURNING track_count INTO remaining;
+
+        IF p_delta > 0 AND remaining = 1 THEN
+            genres_delta := 1;
+        ELSIF p_delta < 0 AND remaining <= 0 THEN
+            genres_delta := -1;
+            DELETE FROM genre_counts WHERE genre = p_genre;
+        END IF;
+    END IF;
+
+    UPDATE catalog_stats SET
+        total_tracks = total_tracks + p_delta,
+        unique_artists = unique_artists + artists_delta,
+        unique_albums = unique_albums + albums_delta,
+        genres_count = genres_count + genres_delta,
+        tracks_without_album = tracks_without_album + CASE WHEN p_no_album THEN p_delta ELSE 0 END
+    WHERE id = 1;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+CATALOG_STATS_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION catalog_stats_track_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.artist_id IS NOT DISTINCT FROM NEW.artist_id
+        AND OLD.album_id IS NOT DISTINCT FROM NEW.album_id
+        AND OLD.genre IS NOT DISTINCT FROM NEW.genre
+        AND (OLD.album IS NULL) = (NEW.album IS NULL)
+        AND OLD.uploaded_at = NEW.uploaded_at THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM catalog_stats_adjust(OLD.artist_id, OLD.album_id, OLD.genre, OLD.album IS NULL, -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM catalog_stats_adjust(NEW.artist_id, NEW.album_id, NEW.genre, NEW.album IS NULL, 1);
+        UPDATE catalog_stats SET last_upload = GREATEST(last_upload, NEW.uploaded_at) WHERE id = 1;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- Only removing the newest row can move last_upload backwards
+        UPDATE catalog_stats SET last_upload = (SELECT max(uploaded_at) FROM tracks)
+        WHERE id = 1 AND last_upload <= OLD.uploaded_at;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+REBUILD_CATALOG_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION rebuild_catalog_stats() RETURNS void AS $$
+BEGIN
+    -- Blocks track writes (but not reads) until the rebuild commits
+    LOCK TABLE tracks IN SHARE MODE;
+
+    UPDATE artists a SET track_count = counted.n
+    FROM (
+        SELECT ar.artist_id, count(t.track_id) AS n
+        FROM artists ar LEFT JOIN tracks t ON t.artist_id = ar.artist_id
+        GROUP BY ar.artist_id
+    ) counted
+    WHERE a.artist_id = counted.artist_id AND a.track_count <> counted.n;
+
+    UPDATE albums al SET track_count = counted.n
+    FROM (
+        SELECT a.album_id, count(t.track_id) AS n
+        FROM albums a LEFT JOIN tracks t ON t.album_id = a.album_id
+        GROUP BY a.album_id
+    ) counted
+    WHERE al.album_id = counted.album_id AND al.track_count <> counted.n;
+
+    UPDATE artists a SET album_count = counted.n
+    FROM (
+        SELECT ar.artist_id, count(al.album_id) AS n
+        FROM artists ar LEFT JOIN albums al ON al.artist_id = ar.artist_id AND al.track_count > 0
+        GROUP BY ar.artist_id
+    ) counted
+    WHERE a.artist_id = counted.artist_id AND a.album_count <> counted.n;
+
+    DELETE FROM genre_counts;
+    INSERT INTO genre_counts (genre, track_count)
+    SELECT genre, count(*) FROM tracks WHERE genre IS NOT NULL GROUP BY genre;
+
+    INSERT INTO catalog_stats (
+        id, total_tracks, unique_artists, unique_albums,
+        genres_count, tracks_without_album, last_upload
+    )
+    SELECT
+        1,
+        (SELECT count(*) FROM tracks),
+        (SELECT count(*) FROM artists WHERE track_count > 0),
+        (SELECT count(*) FROM albums WHERE track_count > 0),
+        (SELECT count(*) FROM genre_counts),
+        (SELECT count(*) FROM tracks WHERE album IS NULL),
+        (SELECT max(uploaded_at) FROM tracks)
+    ON CONFLICT (id) DO UPDATE SET
+        total_tracks = EXCLUDED.total_tracks,
+        unique_artists = EXCLUDED.unique_artists,
+        unique_albums = EXCLUDED.unique_albums,
+        genres_count = EXCLUDED.genres_count,
+        tracks_without_album = EXCLUDED.tracks_without_album,
+        last_upload = EXCLUDED.last_upload;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "pg_trgm GIN indexes for substring search",
+        [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_title_lower_trgm "
+            "ON tracks USING gin (lower(title) gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_artist_lower_trgm "
+            "ON tracks USING gin (lower(artist) gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_album_lower_trgm "
+            "ON tracks USING gin (lower(album) gin_trgm_ops)",
+        ]
+    ),
+    Migration(
+        2,
+        "play_count popularity signal for ranked search",
+        [
+            "ALTER TABLE tracks ADD COLUMN IF NOT EXISTS play_count INTEGER NOT NULL DEFAULT 0",
+        ]
+    ),
+    Migration(
+        3,
+        "artists and albums tables referenced from tracks",
+        [
+            "ALTER TABLE tracks ADD COLUMN IF NOT EXISTS artist_id INTEGER "
+            "REFERENCES artists (artist_id)",
+            "ALTER TABLE tracks ADD COLUMN IF NOT EXISTS album_id INTEGER "
+            "REFERENCES albums (album_id)",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_artist_id ON tracks (artist_id)",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_album_id ON tracks (album_id)",
+            # The backfill is migration 11
+        ]
+    ),
+    Migration(
+        4,
+        "pg_trgm GIN index on artist names",
+        [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_artists_name_lower_trgm "
+            "ON artists USING gin (lower(name) gin_trgm_ops)",
+        ]
+    ),
+    Migration(
+        5,
+        "normalized lookup keys on artists and albums",
+        [
+            "ALTER TABLE artists ADD COLUMN IF NOT EXISTS name_key TEXT",
+            "ALTER TABLE albums ADD COLUMN IF NOT EXISTS title_key TEXT",
+            "ALTER TABLE artists DROP CONSTRAINT IF EXISTS artists_name_key",
+            "ALTER TABLE albums DROP CONSTRAINT IF EXISTS uq_albums_artist_title",
+            _merge_normalized_duplicates,
+            "ALTER TABLE artists ALTER COLUMN name_key SET NOT NULL",
+            "ALTER TABLE albums ALTER COLUMN title_key SET NOT NULL",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_artists_name_key ON artists (name_key)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_albums_artist_title_key "
+            "ON albums (artist_id, title_key)",
+        ]
+    ),
+    Migration(
+        6,
+        "catalog statistics rollup maintained by triggers",
+        [
+            "ALTER TABLE artists ADD COLUMN IF NOT EXISTS track_count INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE artists ADD COLUMN IF NOT EXISTS album_count INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE albums ADD COLUMN IF NOT EXISTS track_count INTEGER NOT NULL DEFAULT 0",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_uploaded_at ON tracks (uploaded_at)",
+            "CREATE TABLE IF NOT EXISTS genre_counts ("
+            "genre TEXT PRIMARY KEY, "
+            "track_count INTEGER NOT NULL DEFAULT 0)",
+            "CREATE TABLE IF NOT EXISTS catalog_stats ("
+            "id INTEGER PRIMARY KEY, "
+            "total_tracks INTEGER NOT NULL DEFAULT 0, "
+            "unique_artists INTEGER NOT NULL DEFAULT 0, "
+            "unique_albums INTEGER NOT NULL DEFAULT 0, "
+            "genres_count INTEGER NOT NULL DEFAULT 0, "
+            "tracks_without_album INTEGER NOT NULL DEFAULT 0, "
+            "last_upload TIMESTAMP)",
+            CATALOG_STATS_ADJUST,
+            CATALOG_STATS_TRIGGER_FUNCTION,
+            REBUILD_CATALOG_STATS_FUNCTION,
+            "DROP TRIGGER IF EXISTS tracks_catalog_stats ON tracks",
+            "CREATE TRIGGER tracks_catalog_stats "
+            "AFTER INSERT OR DELETE OR UPDATE OF artist_id, album_id, genre, album, uploaded_at "
+            "ON tracks FOR EACH ROW EXECUTE FUNCTION catalog_stats_track_change()",
+            "SELECT rebuild_catalog_stats()",
+        ]
+    ),
+    Migration(
+        7,
+        "partial index for keyset artist browsing",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_artists_browse ON artists (name_key) "
+            "WHERE track_count > 0",
+        ]
+    ),
+    Migration(
+        8,
+        "partial index for streaming tracks without an album",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_tracks_without_album ON tracks (track_id) "
+            "WHERE album IS NULL",
+        ]
+    ),
+    Migration(
+        9,
+        "year, genre and MusicBrainz ids captured by album lookups",
+        [
+            "ALTER TABLE tracks ADD COLUMN IF NOT EXISTS year INTEGER",
+            "ALTER TABLE tracks ADD COLUMN IF NOT EXISTS mb_recording_id TEXT",
+            "ALTER TABLE tracks ADD COLUMN IF NOT EXISTS mb_release_id TEXT",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_year ON tracks (year)",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_genre ON tracks (genre)",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_mb_recording_id ON tracks (mb_recording_id)",
+            "CREATE INDEX IF NOT EXISTS ix_tracks_mb_release_id ON tracks (mb_release_id)",
+            "ALTER TABLE metadata_lookups ADD COLUMN IF NOT EXISTS year INTEGER",
+            "ALTER TABLE metadata_lookups ADD COLUMN IF NOT EXISTS genre TEXT",
+            "ALTER TABLE metadata_lookups ADD COLUMN IF NOT EXISTS duration INTEGER",
+            "ALTER TABLE metadata_lookups ADD COLUMN IF NOT EXISTS mb_recording_id TEXT",
+            "ALTER TABLE metadata_lookups ADD COLUMN IF NOT EXISTS mb_release_id TEXT",
+            # Cached hits only know the album; look them up again in full
+            "DELETE FROM metadata_lookups WHERE found",
+        ]
+    ),
+    Migration(
+        10,
+        "enrichment lookups that failed, counted apart from misses",
+        [
+            "ALTER TABLE enrichment_checkpoints ADD COLUMN IF NOT EXISTS failed INTEGER NOT NULL DEFAULT 0",
+        ]
+    ),
+    Migration(
+        11,
+        "link tracks to artists and albums by normalized key",
+        [
+            _backfill_catalog_refs,
+        ]
+    ),
+]
+
+
+async def apply_migrations(conn: AsyncConnection) -> List[int]:
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name TEXT NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+    ))
+
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    applied = {row[0] for row in result}
+
+    newly_applied = []
+
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+
+        logger.info(f"Applying migration {migration.version}: {migration.name}")
+
+        for step in migration.steps:
+            if isinstance(step, str):
+                await conn.execute(text(step))
+            else:
+                await step(conn)
+
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {'version': migration.version, 'name': migration.name}
+        )
+        newly_applied.append(migration.version)
+
+    if newly_applied:
+        logger.info(f"✅ Applied migrations: {newly_applied}")
+
+    return newly_applied
@@ -1,12 +1,164 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
 
+class Artist(Base):
+    __tablename__ = 'artists'
+    __table_args__ = (
+        # Keyset pages of the /browse artist list
+        Index('ix_artists_browse', 'name_key', postgresql_where=text('track_count > 0')),
+    )
+
+    artist_id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(Text, nullable=False)
+    name_key = Column(Text, nullable=False, unique=True, index=True)
+
+    # Maintained by the catalog_stats triggers (see db/migrations.py)
+    track_count = Column(Integer, nullable=False, default=0, server_default='0')
+    album_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Artist(id={self.artist_id}, name='{self.name}')>"
+
+
+class Album(Base):
+    __tablename__ = 'albums'
+    __table_args__ = (
+        Index('uq_albums_artist_title_key', 'artist_id', 'title_key', unique=True),
+    )
+
+    album_id = Column(Integer, primary_key=True, autoincrement=True)
+    artist_id = Column(Integer, ForeignKey('artists.artist_id'), nullable=False, index=True)
+    title = Column(Text, nullable=False)
+    title_key = Column(Text, nullable=False)
+
+    track_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Album(id={self.album_id}, title='{self.title}', artist_id={self.artist_id})>"
+
+
+class CatalogStats(Base):
+    """Single-row rollup behind /stats, kept current by triggers on tracks."""
+
+    __tablename__ = 'catalog_stats'
+
+    id = Column(Integer, primary_key=True)
+    total_tracks = Column(Integer, nullable=False, default=0, server_default='0')
+    unique_artists = Column(Integer, nullable=False, default=0, server_default='0')
+    unique_albums = Column(Integer, nullable=False, default=0, server_default='0')
+    genres_count = Column(Integer, nullable=False, default=0, server_default='0')
+    tracks_without_album = Column(Integer, nullable=False, default=0, server_default='0')
+    last_upload = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<CatalogStats(tracks={self.total_tracks}, artists={self.unique_artists})>"
+
+
+class GenreCount(Base):
+    __tablename__ = 'genre_counts'
+
+    genre = Column(Text, primary_key=True)
+    track_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"<GenreCount(genre='{self.genre}', tracks={self.track_count})>"
+
+
+class CallbackToken(Base):
+    """Persistent tier of the callback token store (see db/callback_store.py)."""
+
+    __tablename__ = 'callback_tokens'
+
+    token = Column(Text, primary_key=True)
+    payload = Column(Text, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<CallbackToken(token='{self.token}')>"
+
+
+class MetadataLookup(Base):
+    """Remembered album lookups, including misses (see db/lookup_cache.py)."""
+
+    __tablename__ = 'metadata_lookups'
+
+    artist_key = Column(Text, primary_key=True)
+    title_key = Column(Text, primary_key=True)
+    album = Column(Text, nullable=True)
+    year = Column(Integer, nullable=True)
+    genre = Column(Text, nullable=True)
+    duration = Column(Integer, nullable=True)
+    mb_recording_id = Column(Text, nullable=True)
+    mb_release_id = Column(Text, nullable=True)
+    found = Column(Boolean, nullable=False)
+    looked_up_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<MetadataLookup(artist_key='{self.artist_key}', title_key='{self.title_key}', found={self.found})>"
+
+
+class ArtistQuery(Base):
+    """/artist query resolved to a Genius artist, or to nothing (see db/artist_cache.py)."""
+
+    __tablename__ = 'artist_queries'
+
+    query_key = Column(Text, primary_key=True)
+    genius_id = Column(Integer, nullable=True)
+    looked_up_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ArtistQuery(query_key='{self.query_key}', genius_id={self.genius_id})>"
+
+
+class ArtistCard(Base):
+    """Rendered /artist reply for a Genius artist (see db/artist_cache.py)."""
+
+    __tablename__ = 'artist_cards'
+
+    genius_id = Column(Integer, primary_key=True)
+    data = Column(JSONB, nullable=False)
+    text = Column(Text, nullable=False)
+    photo_file_id = Column(Text, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ArtistCard(genius_id={self.genius_id})>"
+
+
+class EnrichmentCheckpoint(Base):
+    """Progress of a resumable enrichment run, committed with every chunk."""
+
+    __tablename__ = 'enrichment_checkpoints'
+
+    name = Column(Text, primary_key=True)
+    status = Column(Text, nullable=False)
+    last_track_id = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    not_found = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<EnrichmentCheckpoint(name='{self.name}', status='{self.status}', last_track_id={self.last_track_id})>"
+
+
 class Track(Base):
     __tablename__ = 'tracks'
+    __table_args__ = (
+        Index('ix_tracks_without_album', 'track_id', postgresql_where=text('album IS NULL')),
+    )
 
     track_id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -16,11 +168,20 @@ class Track(Base):
     telegram_file_id = Column('file_id', Text, nullable=False, unique=True)
 
     album = Column(Text, nullable=True, index=True)
-    genre = Column(Text, nullable=True)
+
+    artist_id = Column(Integer, ForeignKey('artists.artist_id'), nullable=True, index=True)
+    album_id = Column(Integer, ForeignKey('albums.album_id'), nullable=True, index=True)
+    genre = Column(Text, nullable=True, index=True)
     duration = Column(Integer, nullable=True)
     tags = Column(Text, nullable=True)
 
-    uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    year = Column(Integer, nullable=True, index=True)
+    mb_recording_id = Column(Text, nullable=True, index=True)
+    mb_release_id = Column(Text, nullable=True, index=True)
+
+    play_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     def __repr__(self):
         return f"<Track(id={self.track_id}, title='{self.title}', artist='{self.artist}')>"
@@ -39,10 +200,16 @@ class Track(Base):
             'title': self.title,
             'artist': self.artist,
             'album': self.album,
+            'artist_id': self.artist_id,
+            'album_id': self.album_id,
             'genre': self.genre,
             'file_id': self.telegram_file_id,
             'duration': self.duration,
             'tags': self.tags,
+            'year': self.year,
+            'mb_recording_id': self.mb_recording_id,
+            'mb_release_id': self.mb_release_id,
+            'play_count': self.play_count,
             'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None
         }
 
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import uuid
+from typing import List, Optional, Set
+import asyncpg
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.cache import bump_catalog_version
+from db.events import dispatch_changes
+from utils.config import get_config
+from utils.logger import get_logger
+from utils.normalize import normalize_key
+
+logger = get_logger(__name__)
+
+CHANNEL = 'catalog_changes'
+# Identifies this process so it can skip its own notifications
+ORIGIN = uuid.uuid4().hex[:12]
+# NOTIFY payloads are capped at 8000 bytes
+MAX_KEY_LENGTH = 200
+
+_NOTIFY_MANY = text(
+    "SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"
+)
+
+
+def notify_enabled() -> bool:
+    return bool(get_config().get('cache.notify', False))
+
+
+def _payload(track) -> str:
+    return json.dumps({
+        'o': ORIGIN,
+        't': track.track_id,
+        'a': normalize_key(track.artist)[:MAX_KEY_LENGTH],
+        'b': normalize_key(track.album)[:MAX_KEY_LENGTH]
+    }, separators=(',', ':'))
+
+
+async def publish_track_change(session: AsyncSession, track) -> None:
+    """Queue a change event for other bot processes.
+
+    NOTIFY is transactional: the event is delivered when the session
+    commits and dropped if it rolls back.
+    """
+    if not notify_enabled():
+        return
+
+    await session.execute(select(func.pg_notify(CHANNEL, _payload(track))))
+
+
+async def publish_track_changes(session: AsyncSession, tracks: List) -> None:
+    """publish_track_change for many tracks in one round trip."""
+    if not notify_enabled() or not tracks:
+        return
+
+    await session.execute(_NOTIFY_MANY, {
+        'channel': CHANNEL,
+        'payloads': [_payload(track) for track in tracks]
+    })
+
+
+class InvalidationListener:
+    """LISTENs for catalog changes made by other processes.
+
+    Every remote event bumps the local catalog version, which invalidates
+    the read caches. The changed tracks are then re-read in one batch and
+    passed to the same change listeners local commits use, which patches
+    the in-memory search index.
+    """
+
+    def __init__(self, dsn: str, reconnect_delay: float = 5.0):
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self.received = 0
+        self._conn: Optional[asyncpg.Connection] = None
+        self._pending: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self) -> None:
+        self._conn = await asyncpg.connect(self.dsn)
+        self._conn.add_termination_listener(self._on_terminated)
+        await self._conn.add_listener(CHANNEL, self._on_notify)
+        logger.info(f"Listening for catalog changes on '{CHANNEL}' (origin {ORIGIN})")
+
+    async def stop(self) -> None:
+        self._closing = True
+
+        for task in (self._flush_task, self._reconnect_task):
+            if task and not task.done():
+                task.cancel()
+
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.remove_listener(CHANNEL, self._on_notify)
+            await self._conn.close()
+        self._conn = None
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed catalog change: {payload[:100]}")
+            return
+
+        if event.get('o') == ORIGIN:
+            return
+
+        self.received += 1
+        bump_catalog_version()
+        self._pending.add(int(event['t']))
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        from db.session import get_session
+        from db.crud import get_tracks_by_ids
+
+        # Let a burst of notifications collect into one query
+        await asyncio.sleep(0.1)
+
+        while self._pending:
+            track_ids = sorted(self._pending)
+            self._pending.clear()
+
+            try:
+                async for session in get_session():
+                    tracks = await get_tracks_by_ids(session, track_ids)
+                dispatch_changes(tracks)
+            except Exception as e:
+                logger.error(f"Failed to apply remote catalog changes: {e}", exc_info=True)
+
+    def _on_terminated(self, conn) -> None:
+        if self._closing:
+            return
+
+        logger.warning("Catalog change listener connection lost, reconnecting")
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self.start()
+            except Exception as e:
+                logger.warning(f"Catalog change listener reconnect failed: {e}")
+                continue
+
+            # Events sent while disconnected are lost; drop everything cached
+            bump_catalog_version()
+            return
+
+
+_listener: Optional[InvalidationListener] = None
+
+
+async def start_invalidation_listener() -> InvalidationListener:
+    from db.session import engine
+
+    global _listener
+
+    dsn = engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+    _listener = InvalidationListener(dsn)
+    await _listener.start()
+    return _listener
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener
+
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
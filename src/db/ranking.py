@@ -0,0 +1,72 @@
+import math
+from typing import Optional
+from sqlalchemy import case, func
+from utils.config import get_config
+
+# (exact, prefix, substring) points per field
+MATCH_WEIGHTS = {
+    'artist': (100, 50, 20),
+    'title': (90, 45, 15),
+    'album': (60, 30, 10),
+}
+
+
+def popularity_weight() -> float:
+    return float(get_config().get('search.popularity_weight', 0) or 0)
+
+
+def ranking_enabled() -> bool:
+    return bool(get_config().get('search.ranked', False))
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def like_patterns(needle: str) -> dict:
+    escaped = escape_like(needle)
+    return {'needle': needle, 'prefix': f"{escaped}%", 'pattern': f"%{escaped}%"}
+
+
+def field_score_expression(column, needle, field: str, prefix_pattern, pattern):
+    """CASE scoring one column; the needle and patterns may be bind parameters."""
+    exact, prefix, substring = MATCH_WEIGHTS[field]
+    lowered = func.lower(column)
+
+    return case(
+        (lowered == needle, exact),
+        (lowered.like(prefix_pattern, escape='\\'), prefix),
+        (lowered.like(pattern, escape='\\'), substring),
+        else_=0
+    )
+
+
+def field_score(value: Optional[str], needle: str, field: str) -> int:
+    if value is None:
+        return 0
+
+    exact, prefix, substring = MATCH_WEIGHTS[field]
+    if value == needle:
+        return exact
+    if value.startswith(needle):
+        return prefix
+    if needle in value:
+        return substring
+    return 0
+
+
+def score(title: str, artist: str, album: Optional[str], play_count: int, needle: str,
+          weight: Optional[float] = None) -> float:
+    """Python twin of the ranked search score (db.statements.search) for already-lowercased values."""
+    weight = popularity_weight() if weight is None else weight
+
+    total = (
+        field_score(artist, needle, 'artist') +
+        field_score(title, needle, 'title') +
+        field_score(album, needle, 'album')
+    )
+
+    if weight:
+        total += weight * math.log1p(play_count or 0)
+
+    return total
@@ -0,0 +1,350 @@
+import heapq
+import sys
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.models import Album, Artist, Track
+from db.events import add_change_listener
+from db.ranking import popularity_weight, score
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+NGRAM_SIZE = 3
+FIELDS = ('title', 'artist', 'album')
+
+
+class IndexedTrack:
+    """Read-only catalog row with the attributes the handlers use from Track."""
+
+    __slots__ = (
+        'track_id', 'title', 'artist', 'album', 'genre',
+        'duration', 'telegram_file_id', 'play_count',
+        'artist_id', 'album_id', 'year', 'lowered'
+    )
+
+    def __init__(self, track_id, title, artist, album, genre, duration, telegram_file_id,
+                 play_count=0, artist_id=None, album_id=None, year=None):
+        self.track_id = track_id
+        self.title = title
+        self.artist = artist
+        self.album = album
+        self.genre = genre
+        self.duration = duration
+        self.telegram_file_id = telegram_file_id
+        self.play_count = play_count or 0
+        self.artist_id = artist_id
+        self.album_id = album_id
+        self.year = year
+        # Same folding as SQL lower() for the substring checks
+        self.lowered = (
+            title.lower(),
+            artist.lower(),
+            album.lower() if album is not None else None
+        )
+
+    @classmethod
+    def from_track(cls, track) -> 'IndexedTrack':
+        return cls(
+            track.track_id,
+            track.title,
+            track.artist,
+            track.album,
+            track.genre,
+            track.duration,
+            track.telegram_file_id,
+            track.play_count,
+            track.artist_id,
+            track.album_id,
+            track.year
+        )
+
+    @property
+    def file_id(self):
+        return self.telegram_file_id
+
+    duration_formatted = Track.duration_formatted
+
+    def __repr__(self):
+        return f"<IndexedTrack(id={self.track_id}, title='{self.title}', artist='{self.artist}')>"
+
+
+class IndexedAlbum:
+    __slots__ = ('album_id', 'artist_id', 'title')
+
+    def __init__(self, album_id, artist_id, title):
+        self.album_id = album_id
+        self.artist_id = artist_id
+        self.title = title
+
+    def __repr__(self):
+        return f"<IndexedAlbum(id={self.album_id}, title='{self.title}', artist_id={self.artist_id})>"
+
+
+def _ngrams(text: str) -> set:
+    if len(text) < NGRAM_SIZE:
+        return set()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class SearchIndex:
+    """N-gram inverted index over title/artist/album.
+
+    Each field maps a trigram of its lowercased value to a sorted
+    ``array('i')`` of track ids. A query intersects the posting lists of
+    its own trigrams and then checks the candidates with a plain substring
+    test, so the rows returned are the ones ``lower(col) LIKE '%q%'``
+    returns. Queries shorter than a trigram fall back to a linear scan.
+
+    Artists and albums are kept by id under their canonical name and
+    title (from the artists/albums tables), which is what album browsing
+    matches and shows, like the SQL path does; tracks may spell them
+    differently.
+    """
+
+    def __init__(self):
+        self._tracks: Dict[int, IndexedTrack] = {}
+        self._postings: Dict[str, Dict[str, array]] = {field: {} for field in FIELDS}
+        self._artists: Dict[int, str] = {}
+        self._albums: Dict[int, IndexedAlbum] = {}
+        self._album_tracks: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def _field_value(self, record: IndexedTrack, field: str) -> Optional[str]:
+        return record.lowered[FIELDS.index(field)]
+
+    def _index_field(self, record: IndexedTrack, field: str) -> None:
+        value = self._field_value(record, field)
+        if not value:
+            return
+
+        postings = self._postings[field]
+        for gram in _ngrams(value):
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = array('i', (record.track_id,))
+            elif ids[-1] < record.track_id:
+                ids.append(record.track_id)
+            else:
+                insort(ids, record.track_id)
+
+    def _unindex_field(self, record: IndexedTrack, field: str) -> None:
+        value = self._field_value(record, field)
+        if not value:
+            return
+
+        postings = self._postings[field]
+        for gram in _ngrams(value):
+            ids = postings.get(gram)
+            if ids is None:
+                continue
+            pos = bisect_left(ids, record.track_id)
+            if pos < len(ids) and ids[pos] == record.track_id:
+                del ids[pos]
+            if not ids:
+                del postings[gram]
+
+    def set_artist(self, artist_id: int, name: str) -> None:
+        self._artists[artist_id] = name.lower()
+
+    def set_album(self, album_id: int, artist_id: int, title: str) -> None:
+        self._albums[album_id] = IndexedAlbum(album_id, artist_id, title)
+
+    def _count_album(self, album_id: Optional[int], delta: int) -> None:
+        if album_id is None:
+            return
+        count = self._album_tracks.get(album_id, 0) + delta
+        if count > 0:
+            self._album_tracks[album_id] = count
+        else:
+            self._album_tracks.pop(album_id, None)
+
+    def upsert(self, record: IndexedTrack) -> None:
+        old = self._tracks.get(record.track_id)
+        self._tracks[record.track_id] = record
+
+        # A track is the first sighting of an artist or album only when it
+        # created the row, so its spelling is the canonical one
+        if record.artist_id is not None and record.artist_id not in self._artists:
+            self.set_artist(record.artist_id, record.artist)
+        if record.album_id is not None and record.album_id not in self._albums:
+            self.set_album(record.album_id, record.artist_id, record.album)
+        if old is None or old.album_id != record.album_id:
+            self._count_album(old.album_id if old is not None else None, -1)
+            self._count_album(record.album_id, 1)
+
+        for field in FIELDS:
+            if old is not None:
+                if self._field_value(old, field) == self._field_value(record, field):
+                    continue
+                self._unindex_field(old, field)
+            self._index_field(record, field)
+
+    def remove(self, track_id: int) -> None:
+        old = self._tracks.pop(track_id, None)
+        if old is None:
+            return
+        self._count_album(old.album_id, -1)
+        for field in FIELDS:
+            self._unindex_field(old, field)
+
+    def _candidates(self, field: str, needle: str) -> Iterable[int]:
+        grams = _ngrams(needle)
+        if not grams:
+            return self._tracks.keys()
+
+        postings = self._postings[field]
+        lists = []
+        for gram in grams:
+            ids = postings.get(gram)
+            if ids is None:
+                return ()
+            lists.append(ids)
+
+        lists.sort(key=len)
+        smallest, others = lists[0], lists[1:]
+
+        result = []
+        for track_id in smallest:
+            for ids in others:
+                pos = bisect_left(ids, track_id)
+                if pos == len(ids) or ids[pos] != track_id:
+                    break
+            else:
+                result.append(track_id)
+        return result
+
+    def _matching_ids(self, field: str, needle: str) -> set:
+        position = FIELDS.index(field)
+        matched = set()
+        for track_id in self._candidates(field, needle):
+            value = self._tracks[track_id].lowered[position]
+            if value is not None and needle in value:
+                matched.add(track_id)
+        return matched
+
+    def search(self, query: str, limit: int = 5, ranked: bool = False) -> List[IndexedTrack]:
+        needle = query.lower()
+        matched = set()
+        for field in FIELDS:
+            matched |= self._matching_ids(field, needle)
+
+        if not ranked:
+            return [self._tracks[track_id] for track_id in sorted(matched)[:limit]]
+
+        weight = popularity_weight()
+
+        def rank_key(track_id):
+            record = self._tracks[track_id]
+            title, artist, album = record.lowered
+            return (-score(title, artist, album, record.play_count, needle, weight), track_id)
+
+        return [self._tracks[track_id] for track_id in heapq.nsmallest(limit, matched, key=rank_key)]
+
+    def albums_by_artist(self, artist: str) -> List[IndexedAlbum]:
+        """Albums with tracks whose artist's canonical name contains ``artist``."""
+        needle = artist.lower()
+        artist_ids = {artist_id for artist_id, name in self._artists.items() if needle in name}
+
+        albums = [
+            album for album_id, album in self._albums.items()
+            if album.artist_id in artist_ids and album_id in self._album_tracks
+        ]
+        return sorted(albums, key=lambda album: (album.title, album.album_id))
+
+    def memory_usage(self) -> int:
+        size = sys.getsizeof(self._tracks) + sys.getsizeof(self._postings)
+
+        for record in self._tracks.values():
+            size += sys.getsizeof(record)
+            size += sys.getsizeof(record.lowered)
+            for value in (record.title, record.artist, record.album, record.genre, record.telegram_file_id):
+                if value is not None:
+                    size += sys.getsizeof(value)
+            for value in record.lowered:
+                if value is not None:
+                    size += sys.getsizeof(value)
+
+        for postings in self._postings.values():
+            size += sys.getsizeof(postings)
+            for gram, ids in postings.items():
+                size += sys.getsizeof(gram) + sys.getsizeof(ids)
+
+        return size
+
+    def gram_count(self) -> int:
+        return sum(len(postings) for postings in self._postings.values())
+
+    async def load(self, session: AsyncSession, batch_size: int = 5000) -> None:
+        # Canonical names first, so tracks loaded below don't supply them
+        for artist_id, name in (await session.execute(select(Artist.artist_id, Artist.name))).all():
+            self.set_artist(artist_id, name)
+        albums = await session.execute(select(Album.album_id, Album.artist_id, Album.title))
+        for album_id, artist_id, title in albums.all():
+            self.set_album(album_id, artist_id, title)
+
+        stmt = select(
+            Track.track_id,
+            Track.title,
+            Track.artist,
+            Track.album,
+            Track.genre,
+            Track.duration,
+            Track.telegram_file_id,
+            Track.play_count,
+            Track.artist_id,
+            Track.album_id,
+            Track.year
+        ).order_by(Track.track_id).execution_options(yield_per=batch_size)
+
+        result = await session.stream(stmt)
+        async for row in result:
+            # Rows committed while the scan runs arrive through the change
+            # listener and are newer than the scan's snapshot.
+            if row.track_id in self._tracks:
+                continue
+            self.upsert(IndexedTrack(*row))
+
+
+_search_index: Optional[SearchIndex] = None
+_loading_index: Optional[SearchIndex] = None
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    return _search_index
+
+
+def _on_catalog_change(tracks: list) -> None:
+    index = _search_index or _loading_index
+    if index is None:
+        return
+    for track in tracks:
+        index.upsert(IndexedTrack.from_track(track))
+
+
+async def init_search_index() -> SearchIndex:
+    from db.session import get_session
+
+    global _search_index, _loading_index
+
+    _loading_index = SearchIndex()
+    add_change_listener(_on_catalog_change)
+
+    try:
+        async for session in get_session():
+            await _loading_index.load(session)
+        _search_index = _loading_index
+    finally:
+        _loading_index = None
+
+    index = _search_index
+
+    logger.info(
+        f"Search index loaded: {len(index)} tracks, {index.gram_count()} n-grams, "
+        f"~{index.memory_usage() / (1024 * 1024):.1f} MB"
+    )
+    return index
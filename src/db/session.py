@@ -1,6 +1,8 @@
 import os
 from typing import AsyncGenerator
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from utils.config import get_config
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -20,6 +22,18 @@ engine = create_async_engine(
     max_overflow=10
 )
 
+
+@event.listens_for(engine.sync_engine, "do_connect")
+def _configure_connection(dialect, conn_rec, cargs, cparams):
+    # The engine is created at import time, before config is loaded, so
+    # per-connection driver options are applied when each connection opens.
+    config = get_config()
+    cparams.setdefault(
+        'prepared_statement_cache_size',
+        config.get('database.prepared_statement_cache_size', 100)
+    )
+
+
 async_session_maker = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -42,11 +56,15 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 
 async def init_db():
     from db.models import Base
+    from db.migrations import apply_migrations
 
     try:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
 
+        async with engine.begin() as conn:
+            await apply_migrations(conn)
+
         logger.info("✅ Database tables created successfully")
     except Exception as e:
         logger.error(f"❌ Error creating database tables: {e}", exc_info=True)
@@ -0,0 +1,188 @@
+"""Prebuilt statements for the hot crud queries.
+
+Each builder returns a statement whose varying values are bind
+parameters, so one statement object serves every call. With
+``database.cached_statements`` on (the default) a builder runs once per
+variant; SQLAlchemy then memoizes the statement's cache key and reuses
+its compiled form, and asyncpg reuses the server-side prepared statement.
+With it off the statement is rebuilt per call, which is what the
+benchmark in scripts/bench_queries.py compares against.
+"""
+import functools
+from sqlalchemy import Boolean, Float, Integer, bindparam, exists, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from db.models import Track, Artist, Album
+from db.ranking import field_score_expression
+from utils.config import get_config
+
+
+def cached_statements_enabled() -> bool:
+    return bool(get_config().get('database.cached_statements', True))
+
+
+def statement(builder):
+    built = functools.lru_cache(maxsize=None)(builder)
+
+    @functools.wraps(builder)
+    def get(*variant):
+        if cached_statements_enabled():
+            return built(*variant)
+        return builder(*variant)
+
+    return get
+
+
+def _lower_like(column, param: str):
+    # Must stay lower(column) LIKE ... so it matches the expression GIN
+    # trigram indexes (see db/migrations.py) and the planner can use them.
+    return func.lower(column).like(bindparam(param), escape='\\')
+
+
+@statement
+def search(ranked: bool, weighted: bool):
+    """Params: pattern, limit; ranked adds needle and prefix; weighted adds weight."""
+    stmt = select(Track).where(
+        _lower_like(Track.title, 'pattern') |
+        _lower_like(Track.artist, 'pattern') |
+        _lower_like(Track.album, 'pattern')
+    )
+
+    if ranked:
+        needle, prefix, pattern = bindparam('needle'), bindparam('prefix'), bindparam('pattern')
+        score = (
+            field_score_expression(Track.artist, needle, 'artist', prefix, pattern) +
+            field_score_expression(Track.title, needle, 'title', prefix, pattern) +
+            field_score_expression(Track.album, needle, 'album', prefix, pattern)
+        )
+        if weighted:
+            score = score + bindparam('weight', type_=Float) * func.ln(literal(1) + Track.play_count)
+        stmt = stmt.order_by(score.desc(), Track.track_id)
+    else:
+        stmt = stmt.order_by(Track.track_id)
+
+    return stmt.limit(bindparam('limit', type_=Integer))
+
+
+@statement
+def track_by_id():
+    return select(Track).where(Track.track_id == bindparam('track_id'))
+
+
+@statement
+def track_by_file_id():
+    return select(Track).where(Track.telegram_file_id == bindparam('file_id'))
+
+
+@statement
+def albums_by_artist():
+    """Params: pattern."""
+    return (
+        select(Album)
+        .join(Artist, Artist.artist_id == Album.artist_id)
+        .where(
+            _lower_like(Artist.name, 'pattern'),
+            exists().where(Track.album_id == Album.album_id)
+        )
+        .order_by(Album.title, Album.album_id)
+    )
+
+
+@statement
+def tracks_by_album():
+    return (
+        select(Track)
+        .join(Album, Album.album_id == Track.album_id)
+        .join(Artist, Artist.artist_id == Album.artist_id)
+        .where(
+            Artist.name_key == bindparam('artist_key'),
+            Album.title_key == bindparam('album_key')
+        )
+        .order_by(Track.title)
+    )
+
+
+@statement
+def albums_by_artist_id():
+    return (
+        select(Album)
+        .where(
+            Album.artist_id == bindparam('artist_id'),
+            exists().where(Track.album_id == Album.album_id)
+        )
+        .order_by(Album.title)
+    )
+
+
+@statement
+def tracks_by_album_id():
+    return select(Track).where(Track.album_id == bindparam('album_id')).order_by(Track.title)
+
+
+@statement
+def ingest_track(with_album: bool):
+    """Upsert artist, album and track in one statement.
+
+    Params: title, artist, artist_key, file_id, genre, duration, tags, now;
+    with_album adds album and album_key. Columns with Python-side defaults
+    are given explicitly because nested INSERTs can't evaluate them.
+    Returns the track row and
+    ``inserted``, which is false when the file_id already existed. The
+    no-op DO UPDATE makes every branch return its row even when a
+    concurrent transaction inserted it after this statement's snapshot.
+    """
+    # A duplicate upload should not leave behind artist/album rows
+    file_is_new = ~exists().where(Track.telegram_file_id == bindparam('file_id'))
+
+    artist_upsert = pg_insert(Artist).from_select(
+        ['name', 'name_key', 'track_count', 'album_count', 'created_at'],
+        select(
+            bindparam('artist'), bindparam('artist_key'), literal(0), literal(0), bindparam('now')
+        ).where(file_is_new)
+    )
+    artist_row = artist_upsert.on_conflict_do_update(
+        index_elements=[Artist.name_key],
+        set_={'name_key': artist_upsert.excluded.name_key}
+    ).returning(Artist.artist_id).cte('artist_row')
+
+    artist_id = select(artist_row.c.artist_id).scalar_subquery()
+    album_id = None
+    ctes = [artist_row]
+
+    if with_album:
+        album_upsert = pg_insert(Album).from_select(
+            ['artist_id', 'title', 'title_key', 'track_count', 'created_at'],
+            select(
+                artist_row.c.artist_id, bindparam('album'), bindparam('album_key'), literal(0), bindparam('now')
+            )
+        )
+        album_row = album_upsert.on_conflict_do_update(
+            index_elements=[Album.artist_id, Album.title_key],
+            set_={'title_key': album_upsert.excluded.title_key}
+        ).returning(Album.album_id).cte('album_row')
+
+        album_id = select(album_row.c.album_id).scalar_subquery()
+        ctes.append(album_row)
+
+    track_upsert = pg_insert(Track).values(
+        title=bindparam('title'),
+        artist=bindparam('artist'),
+        album=bindparam('album') if with_album else None,
+        telegram_file_id=bindparam('file_id'),
+        artist_id=artist_id,
+        album_id=album_id,
+        genre=bindparam('genre'),
+        duration=bindparam('duration', type_=Integer),
+        tags=bindparam('tags'),
+        play_count=0,
+        uploaded_at=bindparam('now')
+    )
+
+    # xmax is 0 only on a row version created by a plain INSERT
+    inserted = literal_column('(tracks.xmax = 0)', Boolean).label('inserted')
+
+    stmt = track_upsert.on_conflict_do_update(
+        index_elements=[Track.telegram_file_id],
+        set_={'file_id': track_upsert.excluded.file_id}
+    ).returning(*Track.__table__.columns, inserted).add_cte(*ctes)
+
+    return select(Track, inserted).from_statement(stmt)
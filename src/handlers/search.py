@@ -4,19 +4,34 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQu
 import asyncio
 from utils.config import get_config
 from utils.logger import get_logger
+from utils.normalize import normalize_key
 from db import (
     get_session,
     search_tracks,
     get_track_by_id,
     get_albums_by_artist,
-    get_tracks_by_album,
-    get_all_artists,
+    get_artists_page,
     get_stats
 )
+from db.crud import (
+    increment_play_count,
+    get_artist_by_id,
+    get_artist_by_name_prefix,
+    get_artists_by_ids,
+    get_album_by_id,
+    get_album_by_title_prefix,
+    get_albums_by_artist_id,
+    get_tracks_by_album_id,
+    get_tracks_by_artist_id,
+    get_tracks_by_ids
+)
+from db.callback_store import get_callback_store
 
 logger = get_logger(__name__)
 router = Router()
 
+ARTIST_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
 
 @router.message(Command("stats"))
 async def stats_command(message: types.Message):
@@ -51,12 +66,13 @@ async def stats_command(message: types.Message):
 @router.message(Command("browse"))
 async def browse_command(message: types.Message):
     logger.info(f"User {message.from_user.id} requested artist list")
+    per_page = get_config().get('pagination.artists_per_page', 10)
 
     try:
         async for session in get_session():
-            artists = await get_all_artists(session)
+            page = await get_artists_page(session, limit=per_page)
 
-            if not artists:
+            if not page['artists']:
                 await message.answer(
                     "📭 <b>Database is empty</b>\n\n"
                     "No artists found in the database yet.\n"
@@ -64,7 +80,7 @@ async def browse_command(message: types.Message):
                 )
                 return
 
-            await show_artists_list(message, artists, page=0)
+            await show_artists_page(message, page)
 
     except Exception as e:
         logger.error(f"Error in browse command: {e}", exc_info=True)
@@ -89,8 +105,19 @@ async def search_handler(message: types.Message):
             albums = await get_albums_by_artist(session, query)
 
             if albums:
-                logger.info(f"Found {len(albums)} albums for artist: {query}")
-                await show_albums(message, query, albums, page=0)
+                artist_ids = list(dict.fromkeys(album.artist_id for album in albums))
+                logger.info(f"Found {len(albums)} albums by {len(artist_ids)} artist(s) for: {query}")
+
+                artists = await get_artists_by_ids(session, artist_ids)
+                query_key = normalize_key(query)
+                exact = [artist for artist in artists if artist.name_key == query_key]
+
+                if len(artists) == 1 or exact:
+                    artist = exact[0] if exact else artists[0]
+                    artist_albums = [album for album in albums if album.artist_id == artist.artist_id]
+                    await show_albums(message, artist, artist_albums, page=0)
+                else:
+                    await show_matching_artists(message, query, artists)
                 return
 
             tracks = await search_tracks(
@@ -110,7 +137,7 @@ async def search_handler(message: types.Message):
 
             if len(artist_tracks) >= 5:
                 logger.info(f"Found {len(artist_tracks)} tracks for artist: {query}")
-                await show_artist_tracks_no_albums(message, query, artist_tracks[:30])
+                await show_artist_tracks_no_albums(message, session, query, artist_tracks[:30])
                 return
 
             if len(tracks) == 1:
@@ -144,7 +171,7 @@ def create_track_keyboard(tracks: list, query: str = None) -> InlineKeyboardMark
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def create_albums_keyboard(artist: str, albums: list, page: int = 0) -> InlineKeyboardMarkup:
+def create_albums_keyboard(artist, albums: list, page: int = 0) -> InlineKeyboardMarkup:
     config = get_config()
     per_page = config.get('pagination.albums_per_page', 5)
 
@@ -155,21 +182,17 @@ def create_albums_keyboard(artist: str, albums: list, page: int = 0) -> InlineKe
     buttons = []
 
     for album in albums[start_idx:end_idx]:
-        artist_truncated = artist[:20]
-        album_truncated = album[:20]
-
         buttons.append([
             InlineKeyboardButton(
-                text=f"💿 {album[:40]}",
-                callback_data=f"album_tracks:{artist_truncated}:{album_truncated}:0"
+                text=f"💿 {album.title[:40]}",
+                callback_data=f"alb_trk:{album.album_id}:0"
             )
         ])
 
     nav_buttons = []
     if page > 0:
-        artist_truncated = artist[:25]
         nav_buttons.append(
-            InlineKeyboardButton(text="◀️ Prev", callback_data=f"albums:{artist_truncated}:{page-1}")
+            InlineKeyboardButton(text="◀️ Prev", callback_data=f"albums:{artist.artist_id}:{page-1}")
         )
 
     nav_buttons.append(
@@ -177,19 +200,17 @@ def create_albums_keyboard(artist: str, albums: list, page: int = 0) -> InlineKe
     )
 
     if page < total_pages - 1:
-        artist_truncated = artist[:25]
         nav_buttons.append(
-            InlineKeyboardButton(text="Next ▶️", callback_data=f"albums:{artist_truncated}:{page+1}")
+            InlineKeyboardButton(text="Next ▶️", callback_data=f"albums:{artist.artist_id}:{page+1}")
         )
 
     if len(nav_buttons) > 1:
         buttons.append(nav_buttons)
 
     action_buttons = []
-    artist_truncated = artist[:25]
 
     action_buttons.append(
-        InlineKeyboardButton(text="📥 Download All", callback_data=f"dl_all:{artist_truncated}")
+        InlineKeyboardButton(text="📥 Download All", callback_data=f"dl_all:{artist.artist_id}")
     )
 
     action_buttons.append(
@@ -201,7 +222,7 @@ def create_albums_keyboard(artist: str, albums: list, page: int = 0) -> InlineKe
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def create_album_tracks_keyboard(artist: str, album: str, tracks: list, page: int = 0) -> InlineKeyboardMarkup:
+def create_album_tracks_keyboard(album, tracks: list, page: int = 0) -> InlineKeyboardMarkup:
     config = get_config()
     per_page = config.get('pagination.tracks_per_page', 8)
 
@@ -219,13 +240,10 @@ def create_album_tracks_keyboard(artist: str, album: str, tracks: list, page: in
             )
         ])
 
-    artist_truncated = artist[:15]
-    album_truncated = album[:15]
-
     nav_buttons = []
     if page > 0:
         nav_buttons.append(
-            InlineKeyboardButton(text="◀️", callback_data=f"alb_trk:{artist_truncated}:{album_truncated}:{page-1}")
+            InlineKeyboardButton(text="◀️", callback_data=f"alb_trk:{album.album_id}:{page-1}")
         )
 
     nav_buttons.append(
@@ -234,7 +252,7 @@ def create_album_tracks_keyboard(artist: str, album: str, tracks: list, page: in
 
     if page < total_pages - 1:
         nav_buttons.append(
-            InlineKeyboardButton(text="▶️", callback_data=f"alb_trk:{artist_truncated}:{album_truncated}:{page+1}")
+            InlineKeyboardButton(text="▶️", callback_data=f"alb_trk:{album.album_id}:{page+1}")
         )
 
     if len(nav_buttons) > 1:
@@ -243,11 +261,11 @@ def create_album_tracks_keyboard(artist: str, album: str, tracks: list, page: in
     action_buttons = []
 
     action_buttons.append(
-        InlineKeyboardButton(text="📥 Album", callback_data=f"dl_album:{artist_truncated}:{album_truncated}")
+        InlineKeyboardButton(text="📥 Album", callback_data=f"dl_album:{album.album_id}")
     )
 
     action_buttons.append(
-        InlineKeyboardButton(text="🔙 Albums", callback_data=f"back_alb:{artist_truncated}:0")
+        InlineKeyboardButton(text="🔙 Albums", callback_data=f"back_alb:{album.artist_id}:0")
     )
 
     action_buttons.append(
@@ -259,7 +277,7 @@ def create_album_tracks_keyboard(artist: str, album: str, tracks: list, page: in
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def create_artist_tracks_keyboard(tracks: list, page: int = 0, per_page: int = 10) -> InlineKeyboardMarkup:
+def create_artist_tracks_keyboard(tracks: list, token: str, page: int = 0, per_page: int = 10) -> InlineKeyboardMarkup:
     total_pages = (len(tracks) - 1) // per_page + 1
     start_idx = page * per_page
     end_idx = start_idx + per_page
@@ -277,7 +295,7 @@ def create_artist_tracks_keyboard(tracks: list, page: int = 0, per_page: int = 1
     nav_buttons = []
     if page > 0:
         nav_buttons.append(
-            InlineKeyboardButton(text="◀️", callback_data=f"artist_tracks_page:{page-1}")
+            InlineKeyboardButton(text="◀️", callback_data=f"trk_list:{token}:{page-1}")
         )
 
     nav_buttons.append(
@@ -286,7 +304,7 @@ def create_artist_tracks_keyboard(tracks: list, page: int = 0, per_page: int = 1
 
     if page < total_pages - 1:
         nav_buttons.append(
-            InlineKeyboardButton(text="▶️", callback_data=f"artist_tracks_page:{page+1}")
+            InlineKeyboardButton(text="▶️", callback_data=f"trk_list:{token}:{page+1}")
         )
 
     if len(nav_buttons) > 1:
@@ -308,12 +326,10 @@ def create_artists_keyboard(artists: list, page: int = 0, per_page: int = 10) ->
     buttons = []
 
     for artist in artists[start_idx:end_idx]:
-        artist_truncated = artist[:30]
-
         buttons.append([
             InlineKeyboardButton(
-                text=f"🎤 {artist[:35]}",
-                callback_data=f"artist:{artist_truncated}:0"
+                text=artist_button_text(artist),
+                callback_data=f"artist:{artist.artist_id}:0"
             )
         ])
 
@@ -338,22 +354,116 @@ def create_artists_keyboard(artists: list, page: int = 0, per_page: int = 10) ->
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-async def show_albums(message: types.Message, artist: str, albums: list, page: int = 0):
-    text = f"🎤 <b>Artist:</b> {html.quote(artist)}\n\n"
+def artist_button_text(artist) -> str:
+    text = f"🎤 {artist.name[:30]} · 🎵 {artist.track_count}"
+    if artist.album_count:
+        text += f" · 💿 {artist.album_count}"
+    return text
+
+
+def create_artist_browser_keyboard(page: dict) -> InlineKeyboardMarkup:
+    artists = page['artists']
+
+    buttons = [
+        [InlineKeyboardButton(text=artist_button_text(artist), callback_data=f"artist:{artist.artist_id}:0")]
+        for artist in artists
+    ]
+
+    nav_buttons = []
+    if page['has_prev']:
+        nav_buttons.append(
+            InlineKeyboardButton(text="◀️", callback_data=f"artists:prev:{artists[0].artist_id}")
+        )
+
+    nav_buttons.append(
+        InlineKeyboardButton(text="🔤 A–Z", callback_data="artists:az")
+    )
+
+    if page['has_next']:
+        nav_buttons.append(
+            InlineKeyboardButton(text="▶️", callback_data=f"artists:next:{artists[-1].artist_id}")
+        )
+
+    buttons.append(nav_buttons)
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def create_letters_keyboard() -> InlineKeyboardMarkup:
+    letters = ['#'] + list(ARTIST_LETTERS)
+
+    buttons = [
+        [InlineKeyboardButton(text=letter, callback_data=f"artists:from:{letter}") for letter in letters[i:i + 7]]
+        for i in range(0, len(letters), 7)
+    ]
+
+    buttons.append([
+        InlineKeyboardButton(text="◀️ Back", callback_data="back_to_artists:0")
+    ])
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def artists_page_args(data: str) -> dict:
+    # artists:next:<id>, artists:prev:<id>, artists:from:<letter>; anything
+    # else (including old artists_page:<n> buttons) opens the first page
+    parts = data.split(":")
+    if parts[0] != 'artists' or len(parts) < 3:
+        return {}
+
+    action, value = parts[1], parts[2]
+    if action == 'next' and value.isdigit():
+        return {'after_id': int(value)}
+    if action == 'prev' and value.isdigit():
+        return {'before_id': int(value)}
+    if action == 'from' and value.isalpha():
+        return {'start': value.lower()}
+    return {}
+
+
+def albums_text(artist_name: str, albums: list) -> str:
+    text = f"🎤 <b>Artist:</b> {html.quote(artist_name)}\n\n"
     text += f"💿 <b>Albums found:</b> {len(albums)}\n\n"
     text += "Select an album to view tracks:"
+    return text
+
+
+def artists_text(total: int) -> str:
+    text = f"🎤 <b>Artists in Database</b>\n\n"
+    text += f"📊 <b>Total artists:</b> {total}\n\n"
+    text += "Select an artist to view their music:"
+    return text
 
+
+async def show_albums(message: types.Message, artist, albums: list, page: int = 0):
     keyboard = create_albums_keyboard(artist, albums, page)
+    await message.answer(albums_text(artist.name, albums), reply_markup=keyboard)
+
+
+async def show_matching_artists(message: types.Message, query: str, artists: list):
+    per_page = get_config().get('pagination.artists_per_page', 10)
+
+    text = f"🔍 <b>Artists matching:</b> {html.quote(query)}\n\n"
+    text += f"🎤 <b>Artists found:</b> {len(artists)}\n\n"
+    if len(artists) > per_page:
+        text += f"Showing the first {per_page}, refine your query to narrow it down.\n\n"
+    text += "Select an artist to view their albums:"
+
+    keyboard = create_artists_keyboard(artists[:per_page], page=0, per_page=per_page)
     await message.answer(text, reply_markup=keyboard)
 
 
-async def show_artist_tracks_no_albums(message: types.Message, artist: str, tracks: list):
+def artist_tracks_text(artist: str, tracks: list) -> str:
     text = f"🎤 <b>Artist:</b> {html.quote(artist)}\n\n"
     text += f"🎵 <b>Tracks found:</b> {len(tracks)}\n\n"
     text += "Select a track:"
+    return text
 
-    keyboard = create_artist_tracks_keyboard(tracks, page=0, per_page=10)
-    await message.answer(text, reply_markup=keyboard)
+
+async def show_artist_tracks_no_albums(message: types.Message, session, artist: str, tracks: list):
+    token = await get_callback_store().put_ids(session, [track.track_id for track in tracks])
+    keyboard = create_artist_tracks_keyboard(tracks, token, page=0, per_page=10)
+    await message.answer(artist_tracks_text(artist, tracks), reply_markup=keyboard)
 
 
 async def show_track_list(message: types.Message, tracks: list, query: str):
@@ -368,13 +478,9 @@ async def show_track_list(message: types.Message, tracks: list, query: str):
     await message.answer(text, reply_markup=keyboard)
 
 
-async def show_artists_list(message: types.Message, artists: list, page: int = 0):
-    text = f"🎤 <b>Artists in Database</b>\n\n"
-    text += f"📊 <b>Total artists:</b> {len(artists)}\n\n"
-    text += "Select an artist to view their music:"
-
-    keyboard = create_artists_keyboard(artists, page, per_page=10)
-    await message.answer(text, reply_markup=keyboard)
+async def show_artists_page(message: types.Message, page: dict):
+    keyboard = create_artist_browser_keyboard(page)
+    await message.answer(artists_text(page['total']), reply_markup=keyboard)
 
 
 async def send_track(message: types.Message, track):
@@ -383,7 +489,7 @@ async def send_track(message: types.Message, track):
         caption += f"👤 <b>Artist:</b> {html.quote(track.artist)}\n"
 
         if track.album:
-            caption += f"💿 <b>Album:</b> {html.quote(track.album)}\n"
+            caption += f"💿 <b>Album:</b> {html.quote(track.album)}" + (f" ({track.year})" if track.year else "") + "\n"
 
         if track.genre:
             caption += f"🎼 <b>Genre:</b> {html.quote(track.genre)}\n"
@@ -416,7 +522,7 @@ async def send_track_callback(callback: CallbackQuery, track):
         caption += f"👤 <b>Artist:</b> {html.quote(track.artist)}\n"
 
         if track.album:
-            caption += f"💿 <b>Album:</b> {html.quote(track.album)}\n"
+            caption += f"💿 <b>Album:</b> {html.quote(track.album)}" + (f" ({track.year})" if track.year else "") + "\n"
 
         if track.genre:
             caption += f"🎼 <b>Genre:</b> {html.quote(track.genre)}\n"
@@ -440,14 +546,24 @@ async def send_track_callback(callback: CallbackQuery, track):
         await callback.answer("❌ Error sending track", show_alert=True)
 
 
-_callback_cache = {}
+async def resolve_artist(session, ref: str):
+    if ref.isdigit():
+        return await get_artist_by_id(session, int(ref))
+
+    # Buttons sent before artists had ids carry a (possibly truncated) name
+    return await get_artist_by_name_prefix(session, ref)
+
+
+async def resolve_album(session, refs: list):
+    if len(refs) == 1 and refs[0].isdigit():
+        return await get_album_by_id(session, int(refs[0]))
 
-def cache_callback_data(key: str, value: str) -> str:
-    _callback_cache[key] = value
-    return key
+    if len(refs) == 2:
+        artist = await resolve_artist(session, refs[0])
+        if artist:
+            return await get_album_by_title_prefix(session, artist.artist_id, refs[1])
 
-def get_cached_data(key: str) -> str:
-    return _callback_cache.get(key, key)
+    return None
 
 
 @router.callback_query(F.data.startswith("track:"))
@@ -460,6 +576,7 @@ async def handle_track_selection(callback: CallbackQuery):
 
             if track:
                 await send_track_callback(callback, track)
+                await increment_play_count(session, track)
             else:
                 await callback.answer("❌ Track not found", show_alert=True)
 
@@ -468,148 +585,152 @@ async def handle_track_selection(callback: CallbackQuery):
         await callback.answer("❌ Error", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("albums:"))
+@router.callback_query(
+    F.data.startswith("albums:") | F.data.startswith("back_to_albums:") | F.data.startswith("back_alb:")
+)
 async def handle_albums_pagination(callback: CallbackQuery):
-    _, artist, page = callback.data.split(":")
+    _, artist_ref, page = callback.data.rsplit(":", 2)
     page = int(page)
 
-    artist_full = get_cached_data(artist)
-
     try:
         async for session in get_session():
-            albums = await get_albums_by_artist(session, artist_full)
+            artist = await resolve_artist(session, artist_ref)
+            albums = await get_albums_by_artist_id(session, artist.artist_id) if artist else []
 
             if albums:
-                text = f"🎤 <b>Artist:</b> {html.quote(artist_full)}\n\n"
-                text += f"💿 <b>Albums found:</b> {len(albums)}\n\n"
-                text += "Select an album to view tracks:"
-
-                keyboard = create_albums_keyboard(artist_full, albums, page)
-                await callback.message.edit_text(text, reply_markup=keyboard)
+                keyboard = create_albums_keyboard(artist, albums, page)
+                await callback.message.edit_text(albums_text(artist.name, albums), reply_markup=keyboard)
                 await callback.answer()
+            else:
+                await callback.answer("❌ No albums found", show_alert=True)
 
     except Exception as e:
         logger.error(f"Error handling albums pagination: {e}", exc_info=True)
         await callback.answer("❌ Error", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("album_tracks:") | F.data.startswith("alb_trk:"))
-async def handle_album_tracks(callback: CallbackQuery):
-    parts = callback.data.split(":", 3)
-    prefix = parts[0]
-    artist = parts[1]
-    album = parts[2]
-    page = int(parts[3])
-
-    artist_full = get_cached_data(artist)
-    album_full = get_cached_data(album)
+@router.callback_query(F.data.startswith("trk_list:") | F.data.startswith("artist_tracks_page:"))
+async def handle_track_list_pagination(callback: CallbackQuery):
+    parts = callback.data.split(":")
 
     try:
         async for session in get_session():
-            tracks = await get_tracks_by_album(session, artist_full, album_full)
+            track_ids = None
+            if len(parts) == 3:
+                track_ids = await get_callback_store().get_ids(session, parts[1])
 
-            if tracks:
-                text = f"🎤 <b>Artist:</b> {html.quote(artist_full)}\n"
-                text += f"💿 <b>Album:</b> {html.quote(album_full)}\n\n"
-                text += f"🎵 <b>Tracks:</b> {len(tracks)}\n\n"
-                text += "Select a track:"
+            if not track_ids:
+                await callback.answer("⌛ This list has expired, please search again", show_alert=True)
+                return
 
-                keyboard = create_album_tracks_keyboard(artist_full, album_full, tracks, page)
-                await callback.message.edit_text(text, reply_markup=keyboard)
-                await callback.answer()
+            tracks = await get_tracks_by_ids(session, track_ids)
+            if not tracks:
+                await callback.answer("❌ No tracks found", show_alert=True)
+                return
+
+            keyboard = create_artist_tracks_keyboard(tracks, parts[1], page=int(parts[2]), per_page=10)
+            await callback.message.edit_reply_markup(reply_markup=keyboard)
+            await callback.answer()
 
     except Exception as e:
-        logger.error(f"Error handling album tracks: {e}", exc_info=True)
+        logger.error(f"Error handling track list pagination: {e}", exc_info=True)
         await callback.answer("❌ Error", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("back_to_albums:") | F.data.startswith("back_alb:"))
-async def handle_back_to_albums(callback: CallbackQuery):
+@router.callback_query(F.data.startswith("album_tracks:") | F.data.startswith("alb_trk:"))
+async def handle_album_tracks(callback: CallbackQuery):
     parts = callback.data.split(":")
-    artist = parts[1]
-    page = int(parts[2])
-
-    artist_full = get_cached_data(artist)
+    refs = parts[1:-1]
+    page = int(parts[-1])
 
     try:
         async for session in get_session():
-            albums = await get_albums_by_artist(session, artist_full)
+            album = await resolve_album(session, refs)
+            tracks = await get_tracks_by_album_id(session, album.album_id) if album else []
 
-            if albums:
-                text = f"🎤 <b>Artist:</b> {html.quote(artist_full)}\n\n"
-                text += f"💿 <b>Albums found:</b> {len(albums)}\n\n"
-                text += "Select an album to view tracks:"
+            if tracks:
+                artist = await get_artist_by_id(session, album.artist_id)
+
+                text = f"🎤 <b>Artist:</b> {html.quote(artist.name)}\n"
+                text += f"💿 <b>Album:</b> {html.quote(album.title)}\n\n"
+                text += f"🎵 <b>Tracks:</b> {len(tracks)}\n\n"
+                text += "Select a track:"
 
-                keyboard = create_albums_keyboard(artist_full, albums, page)
+                keyboard = create_album_tracks_keyboard(album, tracks, page)
                 await callback.message.edit_text(text, reply_markup=keyboard)
                 await callback.answer()
+            else:
+                await callback.answer("❌ No tracks found", show_alert=True)
 
     except Exception as e:
-        logger.error(f"Error going back to albums: {e}", exc_info=True)
+        logger.error(f"Error handling album tracks: {e}", exc_info=True)
         await callback.answer("❌ Error", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("back_to_artists:"))
-async def handle_back_to_artists(callback: CallbackQuery):
-    page = int(callback.data.split(":")[1])
+@router.callback_query(
+    F.data.startswith("artists:") |
+    F.data.startswith("back_to_artists:") |
+    F.data.startswith("artists_page:")
+)
+async def handle_artists_pagination(callback: CallbackQuery):
+    per_page = get_config().get('pagination.artists_per_page', 10)
 
     try:
-        async for session in get_session():
-            artists = await get_all_artists(session)
+        if callback.data == "artists:az":
+            await callback.message.edit_text(
+                "🔤 <b>Jump to artists starting with:</b>",
+                reply_markup=create_letters_keyboard()
+            )
+            await callback.answer()
+            return
 
-            if artists:
-                text = f"🎤 <b>Artists in Database</b>\n\n"
-                text += f"📊 <b>Total artists:</b> {len(artists)}\n\n"
-                text += "Select an artist to view their music:"
+        async for session in get_session():
+            page = await get_artists_page(session, limit=per_page, **artists_page_args(callback.data))
 
-                keyboard = create_artists_keyboard(artists, page)
+            if not page['artists']:
+                await callback.answer("📭 No artists found from there", show_alert=True)
+                return
 
-                await callback.message.edit_text(text, reply_markup=keyboard)
-                await callback.answer()
+            keyboard = create_artist_browser_keyboard(page)
+            await callback.message.edit_text(artists_text(page['total']), reply_markup=keyboard)
+            await callback.answer()
 
     except Exception as e:
-        logger.error(f"Error going back to artists: {e}", exc_info=True)
+        logger.error(f"Error handling artists pagination: {e}", exc_info=True)
         await callback.answer("❌ Error", show_alert=True)
 
 
 @router.callback_query(F.data.startswith("artist:"))
 async def handle_artist_selection(callback: CallbackQuery):
-    parts = callback.data.split(":")
-    artist = parts[1]
-    page = int(parts[2]) if len(parts) > 2 else 0
-
-    artist_full = get_cached_data(artist)
+    _, artist_ref, page = callback.data.rsplit(":", 2)
+    page = int(page)
 
     try:
         async for session in get_session():
-            albums = await get_albums_by_artist(session, artist_full)
-
-            if albums:
-                for album in albums:
-                    album_key = album[:20]
-                    cache_callback_data(album_key, album)
+            artist = await resolve_artist(session, artist_ref)
 
-                artist_key = artist_full[:20]
-                cache_callback_data(artist_key, artist_full)
+            if not artist:
+                await callback.answer("❌ Artist not found", show_alert=True)
+                return
 
-                text = f"🎤 <b>Artist:</b> {html.quote(artist_full)}\n\n"
-                text += f"💿 <b>Albums found:</b> {len(albums)}\n\n"
-                text += "Select an album to view tracks:"
+            albums = await get_albums_by_artist_id(session, artist.artist_id)
 
-                keyboard = create_albums_keyboard(artist_full, albums, page)
-                await callback.message.edit_text(text, reply_markup=keyboard)
+            if albums:
+                keyboard = create_albums_keyboard(artist, albums, page)
+                await callback.message.edit_text(albums_text(artist.name, albums), reply_markup=keyboard)
                 await callback.answer()
             else:
-                tracks = await search_tracks(session, artist_full, limit=50)
-                artist_tracks = [t for t in tracks if artist_full.lower() in t.artist.lower()]
+                artist_tracks = await get_tracks_by_artist_id(session, artist.artist_id, limit=30)
 
                 if artist_tracks:
-                    text = f"🎤 <b>Artist:</b> {html.quote(artist_full)}\n\n"
-                    text += f"🎵 <b>Tracks found:</b> {len(artist_tracks[:30])}\n\n"
-                    text += "Select a track:"
-
-                    keyboard = create_artist_tracks_keyboard(artist_tracks[:30], page=0, per_page=10)
-                    await callback.message.edit_text(text, reply_markup=keyboard)
+                    token = await get_callback_store().put_ids(
+                        session, [track.track_id for track in artist_tracks]
+                    )
+                    keyboard = create_artist_tracks_keyboard(artist_tracks, token, page=0, per_page=10)
+                    await callback.message.edit_text(
+                        artist_tracks_text(artist.name, artist_tracks),
+                        reply_markup=keyboard
+                    )
                     await callback.answer()
                 else:
                     await callback.answer("❌ No tracks found", show_alert=True)
@@ -619,32 +740,6 @@ async def handle_artist_selection(callback: CallbackQuery):
         await callback.answer("❌ Error", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("artists_page:"))
-async def handle_artists_pagination(callback: CallbackQuery):
-    page = int(callback.data.split(":")[1])
-
-    try:
-        async for session in get_session():
-            artists = await get_all_artists(session)
-
-            if artists:
-                for artist in artists:
-                    artist_key = artist[:30]
-                    cache_callback_data(artist_key, artist)
-
-                text = f"🎤 <b>Artists in Database</b>\n\n"
-                text += f"📊 <b>Total artists:</b> {len(artists)}\n\n"
-                text += "Select an artist to view their music:"
-
-                keyboard = create_artists_keyboard(artists, page)
-                await callback.message.edit_text(text, reply_markup=keyboard)
-                await callback.answer()
-
-    except Exception as e:
-        logger.error(f"Error handling artists pagination: {e}", exc_info=True)
-        await callback.answer("❌ Error", show_alert=True)
-
-
 @router.callback_query(F.data == "noop")
 async def handle_noop(callback: CallbackQuery):
     await callback.answer()
@@ -652,20 +747,21 @@ async def handle_noop(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("dl_all:"))
 async def handle_download_all_artist(callback: CallbackQuery):
-    artist = callback.data.split(":", 1)[1]
-    artist_full = get_cached_data(artist)
+    artist_ref = callback.data.split(":", 1)[1]
 
     try:
         await callback.answer("📥 Sending all tracks...", show_alert=False)
 
         async for session in get_session():
-            tracks = await search_tracks(session, artist_full, limit=100)
-            artist_tracks = [t for t in tracks if artist_full.lower() in t.artist.lower()]
+            artist = await resolve_artist(session, artist_ref)
+            artist_tracks = await get_tracks_by_artist_id(session, artist.artist_id, limit=100) if artist else []
 
             if not artist_tracks:
                 await callback.answer("❌ No tracks found", show_alert=True)
                 return
 
+            artist_full = artist.name
+
             status_msg = await callback.message.answer(
                 f"📥 <b>Sending {len(artist_tracks)} track(s) by {html.quote(artist_full)}</b>\n\n"
                 f"⏳ Please wait..."
@@ -730,23 +826,23 @@ async def handle_download_all_artist(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("dl_album:"))
 async def handle_download_album(callback: CallbackQuery):
-    parts = callback.data.split(":", 2)
-    artist = parts[1]
-    album = parts[2]
-
-    artist_full = get_cached_data(artist)
-    album_full = get_cached_data(album)
+    refs = callback.data.split(":")[1:]
 
     try:
         await callback.answer("📥 Sending album...", show_alert=False)
 
         async for session in get_session():
-            tracks = await get_tracks_by_album(session, artist_full, album_full)
+            album = await resolve_album(session, refs)
+            tracks = await get_tracks_by_album_id(session, album.album_id) if album else []
 
             if not tracks:
                 await callback.answer("❌ No tracks found", show_alert=True)
                 return
 
+            artist = await get_artist_by_id(session, album.artist_id)
+            artist_full = artist.name
+            album_full = album.title
+
             status_msg = await callback.message.answer(
                 f"📥 <b>Sending album</b>\n\n"
                 f"💿 {html.quote(album_full)}\n"
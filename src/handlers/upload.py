@@ -1,21 +1,32 @@
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from aiogram import html
+import asyncio
+import functools
 import os
+from typing import List, Optional, Tuple
 from utils.config import get_config
 from utils.logger import get_logger
-from utils.musicbrainz_api import fetch_album_with_fallback, enrich_track_metadata
-from utils.error_handler import sanitize_error_message, get_safe_error_text
+from utils.musicbrainz_api import enrich_track_metadata, get_release_tracklists
+from utils.error_handler import get_safe_error_text
+from utils.batcher import Batcher
+from utils.rate_limiter import get_rate_limiter_stats
+from utils.circuit_breaker import get_circuit_breaker
+from utils.musicbrainz_offline import get_offline_index, offline_only
 from db import get_session
 from db.models import Track
 from db.crud import (
-    add_track,
-    get_track_by_file_id,
-    get_tracks_without_album,
-    update_track_album,
-    count_tracks_without_album
+    ingest_track,
+    ingest_tracks,
+    count_tracks_without_album,
+    rebuild_catalog_stats
 )
-from sqlalchemy.exc import IntegrityError
+from db.cache import get_cache_stats, cache_enabled, catalog_version
+from db.callback_store import get_callback_store
+from db.lookup_cache import get_lookup_cache
+from db.artist_cache import get_artist_card_cache
+from db.enrichment_queue import get_enrichment_queue
+from db.enrichment import cancel_enrich_all, enrich_all_running, get_checkpoint, start_enrich_all
 
 logger = get_logger(__name__)
 router = Router()
@@ -37,6 +48,17 @@ def is_admin(user_id: int) -> bool:
     return user_id in config_admins
 
 
+def duplicate_track_text(track) -> str:
+    return (
+        "⚠️ <b>Track already exists</b>\n\n"
+        f"This track is already in the database:\n"
+        f"🎵 <b>{html.quote(track.title)}</b>\n"
+        f"👤 <b>{html.quote(track.artist)}</b>\n"
+        + (f"💿 <b>{html.quote(track.album)}</b>\n" if track.album else "") +
+        f"\n📊 Track ID: {track.track_id}"
+    )
+
+
 @router.message(Command("upload"))
 async def upload_command(message: types.Message):
     if not is_admin(message.from_user.id):
@@ -67,74 +89,102 @@ async def handle_audio_upload(message: types.Message):
         logger.warning(f"Unauthorized audio upload attempt by user {message.from_user.id}")
         return
 
-    config = get_config()
-    audio = message.audio
+    batcher = get_upload_batcher()
+    if batcher is None:
+        await upload_single_track(message)
+    else:
+        # A file outside a media group with nothing else pending for the
+        # chat is saved right away instead of waiting out the window
+        batcher.add(message.chat.id, message, wait=message.media_group_id is not None)
 
-    try:
-        title = audio.title or audio.file_name or "Unknown"
-        artist = audio.performer or "Unknown Artist"
-        duration = audio.duration
 
-        if title.endswith(('.mp3', '.m4a', '.flac', '.wav', '.ogg')):
-            title = title.rsplit('.', 1)[0]
+def audio_track_info(audio) -> Tuple[str, str, Optional[int]]:
+    title = audio.title or audio.file_name or "Unknown"
+    artist = audio.performer or "Unknown Artist"
 
-        logger.info(f"User {message.from_user.id} uploading: {title} by {artist}")
+    if title.endswith(('.mp3', '.m4a', '.flac', '.wav', '.ogg')):
+        title = title.rsplit('.', 1)[0]
 
-        async for session in get_session():
-            existing = await get_track_by_file_id(session, audio.file_id)
-            if existing:
-                logger.warning(f"Duplicate upload attempt: {audio.file_id}")
-                await message.answer(
-                    "⚠️ <b>Track already exists</b>\n\n"
-                    f"This track is already in the database:\n"
-                    f"🎵 <b>{existing.title}</b>\n"
-                    f"👤 <b>{existing.artist}</b>\n"
-                    + (f"💿 <b>{existing.album}</b>\n" if existing.album else "") +
-                    f"\n📊 Track ID: {existing.track_id}"
-                )
-                return
-        should_fetch = (
-            artist != "Unknown Artist"
-            and title != "Unknown"
-            and title != audio.file_name
-            and config.get('metadata.auto_fetch_album', True)
+    return title, artist, audio.duration
+
+
+def should_fetch_album(audio, title: str, artist: str) -> bool:
+    return (
+        artist != "Unknown Artist"
+        and title != "Unknown"
+        and title != audio.file_name
+        and get_config().get('metadata.auto_fetch_album', True)
+    )
+
+
+_upload_batcher: Optional[Batcher] = None
+
+
+def get_upload_batcher() -> Optional[Batcher]:
+    global _upload_batcher
+
+    config = get_config()
+    window = config.get('upload.batch_window_seconds', 0.5)
+    if not window:
+        return None
+
+    if _upload_batcher is None:
+        _upload_batcher = Batcher(
+            flush_uploads,
+            window=window,
+            max_size=config.get('upload.batch_max_size', 50)
         )
 
-        album = None
+    return _upload_batcher
 
-        if should_fetch:
-            search_msg = await message.answer(
-                "🔍 <b>Searching for album information...</b>\n"
-                "⏳ This may take a few seconds..."
-            )
 
-            try:
-                album = await fetch_album_with_fallback(artist, title)
+async def flush_uploads(chat_id: int, messages: List[types.Message]) -> None:
+    if len(messages) == 1:
+        await upload_single_track(messages[0])
+    else:
+        await upload_track_batch(messages)
 
-                await search_msg.delete()
 
-                if album:
-                    logger.info(f"Found album via API: {album}")
-                    await message.answer(
-                        f"✅ <b>Album found!</b>\n"
-                        f"💿 {album}"
-                    )
-                else:
-                    logger.info(f"No album found for {artist} - {title}")
-                    await message.answer(
-                        "ℹ️ <b>Album not found in databases</b>\n"
-                        "Track will be saved without album information."
-                    )
+def saved_track_text(track: Track, album_status: Optional[str] = None) -> str:
+    text = "✅ <b>Track saved successfully!</b>\n\n"
+    text += f"🎵 <b>Title:</b> {html.quote(track.title)}\n"
+    text += f"👤 <b>Artist:</b> {html.quote(track.artist)}\n"
 
-            except Exception as e:
-                logger.error(f"Error fetching metadata: {e}", exc_info=True)
-                await search_msg.delete()
-                await message.answer(
-                    "⚠️ <b>Could not fetch album info</b>\n"
-                    "Saving track with available metadata..."
-                )
-                album = None
-        else:
+    if track.album:
+        text += f"💿 <b>Album:</b> {html.quote(track.album)}" + (f" ({track.year})" if track.year else "") + "\n"
+    elif album_status == 'pending':
+        text += "💿 <b>Album:</b> <i>searching...</i>\n"
+    elif album_status == 'not_found':
+        text += "💿 <b>Album:</b> <i>not found in databases</i>\n"
+    elif album_status == 'failed':
+        text += "💿 <b>Album:</b> <i>lookup failed - /enrich_all will retry</i>\n"
+
+    if track.genre:
+        text += f"🎼 <b>Genre:</b> {html.quote(track.genre)}\n"
+
+    if track.duration:
+        minutes = track.duration // 60
+        seconds = track.duration % 60
+        text += f"⏱ <b>Duration:</b> {minutes}:{seconds:02d}\n"
+    text += f"\n📊 <b>Track ID:</b> {track.track_id}"
+    return text
+
+
+def edit_confirmations() -> bool:
+    return get_config().get('upload.edit_confirmation', True)
+
+
+async def upload_single_track(message: types.Message):
+    audio = message.audio
+
+    try:
+        title, artist, duration = audio_track_info(audio)
+
+        logger.info(f"User {message.from_user.id} uploading: {title} by {artist}")
+
+        should_fetch = should_fetch_album(audio, title, artist)
+
+        if not should_fetch:
             if artist == "Unknown Artist" or title == "Unknown":
                 logger.info(f"Skipping metadata fetch: incomplete track info")
                 await message.answer(
@@ -144,86 +194,131 @@ async def handle_audio_upload(message: types.Message):
             else:
                 logger.info(f"Metadata fetch disabled in config")
 
+        # The track is saved right away; its album is looked up in the background
         async for session in get_session():
             try:
-                track = await add_track(
+                track, created = await ingest_track(
                     session=session,
                     title=title,
                     artist=artist,
                     file_id=audio.file_id,
-                    album=album,
+                    album=None,
                     genre=None,
                     duration=duration,
                     tags=None
                 )
 
-                await session.commit()
-                await session.refresh(track)
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Unexpected error while saving track: {e}", exc_info=True)
+                error_text = get_safe_error_text(e, context="saving track")
+                await message.answer(error_text)
+                return
+
+        if not created:
+            logger.warning(f"Duplicate upload attempt: {audio.file_id}")
+            await message.answer(duplicate_track_text(track))
+            return
+
+        confirmation = await message.answer(saved_track_text(track, 'pending' if should_fetch else None))
+        logger.info(f"Track saved successfully: ID={track.track_id}, Title={title}")
 
-                success_text = "✅ <b>Track saved successfully!</b>\n\n"
-                success_text += f"🎵 <b>Title:</b> {title}\n"
-                success_text += f"👤 <b>Artist:</b> {artist}\n"
+        if should_fetch:
+            async def on_enriched(updated: Optional[Track], album_status: Optional[str]) -> None:
+                if edit_confirmations():
+                    await confirmation.edit_text(saved_track_text(updated or track, album_status))
 
-                if album:
-                    success_text += f"💿 <b>Album:</b> {album}\n"
+            get_enrichment_queue().submit(track.track_id, artist, title, on_enriched)
 
-                if duration:
-                    minutes = duration // 60
-                    seconds = duration % 60
-                    success_text += f"⏱ <b>Duration:</b> {minutes}:{seconds:02d}\n"
+    except Exception as e:
+        logger.error(f"Error processing audio upload: {e}", exc_info=True)
 
-                success_text += f"\n📊 <b>Track ID:</b> {track.track_id}"
+        error_text = get_safe_error_text(e, context="processing track")
+        await message.answer(error_text)
 
-                await message.answer(success_text)
-                logger.info(f"Track saved successfully: ID={track.track_id}, Title={title}, Album={album}")
 
-            except IntegrityError as e:
-                await session.rollback()
+def batch_summary_text(results: List[Tuple[Track, bool]], pending: int = 0, failed: int = 0,
+                       max_lines: int = 30) -> str:
+    saved = sum(1 for _, created in results if created)
+    with_album = sum(1 for track, created in results if created and track.album)
 
-                error_detail = str(e.orig) if hasattr(e, 'orig') else str(e)
-                logger.error(f"IntegrityError during save: {error_detail}", exc_info=True)
-
-                if 'unique' in error_detail.lower() or 'duplicate' in error_detail.lower():
-                    try:
-                        existing_track = await get_track_by_file_id(session, audio.file_id)
-                        if existing_track:
-                            await message.answer(
-                                "⚠️ <b>Track already exists in database</b>\n\n"
-                                f"🎵 <b>Title:</b> {html.quote(existing_track.title)}\n"
-                                f"👤 <b>Artist:</b> {html.quote(existing_track.artist)}\n"
-                                + (f"💿 <b>Album:</b> {html.quote(existing_track.album)}\n" if existing_track.album else "") +
-                                f"\n📊 <b>Track ID:</b> {existing_track.track_id}"
-                            )
-                        else:
-                            await message.answer(
-                                "⚠️ <b>Track already exists</b>\n\n"
-                                "This file has already been uploaded to the database."
-                            )
-                    except:
-                        await message.answer(
-                            "⚠️ <b>Duplicate track detected</b>\n\n"
-                            "This file already exists in the database."
-                        )
-                else:
-                    error_safe = sanitize_error_message(e, max_length=150)
-                    await message.answer(
-                        "❌ <b>Database error</b>\n\n"
-                        f"Could not save track due to a constraint violation.\n\n"
-                        f"<code>{error_safe}</code>"
-                    )
+    text = "📦 <b>Batch upload complete</b>\n\n"
+    text += f"✅ <b>Saved:</b> {saved}\n"
+    if saved < len(results):
+        text += f"⚠️ <b>Already in database:</b> {len(results) - saved}\n"
+    if saved:
+        text += f"💿 <b>With album:</b> {with_album}/{saved}\n"
+    if pending:
+        text += f"🔍 <b>Searching albums for:</b> {pending}\n"
+    if failed:
+        text += f"❗️ <b>Album lookup failed for:</b> {failed} <i>(/enrich_all will retry)</i>\n"
+    text += "\n"
 
-            except Exception as e:
-                await session.rollback()
-                logger.error(f"Unexpected error while saving track: {e}", exc_info=True)
+    for i, (track, created) in enumerate(results[:max_lines], 1):
+        line = f"{i}. {'✅' if created else '⚠️'} {html.quote(track.artist)} — {html.quote(track.title)}"
+        if track.album:
+            line += f" <i>({html.quote(track.album)})</i>"
+        text += line + f" [ID {track.track_id}]\n"
 
-                error_text = get_safe_error_text(e, context="saving track")
-                await message.answer(error_text)
+    if len(results) > max_lines:
+        text += f"…and {len(results) - max_lines} more\n"
+
+    return text
+
+
+async def upload_track_batch(messages: List[types.Message]):
+    message = messages[0]
+
+    logger.info(f"User {message.from_user.id} uploading a batch of {len(messages)} tracks")
+
+    status_msg = await message.answer(
+        f"📦 <b>Saving {len(messages)} tracks...</b>"
+    )
+
+    try:
+        items = []
+        for msg in messages:
+            title, artist, duration = audio_track_info(msg.audio)
+            items.append({
+                'title': title,
+                'artist': artist,
+                'file_id': msg.audio.file_id,
+                'duration': duration
+            })
+
+        async for session in get_session():
+            results = await ingest_tracks(session, items)
+
+        to_enrich = [
+            track for (track, created), msg in zip(results, messages)
+            if created and should_fetch_album(msg.audio, track.title, track.artist)
+        ]
+        await status_msg.edit_text(batch_summary_text(results, pending=len(to_enrich)))
 
     except Exception as e:
-        logger.error(f"Error processing audio upload: {e}", exc_info=True)
+        logger.error(f"Error processing upload batch: {e}", exc_info=True)
 
-        error_text = get_safe_error_text(e, context="processing track")
-        await message.answer(error_text)
+        error_text = get_safe_error_text(e, context="processing tracks")
+        await status_msg.edit_text(error_text)
+        return
+
+    # The summary is edited once, after the last album lookup of the batch
+    pending = {track.track_id for track in to_enrich}
+    failed = set()
+
+    async def on_enriched(track_id: int, updated: Optional[Track], album_status: Optional[str]) -> None:
+        nonlocal results
+        if updated is not None:
+            results = [(updated if track.track_id == track_id else track, created) for track, created in results]
+        if album_status == 'failed':
+            failed.add(track_id)
+        pending.discard(track_id)
+        if not pending and edit_confirmations():
+            await status_msg.edit_text(batch_summary_text(results, failed=len(failed)))
+
+    queue = get_enrichment_queue()
+    for track in to_enrich:
+        queue.submit(track.track_id, track.artist, track.title, functools.partial(on_enriched, track.track_id))
 
 
 @router.message(F.document)
@@ -250,14 +345,65 @@ async def bulk_upload_command(message: types.Message):
         "To upload multiple tracks:\n"
         "1️⃣ Select multiple audio files in your file manager\n"
         "2️⃣ Send them all at once to this chat\n"
-        "3️⃣ Each file will be processed automatically\n\n"
+        "3️⃣ Files sent together are saved as one batch with a single summary\n\n"
         "⚠️ <b>Important:</b>\n"
         "• Send files as <b>Audio</b>, not as documents\n"
         "• Files with proper metadata work best\n"
         "• The bot will search for albums automatically\n\n"
-        "💡 <b>Tip:</b> Processing multiple files may take time due to API rate limits "
-        "(~1 second per track for album lookup)."
+        "💡 <b>Tip:</b> Album lookups are rate limited by MusicBrainz "
+        "(~1 second per distinct track), so large batches take a while."
+    )
+
+
+def enrichment_progress_text(progress: dict) -> str:
+    processed = progress['processed']
+    updated = progress['updated']
+    counts = (
+        f"✅ Updated: {updated}\n"
+        f"❌ Not found: {progress['not_found']}\n"
+        f"⚠️ Failed: {progress['failed']}\n"
+        f"⏭ Skipped: {progress['skipped']}\n"
+    )
+
+    if progress['status'] == 'running':
+        rate = progress['run_processed'] / progress['elapsed'] if progress.get('elapsed') else 0
+        eta = f"~{progress['remaining'] / rate / 60:.0f} min" if rate else "calculating..."
+        return (
+            f"🔄 <b>Enriching tracks...</b>\n\n"
+            f"Processed: {processed} (last track #{progress['last_track_id']})\n"
+            f"{counts}\n"
+            f"📦 Left: {progress['remaining']}\n"
+            f"⏱ Estimated time: {eta}\n\n"
+            f"Stop with /enrich_cancel - the next /enrich_all resumes from here."
+        )
+
+    if progress['status'] == 'cancelled':
+        return (
+            f"⏹ <b>Enrichment stopped</b> after track #{progress['last_track_id']}\n\n"
+            f"{counts}\n"
+            f"💡 Run /enrich_all to resume, or /enrich_all restart to start over."
+        )
+
+    if progress['status'] == 'failed':
+        return (
+            "❌ <b>Error during metadata enrichment</b>\n\n"
+            f"Error: {html.quote(progress.get('error', '')[:200])}\n\n"
+            f"{counts}\n"
+            "Progress is saved - run /enrich_all to resume. Check logs for more details."
+        )
+
+    success_rate = (updated / processed * 100) if processed > 0 else 0
+    text = (
+        f"✅ <b>Metadata enrichment complete!</b>\n\n"
+        f"📊 <b>Results:</b>\n"
+        f"Total processed: {processed}\n"
+        f"{counts}\n"
+        f"📈 Success rate: {success_rate:.1f}%\n\n"
+        f"💡 Tracks with updated metadata can now be browsed by album!"
     )
+    if progress['failed']:
+        text += "\n🔁 Failed lookups were left without an album - /enrich_all restart asks again."
+    return text
 
 
 @router.message(Command("enrich_all"))
@@ -273,6 +419,8 @@ async def enrich_all_command(message: types.Message):
         logger.warning(f"Unauthorized /enrich_all attempt by user {user_id}")
         return
 
+    config = get_config()
+
     if not config.get('musicbrainz.enabled', True):
         await message.answer(
             "❌ <b>MusicBrainz integration is disabled</b>\n\n"
@@ -280,98 +428,78 @@ async def enrich_all_command(message: types.Message):
         )
         return
 
-    status_msg = await message.answer(
-        "🔄 <b>Starting metadata enrichment...</b>\n\n"
-        "⏳ This may take several minutes depending on the number of tracks."
-    )
+    if enrich_all_running():
+        await message.answer(
+            "🔄 <b>Enrichment is already running</b>\n\n"
+            "Use /enrich_cancel to stop it."
+        )
+        return
 
-    try:
-        async for session in get_session():
-            total_count = await count_tracks_without_album(session)
+    args = message.text.split(maxsplit=1)
+    restart = len(args) > 1 and args[1].strip().lower() == 'restart'
 
-            if total_count == 0:
-                await status_msg.edit_text(
-                    "✅ <b>All tracks already have album information!</b>\n\n"
-                    "No enrichment needed."
-                )
-                return
+    async for session in get_session():
+        checkpoint = await get_checkpoint(session)
+        total_count = await count_tracks_without_album(session)
 
-            limit = min(100, total_count)
-            tracks = await get_tracks_without_album(session, limit=limit)
+    if total_count == 0:
+        await message.answer(
+            "✅ <b>All tracks already have album information!</b>\n\n"
+            "No enrichment needed."
+        )
+        return
 
-            total = len(tracks)
-            updated = 0
-            failed = 0
-            skipped = 0
+    if checkpoint is not None and checkpoint.status != 'done' and not restart:
+        status_msg = await message.answer(
+            f"🔄 <b>Resuming metadata enrichment</b> after track #{checkpoint.last_track_id}...\n\n"
+            f"📊 Tracks without album: {total_count}"
+        )
+    else:
+        status_msg = await message.answer(
+            "🔄 <b>Starting metadata enrichment...</b>\n\n"
+            f"📊 Tracks without album: {total_count}\n"
+            "⏳ Large libraries take a while; progress is saved as it goes."
+        )
 
-            await status_msg.edit_text(
-                f"🔄 <b>Processing {total} tracks...</b>\n\n"
-                f"📊 Total tracks without album: {total_count}\n"
-                f"⚙️ Processing: {total}\n\n"
-                f"Progress: 0/{total}"
-            )
+    interval = config.get('metadata.enrich_progress_seconds', 10)
+    last_edit = 0.0
 
-            logger.info(f"Starting bulk enrichment: {total} tracks")
-
-            for i, track in enumerate(tracks, 1):
-                try:
-                    if track.artist.lower() in ['unknown artist', 'unknown']:
-                        skipped += 1
-                        continue
-
-                    album = await fetch_album_with_fallback(track.artist, track.title)
-
-                    if album:
-                        updated_track = await update_track_album(session, track.track_id, album)
-                        if updated_track:
-                            await session.commit()
-                            updated += 1
-                            logger.info(f"Enriched track {track.track_id}: {album}")
-                        else:
-                            failed += 1
-                    else:
-                        failed += 1
-                        logger.info(f"No album found for: {track.artist} - {track.title}")
-
-                    if i % 5 == 0 or i == total:
-                        await status_msg.edit_text(
-                            f"🔄 <b>Processing tracks...</b>\n\n"
-                            f"Progress: {i}/{total}\n"
-                            f"✅ Updated: {updated}\n"
-                            f"❌ Not found: {failed}\n"
-                            f"⏭ Skipped: {skipped}\n\n"
-                            f"⏱ Estimated time: ~{(total - i)} seconds"
-                        )
-
-                except Exception as e:
-                    logger.error(f"Error enriching track {track.track_id}: {e}", exc_info=True)
-                    failed += 1
-
-            success_rate = (updated / total * 100) if total > 0 else 0
-
-            await status_msg.edit_text(
-                f"✅ <b>Metadata enrichment complete!</b>\n\n"
-                f"📊 <b>Results:</b>\n"
-                f"Total processed: {total}\n"
-                f"✅ Successfully updated: {updated}\n"
-                f"❌ Not found: {failed}\n"
-                f"⏭ Skipped: {skipped}\n\n"
-                f"📈 Success rate: {success_rate:.1f}%\n\n"
-                f"💡 Tracks with updated metadata can now be browsed by album!"
-            )
+    async def report(progress: dict) -> None:
+        nonlocal last_edit
 
-            logger.info(
-                f"Enrichment complete: {updated}/{total} updated "
-                f"({success_rate:.1f}% success rate)"
-            )
+        now = asyncio.get_running_loop().time()
+        if progress['status'] == 'running' and now - last_edit < interval:
+            return
+        last_edit = now
 
-    except Exception as e:
-        logger.error(f"Error in bulk metadata enrichment: {e}", exc_info=True)
-        await status_msg.edit_text(
-            "❌ <b>Error during metadata enrichment</b>\n\n"
-            f"Error: {str(e)[:200]}\n\n"
-            "Check logs for more details."
+        try:
+            await status_msg.edit_text(enrichment_progress_text(progress))
+        except Exception as e:
+            logger.warning(f"Could not update enrichment progress: {e}")
+
+    start_enrich_all(report, restart=restart)
+    logger.info(f"Enrichment started by admin {user_id} (restart={restart})")
+
+
+@router.message(Command("enrich_cancel"))
+async def enrich_cancel_command(message: types.Message):
+
+    user_id = message.from_user.id
+
+    if not is_admin(user_id):
+        await message.answer(
+            "⛔️ <b>Access Denied</b>\n\n"
+            "This command is only available to administrators."
         )
+        logger.warning(f"Unauthorized /enrich_cancel attempt by user {user_id}")
+        return
+
+    if not await cancel_enrich_all():
+        await message.answer("ℹ️ No enrichment is running.")
+        return
+
+    await message.answer("⏹ <b>Enrichment stopped.</b> Run /enrich_all to resume.")
+    logger.info(f"Enrichment cancelled by admin {user_id}")
 
 
 @router.message(Command("album_stats"))
@@ -408,3 +536,159 @@ async def album_stats_command(message: types.Message):
     except Exception as e:
         logger.error(f"Error getting album stats: {e}", exc_info=True)
         await message.answer("❌ Error getting statistics")
+
+
+@router.message(Command("rebuild_stats"))
+async def rebuild_stats_command(message: types.Message):
+    user_id = message.from_user.id
+
+    if not is_admin(user_id):
+        await message.answer(
+            "⛔️ <b>Access Denied</b>\n\n"
+            "This command is only available to administrators."
+        )
+        logger.warning(f"Unauthorized /rebuild_stats attempt by user {user_id}")
+        return
+
+    try:
+        async for session in get_session():
+            stats = await rebuild_catalog_stats(session)
+
+        await message.answer(
+            "✅ <b>Statistics rebuilt</b>\n\n"
+            f"🎵 Tracks: {stats.total_tracks}\n"
+            f"👥 Artists: {stats.unique_artists}\n"
+            f"💿 Albums: {stats.unique_albums}\n"
+            f"🎸 Genres: {stats.genres_count}"
+        )
+        logger.info(f"Catalog stats rebuilt by admin {user_id}")
+
+    except Exception as e:
+        logger.error(f"Error rebuilding stats: {e}", exc_info=True)
+        await message.answer("❌ Error rebuilding statistics")
+
+
+@router.message(Command("refresh_lookups"))
+async def refresh_lookups_command(message: types.Message):
+    if not is_admin(message.from_user.id):
+        await message.answer(
+            "⛔️ <b>Access Denied</b>\n\n"
+            "This command is only available to administrators."
+        )
+        logger.warning(f"Unauthorized /refresh_lookups attempt by user {message.from_user.id}")
+        return
+
+    cache = get_lookup_cache()
+    if cache is None:
+        await message.answer("ℹ️ The metadata lookup cache is disabled.")
+        return
+
+    parts = message.text.split(maxsplit=1)
+    arg = parts[1].strip() if len(parts) > 1 else ''
+
+    async for session in get_session():
+        if not arg:
+            forgotten = await cache.forget(session, misses_only=True)
+            scope = "cached misses"
+        elif arg.lower() == 'all':
+            forgotten = await cache.forget(session)
+            scope = "cached lookups"
+        else:
+            forgotten = await cache.forget(session, artist=arg)
+            scope = f"cached lookups for <b>{html.quote(arg)}</b>"
+
+    logger.info(f"Admin {message.from_user.id} cleared {forgotten} metadata lookups ({arg or 'misses'})")
+    await message.answer(
+        f"🔄 Forgot {forgotten} {scope}.\n\n"
+        "They will be looked up again on the next upload or /enrich_all.\n"
+        "<i>Usage: /refresh_lookups [all | artist name]</i>"
+    )
+
+
+@router.message(Command("providers"))
+async def providers_command(message: types.Message):
+    if not is_admin(message.from_user.id):
+        await message.answer(
+            "⛔️ <b>Access Denied</b>\n\n"
+            "This command is only available to administrators."
+        )
+        return
+
+    limiters = get_rate_limiter_stats()
+    state_icons = {'closed': '🟢', 'half-open': '🟡', 'open': '🔴'}
+
+    text = "🌐 <b>Metadata Providers</b>\n\n"
+
+    index = get_offline_index()
+    if index is not None:
+        offline = index.stats()
+        text += (
+            f"💾 <b>offline index</b>: {offline['recordings']} recordings"
+            f"{' (only provider)' if offline_only() else ''}\n"
+            f"  🎯 Hits: {offline['hits']}, misses: {offline['misses']}\n\n"
+        )
+    for provider in ('musicbrainz', 'itunes', 'genius'):
+        breaker = get_circuit_breaker(provider).stats()
+
+        text += f"{state_icons[breaker['state']]} <b>{provider}</b>: {breaker['state']}"
+        if breaker['state'] != 'closed':
+            text += f", retry in {breaker['retry_in']:.0f}s"
+        text += (
+            f"\n  ❗️ Recent failures: {breaker['failures']}/{breaker['calls']}, "
+            f"tripped {breaker['trips']}x, skipped {breaker['rejected']} calls\n"
+        )
+
+        stats = limiters.get(provider)
+        if stats:
+            text += (
+                f"  🚦 {stats['rate']:g} req/s, burst {stats['burst']}\n"
+                f"  ⏳ Queued: {stats['queued']} (~{stats['queued'] / stats['rate']:.0f}s backlog)\n"
+                f"  📨 Sent: {stats['acquired']}, "
+                f"avg wait {stats['avg_wait']:.1f}s, max {stats['max_wait']:.1f}s\n"
+            )
+            if stats['blocked_for']:
+                text += f"  ⛔️ Backing off for {stats['blocked_for']:.0f}s\n"
+        text += "\n"
+
+    queue = get_enrichment_queue().stats()
+    text += (
+        f"📥 <b>Upload enrichment</b>\n"
+        f"  Queued: {queue['queued']}, in flight: {queue['in_flight']}\n"
+        f"  Tracks: {queue['submitted']} ({queue['joined']} shared a lookup), "
+        f"{queue['found']} found, {queue['not_found']} not found, {queue['failed']} failed\n"
+    )
+
+    await message.answer(text)
+
+
+@router.message(Command("cache_stats"))
+async def cache_stats_command(message: types.Message):
+    if not is_admin(message.from_user.id):
+        await message.answer(
+            "⛔️ <b>Access Denied</b>\n\n"
+            "This command is only available to administrators."
+        )
+        return
+
+    caches = dict(get_cache_stats())
+    caches['callback_tokens'] = get_callback_store().stats()
+
+    card_cache = get_artist_card_cache()
+    if card_cache is not None:
+        caches['artist_cards'] = card_cache.stats()
+
+    tracklists = get_release_tracklists()
+    if tracklists is not None:
+        caches['release_tracklists'] = tracklists.stats()
+
+    text = "🗄 <b>Cache Statistics</b>\n\n"
+    text += f"Read cache: {'on' if cache_enabled() else 'off'}, catalog version {catalog_version()}\n\n"
+
+    for name, stats in caches.items():
+        text += (
+            f"<b>{name}</b>: {stats['size']}/{stats['max_size']} entries, "
+            f"{stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate'] * 100:.0f}%)\n"
+        )
+
+    await message.answer(text)
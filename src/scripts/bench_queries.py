@@ -0,0 +1,129 @@
+"""Client-side CPU per hot crud query, with and without statement caching.
+
+Compares three setups on the same database:
+  rebuilt     statement built per call, no prepared statements
+  rebuilt+ps  statement built per call, asyncpg prepared-statement cache
+  prebuilt    statement from db/statements.py, prepared-statement cache
+
+CPU is measured with time.process_time(), so time spent waiting on the
+server is excluded and the numbers show the work saved in the bot process.
+
+Run from src/ with DATABASE_URL set:
+    python -m scripts.bench_queries --iterations 2000
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from utils.config import setup_config
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+async def sample_params(session: AsyncSession) -> dict:
+    from db.models import Track, Artist, Album
+
+    row = (await session.execute(
+        select(Track, Artist, Album)
+        .join(Artist, Artist.artist_id == Track.artist_id)
+        .join(Album, Album.album_id == Track.album_id)
+        .limit(1)
+    )).first()
+
+    if row is None:
+        raise SystemExit("Need at least one track with an album to benchmark")
+
+    track, artist, album = row
+    return {
+        'track_id': track.track_id,
+        'file_id': track.telegram_file_id,
+        'artist_id': artist.artist_id,
+        'album_id': album.album_id,
+        'artist_key': artist.name_key,
+        'album_key': album.title_key,
+        'needle': artist.name.lower()[:4],
+    }
+
+
+def hot_queries(sample: dict) -> list:
+    from db import statements
+    from db.ranking import like_patterns
+
+    search = like_patterns(sample['needle'])
+    ranked = dict(search, limit=5, weight=0.5)
+
+    return [
+        ('search', statements.search, (False, False), dict(search, limit=5)),
+        ('search ranked', statements.search, (True, True), ranked),
+        ('track by id', statements.track_by_id, (), {'track_id': sample['track_id']}),
+        ('track by file_id', statements.track_by_file_id, (), {'file_id': sample['file_id']}),
+        ('albums by artist', statements.albums_by_artist, (), like_patterns(sample['needle'])),
+        ('albums by artist id', statements.albums_by_artist_id, (), {'artist_id': sample['artist_id']}),
+        ('tracks by album', statements.tracks_by_album, (),
+         {'artist_key': sample['artist_key'], 'album_key': sample['album_key']}),
+        ('tracks by album id', statements.tracks_by_album_id, (), {'album_id': sample['album_id']}),
+    ]
+
+
+async def run_query(session_maker, build, params: dict, iterations: int) -> tuple:
+    async with session_maker() as session:
+        # Warm up the pool connection, the compiled cache and prepared statements
+        for _ in range(20):
+            (await session.execute(build(), params)).scalars().all()
+
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for _ in range(iterations):
+            (await session.execute(build(), params)).scalars().all()
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+    return cpu / iterations * 1e6, wall / iterations * 1e6
+
+
+async def main(iterations: int, cache_size: int) -> None:
+    import os
+
+    setup_config(BASE_DIR / "config.yaml")
+    url = os.environ["DATABASE_URL"]
+
+    engines = {
+        'rebuilt': create_async_engine(url, connect_args={'prepared_statement_cache_size': 0}),
+        'rebuilt+ps': create_async_engine(url, connect_args={'prepared_statement_cache_size': cache_size}),
+    }
+    engines['prebuilt'] = engines['rebuilt+ps']
+    makers = {name: async_sessionmaker(engine, expire_on_commit=False) for name, engine in engines.items()}
+
+    async with makers['rebuilt']() as session:
+        sample = await sample_params(session)
+
+    print(f"{iterations} iterations per query, CPU / wall time in µs per call\n")
+    print(f"{'query':<22}{'rebuilt':>17}{'rebuilt+ps':>19}{'prebuilt':>19}{'CPU saved':>13}")
+
+    for name, statement, variant, params in hot_queries(sample):
+        builders = {
+            'rebuilt': lambda: statement.__wrapped__(*variant),
+            'rebuilt+ps': lambda: statement.__wrapped__(*variant),
+            'prebuilt': lambda: statement(*variant),
+        }
+
+        timings = {}
+        for mode, build in builders.items():
+            timings[mode] = await run_query(makers[mode], build, params, iterations)
+
+        cells = ''.join(f"{cpu:>9.0f} /{wall:>6.0f}" + ' ' * 2 for cpu, wall in timings.values())
+        saved = 1 - timings['prebuilt'][0] / timings['rebuilt'][0]
+        print(f"{name:<22}{cells}{saved:>11.0%}")
+
+    for engine in set(engines.values()):
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--prepared-cache-size', type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iterations, args.prepared_cache_size))
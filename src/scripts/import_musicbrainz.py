@@ -0,0 +1,58 @@
+"""Build the offline MusicBrainz index used for album lookups.
+
+Reads either dump format from https://data.metabrainz.org/pub/musicbrainz/:
+  --json   the JSON release dump (release.tar.xz, or the extracted
+           mbdump/release file, optionally gz/bz2/xz-compressed)
+  --tsv    an extracted mbdump/ directory of the full PostgreSQL dump
+
+The index is built next to the output file and moved into place when
+complete. Point musicbrainz.offline_index in config.yaml at it and
+restart the bot to use a new one.
+
+Run from src/:
+    python -m scripts.import_musicbrainz --json release.tar.xz --output data/musicbrainz.sqlite
+"""
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+from utils.config import setup_config
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def main(json_dump: str, tsv_dir: str, output: str) -> None:
+    from utils.musicbrainz_offline import import_json_dump, import_tsv_dump
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    partial = output + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    started = time.perf_counter()
+    if json_dump:
+        recordings = import_json_dump(partial, json_dump)
+    else:
+        recordings = import_tsv_dump(partial, tsv_dir)
+    os.replace(partial, output)
+
+    size = os.path.getsize(output) / 1024 / 1024
+    print(f"{recordings} recordings indexed in {time.perf_counter() - started:.0f}s: {output} ({size:.1f} MB)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--json', help="JSON release dump")
+    source.add_argument('--tsv', help="extracted mbdump/ directory")
+    parser.add_argument('--output', help="index file (default: musicbrainz.offline_index from config.yaml)")
+    args = parser.parse_args()
+
+    config = setup_config(BASE_DIR / "config.yaml")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(message)s")
+    output = args.output or config.get('musicbrainz.offline_index')
+    if not output:
+        parser.error("--output is required when musicbrainz.offline_index is not set")
+
+    main(args.json, args.tsv, output)
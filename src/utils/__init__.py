@@ -1,13 +1,16 @@
 from .logger import setup_logger, get_logger
-from .genius_api import get_genius_client, GeniusClient
+from .genius_api import get_genius_client, AsyncGeniusClient, GeniusClient
 from .config import setup_config, get_config, Config
+from .normalize import normalize_key
 
 __all__ = [
     "setup_logger",
     "get_logger",
     "get_genius_client",
+    "AsyncGeniusClient",
     "GeniusClient",
     "setup_config",
     "get_config",
-    "Config"
+    "Config",
+    "normalize_key"
 ]
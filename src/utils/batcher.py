@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Batcher:
+    """Groups items per key until no new item arrives for ``window`` seconds.
+
+    Every new item restarts the wait, so a group is held only while items
+    keep arriving. It is also flushed as soon as it reaches ``max_size``,
+    and an item added with ``wait=False`` to an empty group is flushed
+    right away. ``flush`` receives the key and the items in arrival order;
+    it runs in its own task, so ``add`` never waits for it.
+    """
+
+    def __init__(self, flush: Callable[[Hashable, List[Any]], Awaitable[None]],
+                 window: float = 0.5, max_size: int = 50):
+        self.flush = flush
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[Hashable, List[Any]] = {}
+        self._timers: Dict[Hashable, asyncio.Task] = {}
+        self._running = set()
+
+    def add(self, key: Hashable, item: Any, wait: bool = True) -> None:
+        items = self._pending.setdefault(key, [])
+        items.append(item)
+
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        if len(items) >= self.max_size or (not wait and len(items) == 1):
+            self._start_flush(key)
+        else:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+    async def _flush_later(self, key: Hashable) -> None:
+        await asyncio.sleep(self.window)
+        self._timers.pop(key, None)
+        self._start_flush(key)
+
+    def _start_flush(self, key: Hashable) -> None:
+        items = self._pending.pop(key, [])
+        if not items:
+            return
+
+        task = asyncio.create_task(self._run(key, items))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, items: List[Any]) -> None:
+        try:
+            await self.flush(key, items)
+        except Exception as e:
+            logger.error(f"Batch flush for {key} failed ({len(items)} items): {e}", exc_info=True)
@@ -0,0 +1,147 @@
+import contextlib
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+from utils.http_client import provider_setting
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable, retrying in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Stops calling a provider that keeps failing.
+
+    The circuit opens when at least ``failure_rate`` of the last ``window``
+    calls failed (once ``min_calls`` were made). While open, calls fail
+    fast with CircuitOpenError. After the open period a single probe call
+    is let through: success closes the circuit, failure reopens it for
+    twice as long, up to ``max_open_seconds``.
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5, window: int = 20,
+                 open_seconds: float = 30, max_open_seconds: float = 600):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._outcomes = deque(maxlen=window)
+        self._open = False
+        self._open_until = 0.0
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if not self._open:
+            return CLOSED
+        return OPEN if time.monotonic() < self._open_until or self._probing else HALF_OPEN
+
+    def allows_requests(self) -> bool:
+        return self.state != OPEN
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if a call now would be rejected."""
+        if self.state == OPEN:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(0.0, self._open_until - time.monotonic()))
+
+    @contextlib.contextmanager
+    def guard(self, is_failure: Optional[Callable[[Exception], bool]] = None):
+        """Record the outcome of the wrapped call.
+
+        Exceptions count as failures unless ``is_failure`` says otherwise;
+        a cancelled call counts as nothing.
+        """
+        self.check()
+
+        probe = self._open
+        if probe:
+            self._probing = True
+
+        try:
+            yield
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                self._record(False, probe)
+            else:
+                self._record(True, probe)
+            raise
+        except BaseException:
+            if probe:
+                self._probing = False
+            raise
+        else:
+            self._record(True, probe)
+
+    def _record(self, ok: bool, probe: bool) -> None:
+        if probe:
+            self._probing = False
+            if ok:
+                logger.info(f"{self.name} recovered, closing circuit")
+                self._open = False
+                self.trips = 0
+                self._outcomes.clear()
+            else:
+                self._trip()
+            return
+
+        # Late results of calls started before the circuit opened
+        if self._open:
+            return
+
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._trip()
+
+    def _trip(self) -> None:
+        self.trips += 1
+        duration = min(self.max_open_seconds, self.open_seconds * 2 ** (self.trips - 1))
+        self._open = True
+        self._open_until = time.monotonic() + duration
+        self._outcomes.clear()
+        logger.warning(f"{self.name} is failing, skipping it for {duration:.0f}s (trip {self.trips})")
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'failures': self._outcomes.count(False),
+            'calls': len(self._outcomes),
+            'trips': self.trips,
+            'rejected': self.rejected,
+            'retry_in': max(0.0, self._open_until - time.monotonic()) if self._open else 0.0
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        breaker = _breakers[provider] = CircuitBreaker(
+            provider,
+            failure_rate=provider_setting(provider, 'failure_rate', 0.5),
+            min_calls=provider_setting(provider, 'min_calls', 5),
+            window=provider_setting(provider, 'window', 20),
+            open_seconds=provider_setting(provider, 'open_seconds', 30),
+            max_open_seconds=provider_setting(provider, 'max_open_seconds', 600)
+        )
+    return breaker
+
+
+def get_circuit_breaker_stats() -> Dict[str, dict]:
+    return {provider: breaker.stats() for provider, breaker in sorted(_breakers.items())}
@@ -1,16 +1,31 @@
+import asyncio
 import os
-import requests
+import aiohttp
 from typing import Optional, Dict, Any, List
+from utils.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from utils.http_client import get_http_session, provider_setting
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-class GeniusClient:
+class GeniusUnavailable(Exception):
+    """Genius could not be asked: circuit open or a request failed."""
+
+
+def _is_outage(error: Exception) -> bool:
+    """Client errors such as 404 say nothing about Genius being down."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return True
+
+
+class AsyncGeniusClient:
     BASE_URL = "https://api.genius.com"
 
-    def __init__(self, api_token: Optional[str] = None):
+    def __init__(self, api_token: Optional[str] = None, session: Optional[aiohttp.ClientSession] = None):
         self.api_token = api_token or os.getenv("GENIUS_API_TOKEN")
+        self.session = session
 
         if not self.api_token:
             logger.warning("GENIUS_API_TOKEN is not set - Genius features will be disabled")
@@ -29,51 +44,46 @@ class GeniusClient:
     def is_available(self) -> bool:
         return self.available
 
-    def search(self, query: str) -> Optional[List[Dict[str, Any]]]:
-        try:
-            url = f"{self.BASE_URL}/search"
-            params = {"q": query}
-
-            logger.info(f"Searching Genius for: {query}")
+    async def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        session = self.session or get_http_session('genius')
 
-            response = requests.get(
-                url,
+        with get_circuit_breaker('genius').guard(is_failure=_is_outage):
+            async with session.get(
+                f"{self.BASE_URL}{path}",
                 headers=self.headers,
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
+                params=params
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+
+        return data.get("response", {})
 
-            data = response.json()
-            hits = data.get("response", {}).get("hits", [])
+    async def search(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            logger.info(f"Searching Genius for: {query}")
+
+            data = await self._get("/search", {"q": query})
+            hits = data.get("hits", [])
 
             logger.info(f"Found {len(hits)} results")
             return hits
 
-        except requests.exceptions.RequestException as e:
+        except CircuitOpenError as e:
+            logger.warning(f"Skipped searching Genius: {e}")
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Error searching Genius: {e}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error in search: {e}", exc_info=True)
             return None
 
-    def get_artist(self, artist_id: int, text_format: str = "plain") -> Optional[Dict[str, Any]]:
+    async def get_artist(self, artist_id: int, text_format: str = "plain") -> Optional[Dict[str, Any]]:
         try:
-            url = f"{self.BASE_URL}/artists/{artist_id}"
-            params = {"text_format": text_format}
-
             logger.info(f"Fetching artist info for ID: {artist_id}")
 
-            response = requests.get(
-                url,
-                headers=self.headers,
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            artist = data.get("response", {}).get("artist", {})
+            data = await self._get(f"/artists/{artist_id}", {"text_format": text_format})
+            artist = data.get("artist", {})
 
             if not artist:
                 logger.warning(f"No artist data for ID: {artist_id}")
@@ -82,21 +92,23 @@ class GeniusClient:
             logger.info(f"Artist info fetched: {artist.get('name')}")
             return artist
 
-        except requests.exceptions.RequestException as e:
+        except CircuitOpenError as e:
+            logger.warning(f"Skipped fetching artist {artist_id}: {e}")
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Error fetching artist {artist_id}: {e}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error in get_artist: {e}", exc_info=True)
             return None
 
-    def get_artist_songs(
+    async def get_artist_songs(
         self,
         artist_id: int,
         sort: str = "popularity",
         per_page: int = 5
     ) -> Optional[List[Dict[str, Any]]]:
         try:
-            url = f"{self.BASE_URL}/artists/{artist_id}/songs"
             params = {
                 "sort": sort,
                 "per_page": per_page
@@ -104,21 +116,16 @@ class GeniusClient:
 
             logger.info(f"Fetching songs for artist ID {artist_id}")
 
-            response = requests.get(
-                url,
-                headers=self.headers,
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            songs = data.get("response", {}).get("songs", [])
+            data = await self._get(f"/artists/{artist_id}/songs", params)
+            songs = data.get("songs", [])
 
             logger.info(f"Found {len(songs)} songs")
             return songs
 
-        except requests.exceptions.RequestException as e:
+        except CircuitOpenError as e:
+            logger.warning(f"Skipped fetching songs for artist {artist_id}: {e}")
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Error fetching songs for artist {artist_id}: {e}")
             return None
         except Exception as e:
@@ -149,91 +156,154 @@ class GeniusClient:
 
         return None
 
-    def search_artist(self, artist_name: str) -> Optional[Dict[str, Any]]:
-        try:
-            hits = self.search(artist_name)
+    async def find_artist(self, artist_name: str) -> Optional[Dict[str, Any]]:
+        """Primary artist of the best search hit, or None if Genius has none.
 
-            if not hits:
-                logger.warning(f"Artist not found: {artist_name}")
-                return None
+        Raises GeniusUnavailable when the search itself failed, so callers
+        can tell "not found" from "could not ask".
+        """
+        hits = await self.search(artist_name)
 
-            first_hit = hits[0].get("result", {})
-            primary_artist = first_hit.get("primary_artist", {})
+        if hits is None:
+            raise GeniusUnavailable(f"search for '{artist_name}' failed")
 
-            if not primary_artist:
-                logger.warning(f"No primary artist in results for: {artist_name}")
-                return None
+        if not hits:
+            logger.warning(f"Artist not found: {artist_name}")
+            return None
 
-            artist_id = primary_artist.get("id")
-            artist_name_found = primary_artist.get("name")
+        first_hit = hits[0].get("result", {})
+        primary_artist = first_hit.get("primary_artist", {})
 
-            if not artist_id:
-                logger.error("Artist ID not found in search results")
-                return None
+        if not primary_artist:
+            logger.warning(f"No primary artist in results for: {artist_name}")
+            return None
+
+        if not primary_artist.get("id"):
+            logger.error("Artist ID not found in search results")
+            return None
 
-            logger.info(f"Found artist: {artist_name_found} (ID: {artist_id})")
+        logger.info(f"Found artist: {primary_artist.get('name')} (ID: {primary_artist['id']})")
+        return primary_artist
 
-            artist_full = self.get_artist(artist_id, text_format="plain")
+    async def fetch_artist(self, primary_artist: Dict[str, Any]) -> Dict[str, Any]:
+        """Full artist data for a find_artist() result.
 
-            if not artist_full:
-                logger.warning(f"Could not fetch full details for artist {artist_id}")
-                artist_full = primary_artist
+        ``complete`` is False when the details or songs could not be
+        fetched and the result falls back to what the search returned.
+        """
+        artist_id = primary_artist["id"]
+        artist_name_found = primary_artist.get("name")
 
-            songs = self.get_artist_songs(
+        # Both only need the id, so they go out together
+        artist_full, songs = await asyncio.gather(
+            self.get_artist(artist_id, text_format="plain"),
+            self.get_artist_songs(
                 artist_id,
                 sort="popularity",
                 per_page=5
             )
+        )
+        complete = artist_full is not None and songs is not None
+
+        if not artist_full:
+            logger.warning(f"Could not fetch full details for artist {artist_id}")
+            artist_full = primary_artist
+
+        description = self._extract_description(artist_full.get("description"))
+
+        if description:
+            logger.info(f"Description found for {artist_name_found}: {len(description)} chars")
+        else:
+            logger.warning(f"No description available for {artist_name_found}")
+
+        result = {
+            "name": artist_full.get("name"),
+            "id": artist_full.get("id"),
+            "url": artist_full.get("url"),
+            "image_url": artist_full.get("image_url") or artist_full.get("header_image_url"),
+            "description": description,
+            "alternate_names": artist_full.get("alternate_names", []),
+            "facebook": artist_full.get("facebook_name"),
+            "instagram": artist_full.get("instagram_name"),
+            "twitter": artist_full.get("twitter_name"),
+            "followers_count": artist_full.get("followers_count"),
+            "iq": artist_full.get("iq"),
+            "songs": [],
+            "complete": complete
+        }
 
-            description = self._extract_description(artist_full.get("description"))
-
-            if description:
-                logger.info(f"Description found for {artist_name_found}: {len(description)} chars")
-            else:
-                logger.warning(f"No description available for {artist_name_found}")
-
-            result = {
-                "name": artist_full.get("name"),
-                "id": artist_full.get("id"),
-                "url": artist_full.get("url"),
-                "image_url": artist_full.get("image_url") or artist_full.get("header_image_url"),
-                "description": description,
-                "alternate_names": artist_full.get("alternate_names", []),
-                "facebook": artist_full.get("facebook_name"),
-                "instagram": artist_full.get("instagram_name"),
-                "twitter": artist_full.get("twitter_name"),
-                "followers_count": artist_full.get("followers_count"),
-                "iq": artist_full.get("iq"),
-                "songs": []
-            }
+        if songs:
+            for song in songs:
+                result["songs"].append({
+                    "title": song.get("title"),
+                    "url": song.get("url"),
+                    "artist": song.get("primary_artist", {}).get("name"),
+                    "pageviews": song.get("stats", {}).get("pageviews"),
+                    "release_date": song.get("release_date_for_display")
+                })
 
-            if songs:
-                for song in songs:
-                    result["songs"].append({
-                        "title": song.get("title"),
-                        "url": song.get("url"),
-                        "artist": song.get("primary_artist", {}).get("name"),
-                        "pageviews": song.get("stats", {}).get("pageviews"),
-                        "release_date": song.get("release_date_for_display")
-                    })
+        result["song_count"] = len(result["songs"])
 
-            result["song_count"] = len(result["songs"])
+        logger.info(f"Successfully fetched full artist data for: {result['name']}")
+        return result
 
-            logger.info(f"Successfully fetched full artist data for: {result['name']}")
-            return result
+    async def search_artist(self, artist_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            primary_artist = await self.find_artist(artist_name)
+            if not primary_artist:
+                return None
+
+            return await self.fetch_artist(primary_artist)
 
         except Exception as e:
             logger.error(f"Error in search_artist for '{artist_name}': {e}", exc_info=True)
             return None
 
 
-_genius_client: Optional[GeniusClient] = None
+class GeniusClient:
+    """Blocking wrapper around AsyncGeniusClient for scripts.
+
+    Each call runs on its own event loop and connection, so it must not
+    be used from async code; the bot uses get_genius_client().
+    """
+
+    def __init__(self, api_token: Optional[str] = None):
+        self.api_token = api_token or os.getenv("GENIUS_API_TOKEN")
+        self.available = bool(self.api_token)
+
+    def is_available(self) -> bool:
+        return self.available
+
+    def _run(self, method: str, *args, **kwargs):
+        async def call():
+            timeout = aiohttp.ClientTimeout(total=provider_setting('genius', 'timeout', 10))
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                client = AsyncGeniusClient(self.api_token, session=session)
+                return await getattr(client, method)(*args, **kwargs)
+
+        return asyncio.run(call())
+
+    def search(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        return self._run('search', query)
+
+    def get_artist(self, artist_id: int, text_format: str = "plain") -> Optional[Dict[str, Any]]:
+        return self._run('get_artist', artist_id, text_format=text_format)
+
+    def get_artist_songs(self, artist_id: int, sort: str = "popularity",
+                         per_page: int = 5) -> Optional[List[Dict[str, Any]]]:
+        return self._run('get_artist_songs', artist_id, sort=sort, per_page=per_page)
+
+    def search_artist(self, artist_name: str) -> Optional[Dict[str, Any]]:
+        return self._run('search_artist', artist_name)
+
+
+_genius_client: Optional[AsyncGeniusClient] = None
 
 
-def get_genius_client() -> GeniusClient:
+def get_genius_client() -> AsyncGeniusClient:
     global _genius_client
 
     if _genius_client is None:
-        _genius_client = GeniusClient()
+        _genius_client = AsyncGeniusClient()
 
     return _genius_client
@@ -0,0 +1,64 @@
+from typing import Dict, Optional
+import aiohttp
+from utils.config import get_config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROVIDERS = ('musicbrainz', 'itunes', 'genius')
+
+_sessions: Dict[str, aiohttp.ClientSession] = {}
+
+
+def provider_setting(provider: str, name: str, default):
+    config = get_config()
+    return config.get(f'http.providers.{provider}.{name}', config.get(f'http.{name}', default))
+
+
+def _create_session(provider: str) -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=provider_setting(provider, 'limit', 10),
+        limit_per_host=provider_setting(provider, 'limit_per_host', 4),
+        ttl_dns_cache=provider_setting(provider, 'dns_cache_seconds', 300),
+        keepalive_timeout=provider_setting(provider, 'keepalive_seconds', 30)
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=provider_setting(provider, 'timeout', 10),
+        connect=provider_setting(provider, 'connect_timeout', 5)
+    )
+
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def get_http_session(provider: str) -> aiohttp.ClientSession:
+    """Keep-alive session for ``provider``, shared by every request to it.
+
+    Sessions are opened by start_http_clients() at startup; one is created
+    on first use when running outside the bot (scripts).
+    """
+    session = _sessions.get(provider)
+    if session is None or session.closed:
+        session = _sessions[provider] = _create_session(provider)
+    return session
+
+
+def request_timeout(session: aiohttp.ClientSession, timeout: Optional[float]) -> aiohttp.ClientTimeout:
+    """Per-request override of the session timeout; None keeps the session's.
+
+    Passing ``timeout=None`` to a request would disable the timeout
+    entirely, so the session's own is passed back instead.
+    """
+    return aiohttp.ClientTimeout(total=timeout) if timeout is not None else session.timeout
+
+
+async def start_http_clients() -> None:
+    for provider in PROVIDERS:
+        get_http_session(provider)
+    logger.info(f"HTTP clients ready: {', '.join(PROVIDERS)}")
+
+
+async def close_http_clients() -> None:
+    for provider, session in list(_sessions.items()):
+        if not session.closed:
+            await session.close()
+    _sessions.clear()
@@ -1,31 +1,35 @@
-import aiohttp
 import asyncio
-from typing import Optional, Dict
+import weakref
+from typing import Optional, Dict, List, Tuple
 from urllib.parse import quote
+from utils.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from utils.config import get_config
+from utils.http_client import get_http_session, request_timeout
 from utils.logger import get_logger
+from utils.lru import LRUCache
+from utils.musicbrainz_offline import get_offline_index, offline_only, release_year
+from utils.rate_limiter import get_rate_limiter, respect_retry_after
+from utils.normalize import normalize_key
 
 logger = get_logger(__name__)
 
 USER_AGENT = "TelegramMusicBot/1.0 (https://github.com/yhdessa/retriitti)"
 
-_last_request_time = 0
-_rate_limit_delay = 1.0
+# What a lookup fills in; every provider answer is a dict with these keys
+METADATA_FIELDS = ('album', 'year', 'genre', 'duration', 'mb_recording_id', 'mb_release_id')
 
 
-async def _rate_limit():
-    global _last_request_time
-    current_time = asyncio.get_event_loop().time()
-    time_since_last = current_time - _last_request_time
+class LookupFailed(Exception):
+    """A provider could not be asked: timeout, HTTP error or rate limit."""
 
-    if time_since_last < _rate_limit_delay:
-        await asyncio.sleep(_rate_limit_delay - time_since_last)
 
-    _last_request_time = asyncio.get_event_loop().time()
+async def _search_recording(artist: str, title: str, timeout: Optional[int] = None) -> Optional[Dict]:
+    breaker = get_circuit_breaker('musicbrainz')
 
-
-async def search_recording(artist: str, title: str, timeout: int = 10) -> Optional[Dict]:
     try:
-        await _rate_limit()
+        # Skip the rate-limit queue entirely while the circuit is open
+        breaker.check()
+        await get_rate_limiter('musicbrainz').acquire()
 
         query = f'artist:"{artist}" AND recording:"{title}"'
 
@@ -39,12 +43,13 @@ async def search_recording(artist: str, title: str, timeout: int = 10) -> Option
             'User-Agent': USER_AGENT
         }
 
-        async with aiohttp.ClientSession() as session:
+        session = get_http_session('musicbrainz')
+        with breaker.guard():
             async with session.get(
                 url,
                 params=params,
                 headers=headers,
-                timeout=aiohttp.ClientTimeout(total=timeout)
+                timeout=request_timeout(session, timeout)
             ) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -56,97 +61,270 @@ async def search_recording(artist: str, title: str, timeout: int = 10) -> Option
                         logger.info(f"No recordings found for: {artist} - {title}")
                         return None
 
-                elif response.status == 503:
+                elif response.status in (429, 503):
                     logger.warning("MusicBrainz API rate limit exceeded")
+                    respect_retry_after('musicbrainz', response.headers, default=5.0)
+                    raise LookupFailed("MusicBrainz rate limit exceeded")
+                elif response.status < 500:
+                    # e.g. a title the search syntax can't parse; asking again won't help
+                    logger.error(f"MusicBrainz rejected the query ({response.status}) for: {artist} - {title}")
                     return None
                 else:
                     logger.error(f"MusicBrainz API error: {response.status}")
-                    return None
+                    raise LookupFailed(f"MusicBrainz API error: {response.status}")
 
+    except CircuitOpenError as e:
+        raise LookupFailed(str(e)) from e
     except asyncio.TimeoutError:
         logger.warning(f"Timeout searching MusicBrainz for: {artist} - {title}")
-        return None
+        raise LookupFailed("MusicBrainz timeout")
+    except LookupFailed:
+        raise
     except Exception as e:
         logger.error(f"Error searching MusicBrainz: {e}")
-        return None
+        raise LookupFailed(str(e)) from e
 
 
-async def fetch_album_name(artist: str, title: str) -> Optional[str]:
-    recording = await search_recording(artist, title)
+async def search_recording(artist: str, title: str, timeout: Optional[int] = None) -> Optional[Dict]:
+    try:
+        return await _search_recording(artist, title, timeout)
+    except LookupFailed:
+        return None
 
-    if recording and recording.get('releases'):
-        releases = recording['releases']
 
-        for release in releases:
-            release_group = release.get('release-group', {})
-            primary_type = release_group.get('primary-type', '')
+def _pick_release(releases: List[Dict]) -> Optional[Dict]:
+    for release in releases:
+        release_group = release.get('release-group', {})
+        primary_type = release_group.get('primary-type', '')
 
-            if primary_type == 'Album':
-                album_name = release.get('title')
-                if album_name:
-                    logger.info(f"Found album: {album_name} for {artist} - {title}")
-                    return album_name
+        if primary_type == 'Album' and release.get('title'):
+            return release
 
-        first_release = releases[0].get('title')
-        if first_release:
-            logger.info(f"Found release: {first_release} for {artist} - {title}")
-            return first_release
+    if releases and releases[0].get('title'):
+        return releases[0]
 
-    logger.info(f"No album found for: {artist} - {title}")
     return None
 
 
-async def fetch_full_metadata(artist: str, title: str) -> Dict[str, Optional[str]]:
-    recording = await search_recording(artist, title)
+def _metadata(**fields) -> Dict:
+    return {field: fields.get(field) for field in METADATA_FIELDS}
 
-    metadata = {
-        'album': None,
-        'genre': None,
-        'year': None,
-        'duration': None
-    }
 
-    if not recording:
-        return metadata
+def _top_tag(tags: Optional[List[Dict]]) -> Optional[str]:
+    if not tags:
+        return None
+    name = max(tags, key=lambda tag: tag.get('count', 0)).get('name')
+    return name.title() if name else None
 
-    if recording.get('releases'):
-        releases = recording['releases']
 
-        for release in releases:
-            release_group = release.get('release-group', {})
-            primary_type = release_group.get('primary-type', '')
+def _recording_metadata(recording: Dict, release: Dict) -> Dict:
+    return _metadata(
+        album=release['title'],
+        year=release_year(release.get('date')),
+        genre=_top_tag(recording.get('tags')),
+        duration=recording['length'] // 1000 if recording.get('length') else None,
+        mb_recording_id=recording.get('id'),
+        mb_release_id=release.get('id')
+    )
 
-            if primary_type == 'Album':
-                metadata['album'] = release.get('title')
 
-                if release.get('date'):
-                    try:
-                        metadata['year'] = release['date'].split('-')[0]
-                    except:
-                        pass
-                break
+async def fetch_release_tracklist(release_id: str, timeout: Optional[int] = None) -> Optional[List[Dict]]:
+    """Tracks of a release: their titles, recording id and duration.
 
-        if not metadata['album'] and releases:
-            metadata['album'] = releases[0].get('title')
-            if releases[0].get('date'):
-                try:
-                    metadata['year'] = releases[0]['date'].split('-')[0]
-                except:
-                    pass
-
-    if recording.get('tags'):
-        tags = recording['tags']
-        if tags:
-            sorted_tags = sorted(tags, key=lambda x: x.get('count', 0), reverse=True)
-            if sorted_tags:
-                metadata['genre'] = sorted_tags[0].get('name', '').title()
-
-    if recording.get('length'):
+    None if MusicBrainz does not know the release; LookupFailed if it
+    could not be asked.
+    """
+    breaker = get_circuit_breaker('musicbrainz')
+
+    try:
+        breaker.check()
+        await get_rate_limiter('musicbrainz').acquire()
+
+        url = f"https://musicbrainz.org/ws/2/release/{release_id}"
+        params = {
+            'inc': 'recordings',
+            'fmt': 'json'
+        }
+        headers = {
+            'User-Agent': USER_AGENT
+        }
+
+        session = get_http_session('musicbrainz')
+        with breaker.guard():
+            async with session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=request_timeout(session, timeout)
+            ) as response:
+                if response.status in (429, 503):
+                    respect_retry_after('musicbrainz', response.headers, default=5.0)
+                if response.status == 429 or response.status >= 500:
+                    raise LookupFailed(f"MusicBrainz API error: {response.status}")
+                if response.status != 200:
+                    logger.warning(f"MusicBrainz release lookup failed ({response.status}): {release_id}")
+                    return None
+
+                data = await response.json()
+
+    except CircuitOpenError as e:
+        raise LookupFailed(str(e)) from e
+    except asyncio.TimeoutError:
+        logger.warning(f"Timeout fetching MusicBrainz release: {release_id}")
+        raise LookupFailed("MusicBrainz timeout")
+    except LookupFailed:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching MusicBrainz release: {e}")
+        raise LookupFailed(str(e)) from e
+
+    tracks = []
+    for medium in data.get('media', []):
+        for track in medium.get('tracks', []):
+            recording = track.get('recording') or {}
+            length = recording.get('length') or track.get('length')
+            tracks.append({
+                'titles': [title for title in (track.get('title'), recording.get('title')) if title],
+                'mb_recording_id': recording.get('id'),
+                'duration': length // 1000 if length else None
+            })
+
+    return tracks
+
+
+class ReleaseTracklists:
+    """Tracklists of releases that uploads already resolved, per artist.
+
+    Once one track of a release has been looked up, its siblings are
+    matched here by normalized title instead of spending a rate-limited
+    search request each. They get the release's metadata (including the
+    genre found for the first track) with their own recording id and
+    duration.
+    """
+
+    def __init__(self, max_artists: int = 500, ttl: Optional[float] = None, max_releases: int = 20):
+        self._cache = LRUCache(max_artists, ttl)
+        self.max_releases = max_releases
+
+    def find(self, artist: str, title: str) -> Optional[Dict]:
+        title_key = normalize_key(title)
+        for release_id, release, tracks in self._cache.get(normalize_key(artist)) or []:
+            if title_key in tracks:
+                recording_id, duration = tracks[title_key]
+                return dict(release, mb_recording_id=recording_id, duration=duration)
+        return None
+
+    def has_release(self, artist: str, release_id: str) -> bool:
+        releases = self._cache.get(normalize_key(artist)) or []
+        return any(cached_id == release_id for cached_id, _, _ in releases)
+
+    def add(self, artist: str, release_id: str, release: Dict,
+            tracks: Dict[str, Tuple[Optional[str], Optional[int]]]) -> None:
+        """Cache ``tracks`` (title key -> recording id, duration) of a release."""
+        key = normalize_key(artist)
+        releases = []
+        for cached in self._cache.get(key) or []:
+            if cached[0] == release_id:
+                tracks = {**cached[2], **tracks}
+            else:
+                releases.append(cached)
+
+        release = {field: release[field] for field in ('album', 'year', 'genre', 'mb_release_id')}
+        releases.insert(0, (release_id, release, tracks))
+        self._cache.set(key, releases[:self.max_releases])
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+_tracklists: Optional[ReleaseTracklists] = None
+# One lookup per artist at a time, so siblings wait for the first to cache its release
+_artist_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def get_release_tracklists() -> Optional[ReleaseTracklists]:
+    global _tracklists
+
+    config = get_config()
+    if not config.get('musicbrainz.prefetch_tracklists', True):
+        return None
+
+    if _tracklists is None:
+        _tracklists = ReleaseTracklists(
+            max_artists=config.get('musicbrainz.tracklist_cache_artists', 500),
+            ttl=config.get('musicbrainz.tracklist_cache_hours', 24) * 3600
+        )
+
+    return _tracklists
+
+
+def _artist_lock(artist: str) -> asyncio.Lock:
+    key = normalize_key(artist)
+    lock = _artist_locks.get(key)
+    if lock is None:
+        lock = _artist_locks[key] = asyncio.Lock()
+    return lock
+
+
+async def _search_metadata(artist: str, title: str, tracklists: Optional[ReleaseTracklists]) -> Optional[Dict]:
+    recording = await _search_recording(artist, title)
+
+    release = _pick_release(recording.get('releases') or []) if recording else None
+    if release is None:
+        logger.info(f"No album found for: {artist} - {title}")
+        return None
+
+    metadata = _recording_metadata(recording, release)
+    logger.info(f"Found album: {metadata['album']} for {artist} - {title}")
+
+    release_id = release.get('id')
+    if tracklists is not None and release_id:
+        tracks = {}
         try:
-            metadata['duration'] = int(recording['length']) // 1000
-        except:
-            pass
+            if not tracklists.has_release(artist, release_id):
+                for track in await fetch_release_tracklist(release_id) or []:
+                    for track_title in track['titles']:
+                        tracks[normalize_key(track_title)] = (track['mb_recording_id'], track['duration'])
+        except LookupFailed as e:
+            # This track is resolved; leave the release uncached so the
+            # next sibling fetches the tracklist again
+            logger.warning(f"Could not prefetch tracklist of release {release_id}: {e}")
+        else:
+            tracks[normalize_key(title)] = (metadata['mb_recording_id'], metadata['duration'])
+            tracklists.add(artist, release_id, metadata, tracks)
+
+    return metadata
+
+
+async def _fetch_musicbrainz_metadata(artist: str, title: str) -> Optional[Dict]:
+    tracklists = get_release_tracklists()
+    if tracklists is None:
+        return await _search_metadata(artist, title, None)
 
+    async with _artist_lock(artist):
+        metadata = tracklists.find(artist, title)
+        if metadata:
+            logger.info(f"Found album in cached tracklist: {metadata['album']} for {artist} - {title}")
+            return metadata
+
+        return await _search_metadata(artist, title, tracklists)
+
+
+async def fetch_album_name(artist: str, title: str) -> Optional[str]:
+    try:
+        metadata = await _fetch_musicbrainz_metadata(artist, title)
+    except LookupFailed:
+        return None
+    return metadata['album'] if metadata else None
+
+
+async def fetch_full_metadata(artist: str, title: str) -> Dict[str, Optional[str]]:
+    try:
+        metadata = await fetch_metadata(artist, title)
+    except LookupFailed:
+        metadata = None
+
+    metadata = metadata or _metadata()
     logger.info(f"Fetched metadata for {artist} - {title}: {metadata}")
     return metadata
 
@@ -174,7 +352,9 @@ async def enrich_track_metadata(
     }
 
 
-async def fetch_album_from_itunes(artist: str, title: str) -> Optional[str]:
+async def _fetch_itunes_metadata(artist: str, title: str) -> Optional[Dict]:
+    breaker = get_circuit_breaker('itunes')
+
     try:
         url = "https://itunes.apple.com/search"
         params = {
@@ -184,36 +364,171 @@ async def fetch_album_from_itunes(artist: str, title: str) -> Optional[str]:
             'limit': 1
         }
 
-        async with aiohttp.ClientSession() as session:
+        breaker.check()
+        await get_rate_limiter('itunes').acquire()
+
+        session = get_http_session('itunes')
+        with breaker.guard():
             async with session.get(
                 url,
-                params=params,
-                timeout=aiohttp.ClientTimeout(total=5)
+                params=params
             ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    results = data.get('results', [])
-
-                    if results:
-                        album = results[0].get('collectionName')
-                        if album:
-                            logger.info(f"Found album from iTunes: {album}")
-                            return album
+                if response.status in (403, 429):
+                    # iTunes signals throttling with 403
+                    respect_retry_after('itunes', response.headers, default=60.0)
+                if response.status != 200:
+                    raise LookupFailed(f"iTunes API error: {response.status}")
+
+                # iTunes answers with text/javascript
+                data = await response.json(content_type=None)
+                results = data.get('results', [])
+
+                if results and results[0].get('collectionName'):
+                    result = results[0]
+                    logger.info(f"Found album from iTunes: {result['collectionName']}")
+                    length = result.get('trackTimeMillis')
+                    return _metadata(
+                        album=result['collectionName'],
+                        year=release_year(result.get('releaseDate')),
+                        genre=result.get('primaryGenreName'),
+                        duration=length // 1000 if length else None
+                    )
 
         return None
 
+    except CircuitOpenError as e:
+        raise LookupFailed(str(e)) from e
+    except LookupFailed as e:
+        logger.error(f"Error fetching from iTunes: {e}")
+        raise
     except Exception as e:
         logger.error(f"Error fetching from iTunes: {e}")
+        raise LookupFailed(str(e)) from e
+
+
+async def fetch_album_from_itunes(artist: str, title: str) -> Optional[str]:
+    try:
+        metadata = await _fetch_itunes_metadata(artist, title)
+    except LookupFailed:
         return None
+    return metadata['album'] if metadata else None
 
 
-async def fetch_album_with_fallback(artist: str, title: str) -> Optional[str]:
-    album = await fetch_album_name(artist, title)
+async def _fetch_metadata_sequential(artist: str, title: str) -> Optional[Dict]:
+    failure = None
+
+    try:
+        metadata = await _fetch_musicbrainz_metadata(artist, title)
+        if metadata:
+            return metadata
+    except LookupFailed as e:
+        failure = e
+
+    if get_config().get('metadata.fallback_to_itunes', True):
+        logger.info(f"Trying iTunes API as fallback for {artist} - {title}")
+        try:
+            metadata = await _fetch_itunes_metadata(artist, title)
+            if metadata:
+                return metadata
+        except LookupFailed as e:
+            failure = e
 
-    if album:
-        return album
+    if failure is not None:
+        raise failure
+
+    return None
+
+
+async def _fetch_metadata_hedged(artist: str, title: str) -> Optional[Dict]:
+    config = get_config()
+    use_itunes = config.get('metadata.fallback_to_itunes', True)
+
+    primary = asyncio.create_task(_fetch_musicbrainz_metadata(artist, title))
+    tasks = [primary]
+    pending = {primary}
+    failure = None
+
+    def start_fallback(reason: str) -> None:
+        logger.info(f"Asking iTunes for {artist} - {title} ({reason})")
+        fallback = asyncio.create_task(_fetch_itunes_metadata(artist, title))
+        tasks.append(fallback)
+        pending.add(fallback)
+
+    try:
+        if use_itunes:
+            queued = get_rate_limiter('musicbrainz').waiting
+            if queued >= config.get('metadata.hedge_queue_depth', 3):
+                start_fallback(f"{queued} MusicBrainz requests queued")
+            else:
+                await asyncio.wait({primary}, timeout=config.get('metadata.hedge_delay', 1.5))
+                if not primary.done():
+                    start_fallback("MusicBrainz is slow")
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                pending.discard(task)
+                try:
+                    metadata = task.result()
+                except LookupFailed as e:
+                    failure = e
+                    continue
+                if metadata:
+                    return metadata
+
+            if use_itunes and len(tasks) == 1 and primary.done():
+                start_fallback("not on MusicBrainz")
+
+        if failure is not None:
+            raise failure
+
+        return None
+
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
 
-    logger.info(f"Trying iTunes API as fallback for {artist} - {title}")
-    album = await fetch_album_from_itunes(artist, title)
 
-    return album
+async def fetch_metadata(artist: str, title: str, hedged: bool = False,
+                         deadline: Optional[float] = None) -> Optional[Dict]:
+    """Everything one provider answer tells about a track, or None if no album was found.
+
+    The dict has METADATA_FIELDS as keys; fields a provider doesn't know
+    are None. Asks the offline index, then MusicBrainz, falling back to
+    iTunes. Raises LookupFailed when nothing was found and a provider
+    failed. ``hedged`` asks iTunes too once MusicBrainz is slow (or its
+    queue is long) and takes whichever finds an album first. ``deadline``
+    bounds the whole lookup in seconds. With musicbrainz.offline_only set,
+    the offline index is the only provider asked.
+    """
+    index = get_offline_index()
+    if index is not None:
+        metadata = index.find_metadata(artist, title)
+        if metadata or offline_only():
+            return metadata
+
+    lookup = _fetch_metadata_hedged(artist, title) if hedged else _fetch_metadata_sequential(artist, title)
+
+    if deadline is None:
+        return await lookup
+
+    try:
+        return await asyncio.wait_for(lookup, deadline)
+    except asyncio.TimeoutError:
+        logger.warning(f"Album lookup for {artist} - {title} gave up after {deadline}s")
+        raise LookupFailed(f"no answer within {deadline}s")
+
+
+async def fetch_album(artist: str, title: str, hedged: bool = False,
+                      deadline: Optional[float] = None) -> Optional[str]:
+    metadata = await fetch_metadata(artist, title, hedged=hedged, deadline=deadline)
+    return metadata['album'] if metadata else None
+
+
+async def fetch_album_with_fallback(artist: str, title: str) -> Optional[str]:
+    try:
+        return await fetch_album(artist, title)
+    except LookupFailed:
+        return None
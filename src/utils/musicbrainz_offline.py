@@ -0,0 +1,340 @@
+import bz2
+import gzip
+import json
+import lzma
+import os
+import re
+import sqlite3
+import tarfile
+from typing import Dict, IO, Iterator, List, Optional
+from utils.config import get_config
+from utils.logger import get_logger
+from utils.normalize import normalize_key
+
+logger = get_logger(__name__)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS release_groups ("
+    "id INTEGER PRIMARY KEY, "
+    "gid TEXT NOT NULL UNIQUE, "
+    "title TEXT NOT NULL, "
+    "primary_type TEXT)",
+    "CREATE TABLE IF NOT EXISTS releases ("
+    "id INTEGER PRIMARY KEY, "
+    "gid TEXT NOT NULL UNIQUE, "
+    "release_group_id INTEGER, "
+    "title TEXT NOT NULL, "
+    "status TEXT, "
+    "year INTEGER)",
+    # One row per recording appearance; WITHOUT ROWID keeps the key the only copy
+    "CREATE TABLE IF NOT EXISTS recordings ("
+    "artist_key TEXT NOT NULL, "
+    "title_key TEXT NOT NULL, "
+    "release_id INTEGER NOT NULL, "
+    "PRIMARY KEY (artist_key, title_key, release_id)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+_FIND_RELEASES = (
+    "SELECT r.title, r.status, r.year, rg.primary_type, r.gid "
+    "FROM recordings AS rec "
+    "JOIN releases AS r ON r.id = rec.release_id "
+    "LEFT JOIN release_groups AS rg ON rg.id = r.release_group_id "
+    "WHERE rec.artist_key = ? AND rec.title_key = ?"
+)
+
+
+def _release_rank(release: tuple) -> tuple:
+    # Same preference as the web service lookup: albums first, then
+    # official releases, then the earliest one
+    title, status, year, primary_type, gid = release
+    return (primary_type != 'Album', status != 'Official', year or 9999, title)
+
+
+class OfflineIndex:
+    """Read-only album lookups in a local index built from a MusicBrainz dump.
+
+    See scripts/import_musicbrainz.py for building one. Lookups are single
+    index seeks, so they run inline rather than in a thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self.hits = 0
+        self.misses = 0
+
+    def find_metadata(self, artist: str, title: str) -> Optional[Dict]:
+        """Album, year and release id in the shape of musicbrainz_api.fetch_metadata()."""
+        releases = self._conn.execute(_FIND_RELEASES, (normalize_key(artist), normalize_key(title))).fetchall()
+        if not releases:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        album, _, year, _, gid = min(releases, key=_release_rank)
+        return {
+            'album': album,
+            'year': year,
+            'genre': None,
+            'duration': None,
+            'mb_recording_id': None,
+            'mb_release_id': gid
+        }
+
+    def stats(self) -> dict:
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        return {
+            'path': self.path,
+            'recordings': int(meta.get('recordings', 0)),
+            'imported_at': meta.get('imported_at'),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_offline_index: Optional[OfflineIndex] = None
+
+
+def get_offline_index() -> Optional[OfflineIndex]:
+    """The index named by musicbrainz.offline_index, or None if unset or missing."""
+    global _offline_index
+
+    path = get_config().get('musicbrainz.offline_index')
+    if not path:
+        return None
+
+    if _offline_index is None or _offline_index.path != path:
+        if not os.path.exists(path):
+            logger.warning(f"Offline MusicBrainz index not found: {path}")
+            return None
+        _offline_index = OfflineIndex(path)
+        logger.info(f"Offline MusicBrainz index opened: {path}")
+
+    return _offline_index
+
+
+def offline_only() -> bool:
+    return get_config().get('musicbrainz.offline_only', False) and get_offline_index() is not None
+
+
+def _open_text(path: str) -> IO[str]:
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _json_lines(path: str) -> Iterator[dict]:
+    if '.tar' in os.path.basename(path):
+        # The official dumps are tarballs with the data in mbdump/release
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith('mbdump/release'):
+                    for line in archive.extractfile(member):
+                        yield json.loads(line)
+                    return
+        raise ValueError(f"No mbdump/release file in {path}")
+
+    with _open_text(path) as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _credit_name(artist_credit: List[dict]) -> str:
+    return ''.join(credit.get('name', '') + credit.get('joinphrase', '') for credit in artist_credit or [])
+
+
+def release_year(date: Optional[str]) -> Optional[int]:
+    return int(date[:4]) if date and date[:4].isdigit() else None
+
+
+def create_index(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    # Bulk load: the index can be rebuilt from the dump if the import dies
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def _finish_index(conn: sqlite3.Connection) -> int:
+    recordings = conn.execute("SELECT count(*) FROM recordings").fetchone()[0]
+    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+        ('recordings', str(recordings)),
+        ('imported_at', conn.execute("SELECT datetime('now')").fetchone()[0])
+    ])
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return recordings
+
+
+def import_json_dump(index_path: str, dump_path: str, batch_size: int = 1000) -> int:
+    """Import a MusicBrainz JSON release dump; returns the recordings indexed.
+
+    ``dump_path`` is the release dump: the release.tar.xz archive or the
+    extracted JSON-lines file, optionally gz/bz2/xz-compressed.
+    """
+    conn = create_index(index_path)
+    releases = 0
+
+    for release in _json_lines(dump_path):
+        group = release.get('release-group') or {}
+        group_id = None
+        if group.get('id'):
+            conn.execute(
+                "INSERT OR IGNORE INTO release_groups (gid, title, primary_type) VALUES (?, ?, ?)",
+                (group['id'], group.get('title') or release['title'], group.get('primary-type'))
+            )
+            group_id = conn.execute("SELECT id FROM release_groups WHERE gid = ?", (group['id'],)).fetchone()[0]
+
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO releases (gid, release_group_id, title, status, year) VALUES (?, ?, ?, ?, ?)",
+            (release['id'], group_id, release['title'], release.get('status'), release_year(release.get('date')))
+        )
+        if not cursor.rowcount:
+            continue
+
+        rows = set()
+        for medium in release.get('media') or []:
+            for track in medium.get('tracks') or []:
+                recording = track.get('recording') or {}
+                artist = _credit_name(recording.get('artist-credit') or track.get('artist-credit'))
+                title = recording.get('title') or track.get('title')
+                if artist and title:
+                    rows.add((normalize_key(artist), normalize_key(title), cursor.lastrowid))
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO recordings (artist_key, title_key, release_id) VALUES (?, ?, ?)", rows
+        )
+
+        releases += 1
+        if releases % batch_size == 0:
+            conn.commit()
+            if releases % (batch_size * 100) == 0:
+                logger.info(f"Imported {releases} releases")
+
+    recordings = _finish_index(conn)
+    logger.info(f"Offline index built from {releases} releases: {recordings} recordings")
+    return recordings
+
+
+# Columns of the MusicBrainz PostgreSQL dump (mbdump/) files the index needs
+TSV_COLUMNS = {
+    'artist_credit': {'id': 0, 'name': 1},
+    'recording': {'id': 0, 'name': 2, 'artist_credit': 3},
+    'track': {'recording': 2, 'medium': 3},
+    'medium': {'id': 0, 'release': 1},
+    'release': {'id': 0, 'gid': 1, 'name': 2, 'release_group': 4, 'status': 5},
+    'release_group': {'id': 0, 'gid': 1, 'name': 2, 'type': 4},
+    'release_status': {'id': 0, 'name': 1},
+    'release_group_primary_type': {'id': 0, 'name': 1},
+    'release_country': {'release': 0, 'year': 2},
+    'release_unknown_country': {'release': 0, 'year': 1},
+}
+
+OPTIONAL_TSV = {'release_country', 'release_unknown_country'}
+
+
+# Staging columns joined on while building the index
+TSV_KEYS = {
+    'artist_credit': 'id',
+    'recording': 'id',
+    'medium': 'id',
+    'release_status': 'id',
+    'release_group_primary_type': 'id',
+    'release_country': 'release',
+    'release_unknown_country': 'release',
+}
+
+_COPY_ESCAPE = re.compile(r'\\(.)')
+_COPY_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', '\\': '\\'}
+
+
+def _copy_value(value: str) -> Optional[str]:
+    # PostgreSQL COPY text format: \N is NULL, backslash escapes otherwise
+    if value == '\\N':
+        return None
+    if '\\' in value:
+        return _COPY_ESCAPE.sub(lambda m: _COPY_ESCAPES.get(m.group(1), m.group(1)), value)
+    return value
+
+
+def _tsv_rows(path: str, columns: Dict[str, int]) -> Iterator[tuple]:
+    with _open_text(path) as lines:
+        for line in lines:
+            row = line.rstrip('\n').split('\t')
+            yield tuple(_copy_value(row[i]) for i in columns.values())
+
+
+def _tsv_path(dump_dir: str, table: str) -> Optional[str]:
+    for suffix in ('', '.gz', '.bz2', '.xz'):
+        path = os.path.join(dump_dir, table + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def import_tsv_dump(index_path: str, dump_dir: str) -> int:
+    """Import the tables of an extracted MusicBrainz mbdump/ directory.
+
+    The dump files are loaded into temporary tables and joined in SQLite,
+    with normalize_key() registered as an SQL function.
+    """
+    missing = [table for table in TSV_COLUMNS if table not in OPTIONAL_TSV and not _tsv_path(dump_dir, table)]
+    if missing:
+        raise FileNotFoundError(f"Missing dump files in {dump_dir}: {', '.join(missing)}")
+
+    conn = create_index(index_path)
+    conn.create_function('normalize_key', 1, normalize_key, deterministic=True)
+    conn.execute("PRAGMA temp_store = FILE")
+
+    for table, columns in TSV_COLUMNS.items():
+        path = _tsv_path(dump_dir, table)
+        if path is None:
+            continue
+        conn.execute(f"CREATE TEMP TABLE dump_{table} ({', '.join(columns)})")
+        placeholders = ', '.join('?' * len(columns))
+        conn.executemany(f"INSERT INTO dump_{table} VALUES ({placeholders})", _tsv_rows(path, columns))
+        logger.info(f"Loaded {table}")
+
+    for table in OPTIONAL_TSV:
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS dump_{table} (release, year)")
+
+    for table, key in TSV_KEYS.items():
+        conn.execute(f"CREATE INDEX temp.ix_dump_{table} ON dump_{table} ({key})")
+
+    conn.execute(
+        "INSERT OR IGNORE INTO release_groups (id, gid, title, primary_type) "
+        "SELECT rg.id, rg.gid, rg.name, t.name FROM dump_release_group AS rg "
+        "LEFT JOIN dump_release_group_primary_type AS t ON t.id = rg.type"
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO releases (id, gid, release_group_id, title, status, year) "
+        "SELECT r.id, r.gid, r.release_group, r.name, s.name, "
+        "(SELECT min(CAST(year AS INTEGER)) FROM ("
+        "SELECT year FROM dump_release_country WHERE release = r.id "
+        "UNION ALL SELECT year FROM dump_release_unknown_country WHERE release = r.id)) "
+        "FROM dump_release AS r LEFT JOIN dump_release_status AS s ON s.id = r.status"
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO recordings (artist_key, title_key, release_id) "
+        "SELECT DISTINCT normalize_key(ac.name), normalize_key(rec.name), CAST(m.release AS INTEGER) "
+        "FROM dump_track AS t "
+        "JOIN dump_recording AS rec ON rec.id = t.recording "
+        "JOIN dump_artist_credit AS ac ON ac.id = rec.artist_credit "
+        "JOIN dump_medium AS m ON m.id = t.medium"
+    )
+
+    recordings = _finish_index(conn)
+    logger.info(f"Offline index built from {dump_dir}: {recordings} recordings")
+    return recordings
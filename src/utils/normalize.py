@@ -0,0 +1,15 @@
+import unicodedata
+from typing import Optional
+
+
+def normalize_key(value: Optional[str]) -> str:
+    """Lookup key for artist/album names: NFKD, accents stripped, casefolded.
+
+    "Björk", "bjork" and "BJÖRK " all map to "bjork".
+    """
+    if not value:
+        return ''
+
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
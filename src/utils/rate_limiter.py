@@ -0,0 +1,137 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from utils.http_client import provider_setting
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Requests per second and burst size when config.yaml has none
+DEFAULT_LIMITS = {
+    'musicbrainz': (1.0, 1),
+    'itunes': (0.33, 3)
+}
+
+
+class TokenBucket:
+    """Async token bucket allowing ``rate`` requests per second, ``burst`` at once.
+
+    Callers are served strictly in arrival order: the lock is FIFO and
+    only the caller at the head of the queue sleeps for the next token.
+    block_for() pauses the bucket, e.g. for a provider's Retry-After, and
+    empties it, so after the pause requests resume at ``rate`` instead of
+    in a burst.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now: float) -> None:
+        # No tokens accrue during a block; they build up from its end
+        since = max(self._updated, self._blocked_until)
+        if now > since:
+            self._tokens = min(self.burst, self._tokens + (now - since) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Wait for a token; returns the seconds spent waiting."""
+        start = time.monotonic()
+        self.waiting += 1
+
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+
+                    if now < self._blocked_until:
+                        delay = self._blocked_until - now
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    else:
+                        delay = (1 - self._tokens) / self.rate
+
+                    await asyncio.sleep(delay)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def block_for(self, seconds: float) -> None:
+        now = time.monotonic()
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self._refill(now)
+        self._tokens = 0.0
+
+    def stats(self) -> dict:
+        return {
+            'rate': self.rate,
+            'burst': self.burst,
+            'queued': self.waiting,
+            'acquired': self.acquired,
+            'avg_wait': self.total_wait / self.acquired if self.acquired else 0.0,
+            'max_wait': self.max_wait,
+            'blocked_for': max(0.0, self._blocked_until - time.monotonic())
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        rate, burst = DEFAULT_LIMITS.get(provider, (1.0, 1))
+        limiter = _limiters[provider] = TokenBucket(
+            rate=provider_setting(provider, 'rate', rate),
+            burst=provider_setting(provider, 'burst', burst)
+        )
+    return limiter
+
+
+def respect_retry_after(provider: str, headers, default: float) -> float:
+    """Pause ``provider``'s limiter after a 429/503; returns the pause in seconds."""
+    delay = parse_retry_after(headers.get('Retry-After'))
+    if delay is None:
+        delay = default
+
+    get_rate_limiter(provider).block_for(delay)
+    logger.warning(f"{provider} asked us to back off, pausing requests for {delay:.1f}s")
+    return delay
+
+
+def get_rate_limiter_stats() -> Dict[str, dict]:
+    return {provider: limiter.stats() for provider, limiter in sorted(_limiters.items())}
@@ -0,0 +1,18 @@
+"""Test setup: put src/ on the path and load config.yaml, as bot.py does.
+
+Tests that need Postgres run only when TEST_DATABASE_URL points at a
+disposable database; they drop and recreate its schema.
+"""
+import os
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / 'src'
+sys.path.insert(0, str(SRC))
+
+# db.session builds its engine at import time; nothing connects until used
+os.environ['DATABASE_URL'] = os.getenv('TEST_DATABASE_URL', 'postgresql+asyncpg://localhost/music_bot_test')
+
+from utils.config import setup_config  # noqa: E402
+
+setup_config(SRC / 'config.yaml')
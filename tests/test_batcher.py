@@ -0,0 +1,90 @@
+import asyncio
+from utils.batcher import Batcher
+
+
+def _collect(window=0.05, max_size=50):
+    flushed = []
+
+    async def flush(key, items):
+        flushed.append((key, list(items)))
+
+    return Batcher(flush, window=window, max_size=max_size), flushed
+
+
+def test_lone_item_without_wait_flushes_at_once():
+    async def scenario():
+        batcher, flushed = _collect(window=10)
+        batcher.add(1, 'a', wait=False)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return flushed
+
+    assert asyncio.run(scenario()) == [(1, ['a'])]
+
+
+def test_no_wait_item_joins_a_pending_group():
+    async def scenario():
+        batcher, flushed = _collect()
+        batcher.add(1, 'a')
+        batcher.add(1, 'b', wait=False)
+        await asyncio.sleep(0.01)
+        assert flushed == []
+        await asyncio.sleep(0.1)
+        return flushed
+
+    assert asyncio.run(scenario()) == [(1, ['a', 'b'])]
+
+
+def test_window_restarts_while_items_keep_arriving():
+    async def scenario():
+        batcher, flushed = _collect(window=0.05)
+        for item in 'abc':
+            batcher.add(1, item)
+            await asyncio.sleep(0.03)
+        assert flushed == []
+        await asyncio.sleep(0.05)
+        return flushed
+
+    assert asyncio.run(scenario()) == [(1, ['a', 'b', 'c'])]
+
+
+def test_groups_are_kept_per_key():
+    async def scenario():
+        batcher, flushed = _collect()
+        batcher.add(1, 'a')
+        batcher.add(2, 'b')
+        batcher.add(1, 'c')
+        await asyncio.sleep(0.1)
+        return sorted(flushed)
+
+    assert asyncio.run(scenario()) == [(1, ['a', 'c']), (2, ['b'])]
+
+
+def test_full_group_flushes_without_waiting():
+    async def scenario():
+        batcher, flushed = _collect(window=10, max_size=2)
+        batcher.add(1, 'a')
+        batcher.add(1, 'b')
+        batcher.add(1, 'c')
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return flushed
+
+    assert asyncio.run(scenario()) == [(1, ['a', 'b'])]
+
+
+def test_failing_flush_is_contained():
+    async def scenario():
+        calls = []
+
+        async def flush(key, items):
+            calls.append(key)
+            raise RuntimeError("boom")
+
+        batcher = Batcher(flush, window=0.01)
+        batcher.add(1, 'a')
+        batcher.add(2, 'b', wait=False)
+        await asyncio.sleep(0.05)
+        return sorted(calls)
+
+    assert asyncio.run(scenario()) == [1, 2]
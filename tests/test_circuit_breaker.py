@@ -0,0 +1,123 @@
+import pytest
+from utils import circuit_breaker
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeTime:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(circuit_breaker, 'time', fake)
+    return fake
+
+
+def call(breaker: CircuitBreaker, ok: bool, is_failure=None) -> None:
+    try:
+        with breaker.guard(is_failure):
+            if not ok:
+                raise ValueError("provider error")
+    except ValueError:
+        pass
+
+
+def tripped(open_seconds: float = 30) -> CircuitBreaker:
+    breaker = CircuitBreaker('test', min_calls=2, window=4, open_seconds=open_seconds, max_open_seconds=100)
+    call(breaker, False)
+    call(breaker, False)
+    return breaker
+
+
+def test_opens_at_failure_rate_after_min_calls(clock):
+    breaker = CircuitBreaker('test', failure_rate=0.5, min_calls=4, window=10)
+    for ok in (False, False, False):
+        call(breaker, ok)
+    # Three failures, but fewer than min_calls calls
+    assert breaker.state == CLOSED
+
+    call(breaker, True)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+
+
+def test_stays_closed_below_failure_rate(clock):
+    breaker = CircuitBreaker('test', failure_rate=0.5, min_calls=4, window=10)
+    for ok in (True, True, True, False, False):
+        call(breaker, ok)
+    assert breaker.state == CLOSED
+    assert breaker.stats()['failures'] == 2
+
+
+def test_open_circuit_fails_fast(clock):
+    breaker = tripped()
+
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.check()
+    assert info.value.retry_in == pytest.approx(30)
+    assert breaker.rejected == 1
+    assert not breaker.allows_requests()
+
+
+def test_successful_probe_closes(clock):
+    breaker = tripped()
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+
+    call(breaker, True)
+    assert breaker.state == CLOSED
+    assert breaker.trips == 0
+
+
+def test_failed_probe_reopens_for_twice_as_long(clock):
+    breaker = tripped()
+    clock.now += 30
+    call(breaker, False)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()['retry_in'] == pytest.approx(60)
+
+    clock.now += 60
+    call(breaker, False)
+    assert breaker.stats()['retry_in'] == pytest.approx(100)
+
+
+def test_only_one_probe_at_a_time(clock):
+    breaker = tripped()
+    clock.now += 30
+
+    with breaker.guard():
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+
+def test_is_failure_filters_exceptions(clock):
+    breaker = CircuitBreaker('test', min_calls=2)
+    call(breaker, False, is_failure=lambda e: False)
+    call(breaker, False, is_failure=lambda e: False)
+    assert breaker.state == CLOSED
+    assert breaker.stats()['failures'] == 0
+
+
+def test_cancelled_probe_releases_the_half_open_slot(clock):
+    breaker = tripped()
+    clock.now += 30
+
+    with pytest.raises(KeyboardInterrupt):
+        with breaker.guard():
+            raise KeyboardInterrupt
+
+    assert breaker.state == HALF_OPEN
+
+
+def test_late_results_after_opening_are_ignored(clock):
+    breaker = tripped()
+    breaker._record(True, probe=False)
+    assert breaker.state == OPEN
+    assert breaker.stats()['calls'] == 0
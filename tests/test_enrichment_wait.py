@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from db import enrichment
+from utils.circuit_breaker import CircuitBreaker
+from utils.config import get_config
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    """Fresh breakers for both providers; sleeping closes the MusicBrainz one."""
+    config = get_config()
+    monkeypatch.setattr(config, '_cache', {})
+    monkeypatch.setitem(config._data['metadata'], 'fallback_to_itunes', True)
+    monkeypatch.setattr(enrichment, 'offline_only', lambda: False)
+
+    by_name = {name: CircuitBreaker(name, open_seconds=30) for name in ('musicbrainz', 'itunes')}
+    monkeypatch.setattr(enrichment, 'get_circuit_breaker', by_name.__getitem__)
+
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        by_name['musicbrainz']._open = False
+
+    monkeypatch.setattr(enrichment.asyncio, 'sleep', fake_sleep)
+    return by_name, sleeps
+
+
+def wait() -> None:
+    asyncio.run(enrichment._wait_for_provider())
+
+
+def test_no_wait_while_musicbrainz_is_up(breakers):
+    by_name, sleeps = breakers
+    by_name['itunes']._trip()
+
+    wait()
+    assert sleeps == []
+
+
+def test_no_wait_while_itunes_can_take_lookups(breakers):
+    by_name, sleeps = breakers
+    by_name['musicbrainz']._trip()
+
+    wait()
+    assert sleeps == []
+
+
+def test_waits_while_every_provider_is_open(breakers):
+    by_name, sleeps = breakers
+    by_name['musicbrainz']._trip()
+    by_name['itunes']._trip()
+
+    wait()
+    assert sleeps == [pytest.approx(30, abs=1)]
+
+
+def test_waits_for_musicbrainz_without_itunes_fallback(breakers, monkeypatch):
+    by_name, sleeps = breakers
+    monkeypatch.setitem(get_config()._data['metadata'], 'fallback_to_itunes', False)
+    by_name['musicbrainz']._trip()
+
+    wait()
+    assert len(sleeps) == 1
+
+
+def test_never_waits_offline_only(breakers, monkeypatch):
+    by_name, sleeps = breakers
+    monkeypatch.setattr(enrichment, 'offline_only', lambda: True)
+    by_name['musicbrainz']._trip()
+    by_name['itunes']._trip()
+
+    wait()
+    assert sleeps == []
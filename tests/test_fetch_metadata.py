@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from utils import musicbrainz_api
+from utils.config import get_config
+from utils.musicbrainz_api import LookupFailed, fetch_metadata
+from utils.rate_limiter import get_rate_limiter
+
+MB = {'album': 'From MusicBrainz'}
+ITUNES = {'album': 'From iTunes'}
+
+
+@pytest.fixture
+def set_metadata(monkeypatch):
+    """Override metadata.* settings for one test (Config caches lookups)."""
+    config = get_config()
+    monkeypatch.setattr(config, '_cache', {})
+
+    def set_value(key, value):
+        monkeypatch.setitem(config._data['metadata'], key, value)
+        config._cache.clear()
+
+    set_value('fallback_to_itunes', True)
+    set_value('hedge_delay', 0.05)
+    set_value('hedge_queue_depth', 3)
+    return set_value
+
+
+@pytest.fixture
+def providers(monkeypatch, set_metadata):
+    """Fake providers: each answer is (delay, result or exception)."""
+    calls = []
+    answers = {}
+
+    def fake(name):
+        async def lookup(artist, title):
+            calls.append(name)
+            delay, result = answers[name]
+            await asyncio.sleep(delay)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return lookup
+
+    monkeypatch.setattr(musicbrainz_api, '_fetch_musicbrainz_metadata', fake('musicbrainz'))
+    monkeypatch.setattr(musicbrainz_api, '_fetch_itunes_metadata', fake('itunes'))
+    return answers, calls
+
+
+def lookup(**kwargs):
+    return asyncio.run(fetch_metadata('Artist', 'Title', **kwargs))
+
+
+def test_hedged_fast_musicbrainz_skips_itunes(providers):
+    answers, calls = providers
+    answers.update(musicbrainz=(0, MB), itunes=(0, ITUNES))
+
+    assert lookup(hedged=True) == MB
+    assert calls == ['musicbrainz']
+
+
+def test_hedged_slow_musicbrainz_asks_itunes(providers):
+    answers, calls = providers
+    answers.update(musicbrainz=(1, MB), itunes=(0, ITUNES))
+
+    assert lookup(hedged=True) == ITUNES
+    assert calls == ['musicbrainz', 'itunes']
+
+
+def test_hedged_long_queue_asks_itunes_at_once(providers, monkeypatch):
+    answers, calls = providers
+    answers.update(musicbrainz=(0.2, MB), itunes=(0.1, ITUNES))
+    monkeypatch.setattr(get_rate_limiter('musicbrainz'), 'waiting', 3)
+
+    assert lookup(hedged=True) == ITUNES
+
+
+def test_hedged_miss_falls_back_to_itunes(providers):
+    answers, calls = providers
+    answers.update(musicbrainz=(0, None), itunes=(0, ITUNES))
+
+    assert lookup(hedged=True) == ITUNES
+
+
+def test_hedged_slow_itunes_miss_waits_for_musicbrainz(providers):
+    answers, calls = providers
+    answers.update(musicbrainz=(0.1, MB), itunes=(0, None))
+
+    assert lookup(hedged=True) == MB
+
+
+def test_hedged_failure_is_raised_when_nothing_found(providers):
+    answers, calls = providers
+    answers.update(musicbrainz=(0, LookupFailed("503")), itunes=(0, None))
+
+    with pytest.raises(LookupFailed):
+        lookup(hedged=True)
+
+
+def test_hedged_without_itunes_waits_for_musicbrainz(providers, set_metadata):
+    answers, calls = providers
+    set_metadata('fallback_to_itunes', False)
+    answers.update(musicbrainz=(0.1, MB), itunes=(0, ITUNES))
+
+    assert lookup(hedged=True) == MB
+    assert calls == ['musicbrainz']
+
+
+def test_deadline_raises_lookup_failed(providers):
+    answers, calls = providers
+    answers.update(musicbrainz=(1, MB), itunes=(1, ITUNES))
+
+    with pytest.raises(LookupFailed):
+        lookup(hedged=True, deadline=0.1)
+
+
+def test_sequential_falls_back_after_failure(providers):
+    answers, calls = providers
+    answers.update(musicbrainz=(0, LookupFailed("timeout")), itunes=(0, ITUNES))
+
+    assert lookup() == ITUNES
+    assert calls == ['musicbrainz', 'itunes']
+
+
+def test_sequential_miss_everywhere_is_none(providers):
+    answers, calls = providers
+    answers.update(musicbrainz=(0, None), itunes=(0, None))
+
+    assert lookup() is None
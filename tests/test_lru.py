@@ -0,0 +1,93 @@
+import pytest
+from utils import lru
+from utils.lru import LRUCache
+
+
+class FakeTime:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(lru, 'time', fake)
+    return fake
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_set_refreshes_recency():
+    cache = LRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 10)
+    cache.set('c', 3)
+    assert cache.get('a') == 10
+    assert 'b' not in cache
+
+
+def test_falsy_values_are_hits():
+    cache = LRUCache(4)
+    cache.set('none', None)
+    cache.set('zero', 0)
+    assert 'none' in cache
+    assert cache.get('zero', 'default') == 0
+    assert cache.get('missing', 'default') == 'default'
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(4, ttl=10)
+    cache.set('a', 1)
+
+    clock.now += 10
+    assert cache.get('a') == 1
+
+    clock.now += 1
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_pop_and_clear():
+    cache = LRUCache(4)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.pop('a') == 1
+    assert cache.pop('a', 'gone') == 'gone'
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache(4)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+    assert stats['size'] == 1
+
+
+def test_size_is_at_least_one():
+    cache = LRUCache(0)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
@@ -0,0 +1,30 @@
+import pytest
+from utils.normalize import normalize_key
+
+
+@pytest.mark.parametrize('value', ['Björk', 'bjork', 'BJÖRK ', '  björk'])
+def test_accents_case_and_outer_space_are_ignored(value):
+    assert normalize_key(value) == 'bjork'
+
+
+def test_inner_whitespace_collapses():
+    assert normalize_key('Sigur  Rós\t') == 'sigur ros'
+
+
+def test_casefold_beyond_lower():
+    assert normalize_key('Straße') == normalize_key('STRASSE') == 'strasse'
+
+
+def test_compatibility_forms_fold():
+    # NFKD maps the ligature and fullwidth letters to plain ASCII
+    assert normalize_key('ﬁre') == 'fire'
+    assert normalize_key('ＡＢＣ') == 'abc'
+
+
+def test_distinct_names_stay_distinct():
+    assert normalize_key('Blur') != normalize_key('Blue')
+
+
+@pytest.mark.parametrize('value', [None, '', '   '])
+def test_empty_values(value):
+    assert normalize_key(value) == ''
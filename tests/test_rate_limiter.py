@@ -0,0 +1,112 @@
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timezone
+import pytest
+from utils import rate_limiter
+from utils.rate_limiter import TokenBucket, parse_retry_after
+
+
+class FakeTime:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(rate_limiter, 'time', fake)
+    return fake
+
+
+def test_tokens_refill_at_rate_up_to_burst(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    bucket._tokens = 0.0
+
+    clock.now += 1.0
+    bucket._refill(clock.now)
+    assert bucket._tokens == pytest.approx(2.0)
+
+    clock.now += 10.0
+    bucket._refill(clock.now)
+    assert bucket._tokens == 3
+
+
+def test_no_tokens_accrue_during_a_block(clock):
+    bucket = TokenBucket(rate=1.0, burst=5)
+    bucket.block_for(10)
+    assert bucket._tokens == 0
+
+    clock.now += 5
+    bucket._refill(clock.now)
+    assert bucket._tokens == 0
+
+    # Two seconds after the block ends, two tokens, not a full burst
+    clock.now += 7
+    bucket._refill(clock.now)
+    assert bucket._tokens == pytest.approx(2.0)
+
+
+def test_block_is_only_ever_extended(clock):
+    bucket = TokenBucket(rate=1.0)
+    bucket.block_for(30)
+    bucket.block_for(5)
+    assert bucket.stats()['blocked_for'] == pytest.approx(30)
+
+
+def test_acquire_spends_burst_then_waits():
+    async def scenario():
+        bucket = TokenBucket(rate=20.0, burst=2)
+        waits = [await bucket.acquire() for _ in range(3)]
+        return bucket, waits
+
+    bucket, waits = asyncio.run(scenario())
+    assert waits[0] < 0.01 and waits[1] < 0.01
+    assert waits[2] == pytest.approx(0.05, abs=0.03)
+    assert bucket.stats()['acquired'] == 3
+    assert bucket.stats()['queued'] == 0
+
+
+def test_acquire_waits_out_a_block():
+    async def scenario():
+        bucket = TokenBucket(rate=100.0, burst=5)
+        bucket.block_for(0.05)
+        return await bucket.acquire()
+
+    assert asyncio.run(scenario()) >= 0.05
+
+
+def test_waiters_are_served_in_arrival_order():
+    async def scenario():
+        bucket = TokenBucket(rate=50.0, burst=1)
+        order = []
+
+        async def take(i):
+            await bucket.acquire()
+            order.append(i)
+
+        await asyncio.gather(*(take(i) for i in range(5)))
+        return order
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after('-3') == 0.0
+
+
+def test_parse_retry_after_http_date(clock):
+    clock.now = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc).timestamp()
+    header = format_datetime(datetime(2024, 1, 1, 12, 1, 30, tzinfo=timezone.utc), usegmt=True)
+    assert parse_retry_after(header) == pytest.approx(90.0)
+
+
+@pytest.mark.parametrize('value', [None, '', 'soon'])
+def test_parse_retry_after_unusable(value):
+    assert parse_retry_after(value) is None
@@ -0,0 +1,110 @@
+import pytest
+from db.search_index import IndexedTrack, SearchIndex
+
+TRACKS = [
+    # track_id, title, artist, album, play_count, artist_id, album_id
+    (1, 'Bohemian Rhapsody', 'Queen', 'A Night at the Opera', 50, 1, 1),
+    (2, "Love of My Life", 'Queen', 'A Night at the Opera', 5, 1, 1),
+    (3, 'Under Pressure', 'Queen & David Bowie', 'Hot Space', 20, 2, 2),
+    (4, 'Heroes', 'David Bowie', None, 40, 3, None),
+    (5, 'Queen Bitch', 'David Bowie', 'Hunky Dory', 1, 3, 3),
+    (6, 'Jóga', 'Björk', 'Homogenic', 0, 4, 4),
+    (7, 'Opera', 'Opera Singers', 'Op', 0, 5, 5),
+]
+
+QUERIES = ['queen', 'QUEEN', 'opera', 'op', 'o', '', 'bowie', 'david b', 'jóga', 'björk', 'hot', 'nothing', 'e']
+
+
+def record(track_id, title, artist, album, play_count=0, artist_id=None, album_id=None):
+    return IndexedTrack(track_id, title, artist, album, None, 180, f"file-{track_id}",
+                        play_count, artist_id, album_id)
+
+
+def build(rows=TRACKS) -> SearchIndex:
+    index = SearchIndex()
+    for row in rows:
+        index.upsert(record(*row))
+    return index
+
+
+def brute_force(index: SearchIndex, query: str):
+    needle = query.lower()
+    return sorted(
+        track.track_id for track in index._tracks.values()
+        if any(value is not None and needle in value for value in track.lowered)
+    )
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_search_matches_substring_scan(query):
+    index = build()
+    found = [track.track_id for track in index.search(query, limit=100)]
+    assert found == brute_force(index, query)
+
+
+def test_search_limit_keeps_lowest_ids():
+    index = build()
+    assert [track.track_id for track in index.search('queen', limit=2)] == [1, 2]
+
+
+def test_ranked_search_prefers_exact_then_popular():
+    index = build()
+    ranked = [track.track_id for track in index.search('queen', limit=5, ranked=True)]
+    # Exact artist matches first, then prefix/substring matches
+    assert ranked[:2] == [1, 2]
+    assert set(ranked) == {1, 2, 3, 5}
+
+
+def test_upsert_reindexes_changed_fields():
+    index = build()
+    index.upsert(record(4, 'Heroes', 'David Bowie', 'Heroes', 40, 3, 6))
+
+    assert [track.track_id for track in index.search('heroes', limit=10)] == [4]
+    assert index.search('heroes')[0].album == 'Heroes'
+    for query in QUERIES:
+        assert [track.track_id for track in index.search(query, limit=100)] == brute_force(index, query)
+
+
+def test_remove_drops_track_and_postings():
+    index = build()
+    index.remove(6)
+    index.remove(99)
+
+    assert len(index) == len(TRACKS) - 1
+    assert index.search('jóga') == []
+    assert 'jóg' not in index._postings['title']
+
+
+def test_albums_by_artist_uses_canonical_names():
+    index = build()
+    # A later track spells the artist and album differently
+    index.upsert(record(8, 'Bachelorette', 'Bjork', 'homogenic', 0, 4, 4))
+
+    albums = index.albums_by_artist('björk')
+    assert [(album.album_id, album.title) for album in albums] == [(4, 'Homogenic')]
+    assert index.albums_by_artist('Bjork') == []
+
+
+def test_albums_by_artist_matches_substrings_and_sorts_by_title():
+    index = build()
+    titles = [album.title for album in index.albums_by_artist('bowie')]
+    assert titles == ['Hot Space', 'Hunky Dory']
+
+
+def test_albums_without_tracks_are_hidden():
+    index = build()
+    index.remove(5)
+    assert [album.title for album in index.albums_by_artist('david bowie')] == ['Hot Space']
+
+    # Moving a track off an album empties it too
+    index.upsert(record(3, 'Under Pressure', 'Queen & David Bowie', None, 20, 2, None))
+    assert index.albums_by_artist('david bowie') == []
+
+
+def test_canonical_names_from_the_tables_win():
+    index = SearchIndex()
+    index.set_artist(4, 'Björk')
+    index.set_album(4, 4, 'Homogenic')
+    index.upsert(record(8, 'Bachelorette', 'Bjork', 'homogenic', 0, 4, 4))
+
+    assert [album.title for album in index.albums_by_artist('björk')] == ['Homogenic']
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import pytest
+from sqlalchemy import text
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv('TEST_DATABASE_URL'),
+    reason="needs TEST_DATABASE_URL (a disposable Postgres database)"
+)
+
+# Spelling variants collapse onto the first spelling's artist and album
+CATALOG = [
+    ('Joga', 'Björk', 'Homogenic'),
+    ('Bachelorette', 'Bjork', 'homogenic'),
+    ('Hunter', 'BJÖRK', 'Homogenic'),
+    ('Army of Me', 'bjork', 'Post'),
+    ('Hyperballad', 'Björk', None),
+    ('Bohemian Rhapsody', 'Queen', 'A Night at the Opera'),
+    ('Love of My Life', 'queen', 'A Night At The Opera'),
+    ('Under Pressure', 'Queen & David Bowie', 'Hot Space'),
+    ('Song 2', 'Blur', 'Blur'),
+]
+
+QUERIES = ['björk', 'Bjork', 'BJÖRK', 'queen', 'que', 'bowie', 'ur', 'b', '', 'nobody']
+
+
+async def _compare():
+    from db import close_db, get_session, init_db
+    from db import statements
+    from db.crud import ingest_tracks, like_patterns
+    from db.search_index import SearchIndex
+
+    try:
+        async for session in get_session():
+            await session.execute(text("DROP SCHEMA public CASCADE"))
+            await session.execute(text("CREATE SCHEMA public"))
+        await init_db()
+
+        async for session in get_session():
+            await ingest_tracks(session, [
+                {'title': title, 'artist': artist, 'album': album, 'file_id': f'file-{i}'}
+                for i, (title, artist, album) in enumerate(CATALOG)
+            ])
+
+        index = SearchIndex()
+        async for session in get_session():
+            await index.load(session)
+
+            results = {}
+            for query in QUERIES:
+                rows = await session.execute(statements.albums_by_artist(), like_patterns(query.lower()))
+                sql = [(a.album_id, a.artist_id, a.title) for a in rows.scalars().all()]
+                memory = [(a.album_id, a.artist_id, a.title) for a in index.albums_by_artist(query)]
+                results[query] = (sql, memory)
+        return results
+    finally:
+        await close_db()
+
+
+def test_albums_by_artist_matches_sql():
+    results = asyncio.run(_compare())
+
+    for query, (sql, memory) in results.items():
+        assert memory == sql, query
+
+    # Canonical titles, not the variant spellings of later uploads
+    assert [title for _, _, title in results['björk'][0]] == ['Homogenic', 'Post']
+    assert results['Bjork'] == ([], [])